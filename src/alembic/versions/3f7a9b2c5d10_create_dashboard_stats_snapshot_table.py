@@ -0,0 +1,34 @@
+"""Create dashboard_stats_snapshot table
+
+Revision ID: 3f7a9b2c5d10
+Revises: 8c1d2e4f6a7b
+Create Date: 2024-07-01 09:24:15.602117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a9b2c5d10'
+down_revision: Union[str, None] = '8c1d2e4f6a7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dashboard_stats_snapshot',
+    sa.Column('id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('payload', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dashboard_stats_snapshot_created_at'), 'dashboard_stats_snapshot', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_dashboard_stats_snapshot_created_at'), table_name='dashboard_stats_snapshot')
+    op.drop_table('dashboard_stats_snapshot')
@@ -0,0 +1,33 @@
+"""Create listener_checkpoint table
+
+Revision ID: 5b9e3f1a7c42
+Revises: a41e6c8d9b27
+Create Date: 2024-07-08 11:37:20.184605
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9e3f1a7c42'
+down_revision: Union[str, None] = 'a41e6c8d9b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('listener_checkpoint',
+    sa.Column('network_chain', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('block_number', sa.BigInteger(), nullable=False),
+    sa.Column('log_index', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('network_chain')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('listener_checkpoint')
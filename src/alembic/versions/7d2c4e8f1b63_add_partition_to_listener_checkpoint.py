@@ -0,0 +1,37 @@
+"""Add partition to listener_checkpoint
+
+Revision ID: 7d2c4e8f1b63
+Revises: 5b9e3f1a7c42
+Create Date: 2024-07-10 09:15:42.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2c4e8f1b63'
+down_revision: Union[str, None] = '5b9e3f1a7c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('listener_checkpoint', sa.Column('partition', sa.Integer(), server_default='0', nullable=False))
+    op.drop_constraint('listener_checkpoint_pkey', 'listener_checkpoint', type_='primary')
+    op.create_primary_key('listener_checkpoint_pkey', 'listener_checkpoint', ['network_chain', 'partition'])
+
+
+def downgrade() -> None:
+    # keep the slowest partition, the chain resumes from there
+    op.execute(
+        "DELETE FROM listener_checkpoint c USING listener_checkpoint o "
+        "WHERE c.network_chain = o.network_chain "
+        "AND (c.block_number, c.log_index, c.partition) > (o.block_number, o.log_index, o.partition)"
+    )
+    op.drop_constraint('listener_checkpoint_pkey', 'listener_checkpoint', type_='primary')
+    op.drop_column('listener_checkpoint', 'partition')
+    op.create_primary_key('listener_checkpoint_pkey', 'listener_checkpoint', ['network_chain'])
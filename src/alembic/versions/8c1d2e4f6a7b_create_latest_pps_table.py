@@ -0,0 +1,42 @@
+"""Create latest_pps table
+
+Revision ID: 8c1d2e4f6a7b
+Revises: 5cc6cf68ef68
+Create Date: 2024-06-28 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1d2e4f6a7b'
+down_revision: Union[str, None] = '5cc6cf68ef68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('latest_pps',
+    sa.Column('datetime', sa.DateTime(), nullable=False),
+    sa.Column('price_per_share', sa.Float(), nullable=False),
+    sa.Column('vault_id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.ForeignKeyConstraint(['vault_id'], ['vaults.id'], ),
+    sa.PrimaryKeyConstraint('vault_id')
+    )
+    # seed with the latest point of every vault
+    op.execute(
+        """
+        INSERT INTO latest_pps (vault_id, datetime, price_per_share)
+        SELECT DISTINCT ON (vault_id) vault_id, datetime, price_per_share
+        FROM pps_history
+        ORDER BY vault_id, datetime DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('latest_pps')
@@ -0,0 +1,41 @@
+"""Add composite indexes for hot queries
+
+Revision ID: 9e4b1d7c3a58
+Revises: 7d2c4e8f1b63
+Create Date: 2024-07-11 14:02:37.551093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b1d7c3a58'
+down_revision: Union[str, None] = '7d2c4e8f1b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name, table, columns
+INDEXES = [
+    ('ix_pps_history_vault_id_datetime', 'pps_history', ['vault_id', sa.text('datetime DESC')]),
+    ('ix_vault_performance_vault_id_datetime', 'vault_performance', ['vault_id', sa.text('datetime DESC')]),
+    ('ix_user_portfolio_user_address_vault_id_status', 'user_portfolio', ['user_address', 'vault_id', 'status']),
+    ('ix_point_distribution_history_vault_id_partner_name_created_at', 'point_distribution_history', ['vault_id', 'partner_name', sa.text('created_at DESC')]),
+    ('ix_user_points_history_user_points_id_created_at', 'user_points_history', ['user_points_id', sa.text('created_at DESC')]),
+]
+
+
+def upgrade() -> None:
+    # built concurrently so the listener and the jobs keep writing meanwhile
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
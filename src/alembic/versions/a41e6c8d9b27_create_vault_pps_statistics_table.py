@@ -0,0 +1,42 @@
+"""Create vault_pps_statistics table
+
+Revision ID: a41e6c8d9b27
+Revises: 3f7a9b2c5d10
+Create Date: 2024-07-03 14:05:52.917340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41e6c8d9b27'
+down_revision: Union[str, None] = '3f7a9b2c5d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # rows are bootstrapped from pps_history on first use
+    op.create_table('vault_pps_statistics',
+    sa.Column('vault_id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('all_time_high_per_share', sa.Float(), nullable=True),
+    sa.Column('previous_price_per_share', sa.Float(), nullable=True),
+    sa.Column('last_price_per_share', sa.Float(), nullable=True),
+    sa.Column('last_datetime', sa.DateTime(), nullable=True),
+    sa.Column('return_count', sa.Integer(), nullable=False),
+    sa.Column('return_sum', sa.Float(), nullable=False),
+    sa.Column('negative_return_count', sa.Integer(), nullable=False),
+    sa.Column('negative_return_sum', sa.Float(), nullable=False),
+    sa.Column('negative_return_square_sum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['vault_id'], ['vaults.id'], ),
+    sa.PrimaryKeyConstraint('vault_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('vault_pps_statistics')
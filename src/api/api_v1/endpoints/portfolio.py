@@ -1,57 +1,58 @@
 import datetime
-from typing import List
+import logging
+import uuid
+from collections import defaultdict
+from typing import Dict, List
 
 from fastapi import APIRouter, HTTPException, Query
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from web3 import Web3
+from web3.contract import AsyncContract
 
 from bg_tasks.utils import calculate_roi
-from core.abi_reader import read_abi
 from models.user_points import UserPoints
 from models.user_portfolio import PositionStatus
 import schemas
-from api.api_v1.deps import SessionDep
+from api.api_v1.deps import AsyncSessionDep
 from models import Vault, UserPortfolio
 from schemas import Position
 from core.config import settings
 from core import constants
+from core.web3_provider import get_async_contract
+from services.onchain_reader import ContractCall, read_contracts
+from services.vault_registry import VAULT_ABI_NAMES
 from utils.json_encoder import custom_encoder
 
-router = APIRouter()
-
-rockonyx_stablecoin_vault_abi = read_abi("RockOnyxStableCoin")
-rockonyx_delta_neutral_vault_abi = read_abi("RockOnyxDeltaNeutralVault")
+logger = logging.getLogger(__name__)
 
+router = APIRouter()
 
-def create_vault_contract(vault: Vault):
-    w3 = Web3(Web3.HTTPProvider(constants.NETWORK_RPC_URLS[vault.network_chain]))
 
-    if vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY:
-        contract = w3.eth.contract(
-            address=vault.contract_address, abi=rockonyx_delta_neutral_vault_abi
-        )
-    elif vault.strategy_name == constants.OPTIONS_WHEEL_STRATEGY:
-        contract = w3.eth.contract(
-            address=vault.contract_address, abi=rockonyx_stablecoin_vault_abi
-        )
-    else:
+def create_vault_contract(vault: Vault) -> AsyncContract:
+    if vault.strategy_name not in VAULT_ABI_NAMES:
         raise HTTPException(status_code=400, detail="Invalid vault strategy")
 
-    return contract
+    return get_async_contract(
+        vault.network_chain, vault.contract_address, VAULT_ABI_NAMES[vault.strategy_name]
+    )
 
 
-def get_user_earned_points(
-    session: Session, position: UserPortfolio
-) -> List[schemas.EarnedPoints]:
-    user_points = session.exec(
-        select(UserPoints)
-        .where(UserPoints.vault_id == position.vault_id)
-        .where(UserPoints.wallet_address == position.user_address.lower())
+async def get_user_earned_points(
+    session: AsyncSession, user_address: str, vault_ids: List[uuid.UUID]
+) -> Dict[uuid.UUID, List[schemas.EarnedPoints]]:
+    """Earned points of the wallet in each of the vaults, grouped by vault."""
+    user_points = (
+        await session.exec(
+            select(UserPoints)
+            .where(UserPoints.vault_id.in_(vault_ids))
+            .where(UserPoints.wallet_address == user_address.lower())
+        )
     ).all()
 
-    earned_points = []
+    earned_points = defaultdict(list)
     for user_point in user_points:
-        earned_points.append(
+        earned_points[user_point.vault_id].append(
             schemas.EarnedPoints(
                 name=user_point.partner_name,
                 point=user_point.points,
@@ -68,7 +69,7 @@ def get_user_earned_points(
 
 @router.get("/{user_address}", response_model=schemas.Portfolio)
 async def get_portfolio_info(
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_address: str,
     vault_id: str = Query(None, description="Vault Id"),
 ):
@@ -78,18 +79,36 @@ async def get_portfolio_info(
         .where(UserPortfolio.status == PositionStatus.ACTIVE)
     )
     if vault_id:
-        statement.where(UserPortfolio.vault_id == vault_id)
+        statement = statement.where(UserPortfolio.vault_id == vault_id)
+
+    user_positions = (await session.exec(statement)).all()
 
-    user_positions = session.exec(statement).all()
+    # the vaults and the points of every position with one query each
+    vault_ids = {pos.vault_id for pos in user_positions}
+    vaults = {
+        vault.id: vault
+        for vault in (await session.exec(select(Vault).where(Vault.id.in_(vault_ids)))).all()
+    }
+
+    # positions of an unknown vault cannot be valued, skip them
+    for pos in user_positions:
+        if pos.vault_id not in vaults:
+            logger.warning("Skip position %s of unknown vault %s", pos.id, pos.vault_id)
+    user_positions = [pos for pos in user_positions if pos.vault_id in vaults]
 
-    if user_positions is None or len(user_positions) == 0:
+    if len(user_positions) == 0:
         portfolio = schemas.Portfolio(total_balance=0, pnl=0, positions=[])
         return portfolio
 
+    earned_points = await get_user_earned_points(
+        session, user_address, list(vaults.keys())
+    )
+
     positions: List[Position] = []
+    calls: List[ContractCall] = []
     total_balance = 0.0
     for pos in user_positions:
-        vault = session.exec(select(Vault).where(Vault.id == pos.vault_id)).one()
+        vault = vaults[pos.vault_id]
 
         vault_contract = create_vault_contract(vault)
 
@@ -115,26 +134,36 @@ async def get_portfolio_info(
             weekly_apy=vault.weekly_apy,
             slug=vault.slug,
             initiated_withdrawal_at=custom_encoder(pos.initiated_withdrawal_at),
-            points=get_user_earned_points(session, pos),
+            points=earned_points.get(pos.vault_id, []),
             vault_network=vault.network_chain,
         )
 
-        if vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY:
-            price_per_share = vault_contract.functions.pricePerShare().call()
-            shares = vault_contract.functions.balanceOf(
-                Web3.to_checksum_address(user_address)
-            ).call()
-        else:
+        if vault.strategy_name != constants.DELTA_NEUTRAL_STRATEGY:
             # calculate next Friday from today
             position.next_close_round_date = (
                 datetime.datetime.now()
                 + datetime.timedelta(days=(4 - datetime.datetime.now().weekday()) % 7)
             ).replace(hour=8, minute=0, second=0)
 
-            price_per_share = vault_contract.functions.pricePerShare().call()
-            shares = vault_contract.functions.balanceOf(
-                Web3.to_checksum_address(user_address)
-            ).call()
+        calls.append(
+            ContractCall(vault.network_chain, vault_contract, "pricePerShare")
+        )
+        calls.append(
+            ContractCall(
+                vault.network_chain,
+                vault_contract,
+                "balanceOf",
+                (Web3.to_checksum_address(user_address),),
+            )
+        )
+        positions.append(position)
+
+    # read pricePerShare and balanceOf of every position with one multicall per chain
+    results = await read_contracts(calls)
+
+    for index, (pos, position) in enumerate(zip(user_positions, positions)):
+        vault = vaults[pos.vault_id]
+        price_per_share, shares = results[2 * index], results[2 * index + 1]
 
         shares = shares / 10**6
         price_per_share = price_per_share / 10**6
@@ -157,8 +186,6 @@ async def get_portfolio_info(
         position.trade_start_date = custom_encoder(pos.trade_start_date)
         position.next_close_round_date = custom_encoder(vault.next_close_round_date)
 
-        positions.append(position)
-
     total_deposit = sum(position.init_deposit for position in positions)
     pnl = (total_balance / total_deposit - 1) * 100
 
@@ -1,46 +1,47 @@
 import json
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import distinct, func
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from sqlmodel import select
-from models.pps_history import PricePerShareHistory
-from models.user_portfolio import UserPortfolio
 from models.vault_performance import VaultPerformance
 import schemas
-import pandas as pd
-from api.api_v1.deps import SessionDep
+from api.api_v1.deps import AsyncSessionDep
 from models import Vault
 from core.config import settings
 from core import constants
+from services.dashboard_stats import dashboard_stats_cache
+from services.history_loader import load_history_version, load_vault_performance_history
+from services.latest_pps import latest_pps_cache
+from utils.history_response import (
+    HISTORY_RESOLUTIONS,
+    etag_matches,
+    history_etag,
+    history_response,
+    not_modified_response,
+)
 
 router = APIRouter()
 
 
 @router.get("/{vault_id}", response_model=schemas.Statistics)
-async def get_all_statistics(session: SessionDep, vault_id: str):
+async def get_all_statistics(session: AsyncSessionDep, vault_id: str):
 
-    statement = select(Vault).where(Vault.id == vault_id)
-    vault = session.exec(statement).first()
+    vault = (await session.exec(select(Vault).where(Vault.id == vault_id))).first()
 
     statement = (
         select(VaultPerformance)
         .where(VaultPerformance.vault_id == vault_id)
         .order_by(VaultPerformance.datetime.desc())
     )
-    performances = session.exec(statement).first()
+    performances = (await session.exec(statement)).first()
     if performances is None:
         raise HTTPException(
             status_code=400,
             detail="The performances data not found in the database.",
         )
 
-    pps_history = session.exec(
-        select(PricePerShareHistory)
-        .where(PricePerShareHistory.vault_id == vault_id)
-        .order_by(PricePerShareHistory.datetime.desc())
-    ).first()
-    last_price_per_share = pps_history.price_per_share
+    last_price_per_share = await session.run_sync(latest_pps_cache.get, vault.id)
 
     statistic = schemas.Statistics(
         name=vault.name,
@@ -68,88 +69,58 @@ async def get_all_statistics(session: SessionDep, vault_id: str):
 
 
 @router.get("/", response_model=schemas.DashboardStats)
-async def get_dashboard_statistics(session: SessionDep):
-    statement = (
-        select(Vault).where(Vault.strategy_name != None).where(Vault.is_active == True)
-    )
-    vaults = session.exec(statement).all()
-    data = []
-    tvl_in_all_vaults = 0
-    tvl_composition = {}
-    for vault in vaults:
-        statement = (
-            select(VaultPerformance)
-            .where(VaultPerformance.vault_id == vault.id)
-            .order_by(VaultPerformance.datetime.desc())
-        )
-        performance = session.exec(statement).first()
-
-        pps_history = session.exec(
-            select(PricePerShareHistory)
-            .where(PricePerShareHistory.vault_id == vault.id)
-            .order_by(PricePerShareHistory.datetime.desc())
-        ).first()
-
-        last_price_per_share = pps_history.price_per_share if pps_history else 0
-
-        statistic = schemas.VaultStats(
-            name=vault.name,
-            price_per_share=last_price_per_share,
-            apy_1y=(
-                performance.apy_ytd
-                if vault.strategy_name == constants.OPTIONS_WHEEL_STRATEGY
-                else performance.apy_1m
-            ),
-            risk_factor=performance.risk_factor,
-            total_value_locked=performance.total_locked_value,
-            vault_address=vault.contract_address,
-            slug=vault.slug,
-            id=vault.id,
-        )
-        tvl_in_all_vaults += performance.total_locked_value
-        tvl_composition[vault.name] = performance.total_locked_value
-        data.append(statistic)
+async def get_dashboard_statistics(session: AsyncSessionDep, request: Request):
+    payload, etag = await session.run_sync(dashboard_stats_cache.get)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.DASHBOARD_STATS_CACHE_TTL_SECONDS}",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
 
-    for key in tvl_composition:
-        tvl_composition[key] = (
-            tvl_composition[key] / tvl_in_all_vaults if tvl_in_all_vaults > 0 else 0
-        )
-
-    # count all portfolio of vault
-    statement = select(func.count(distinct(UserPortfolio.user_address))).select_from(UserPortfolio)
-    count = session.scalar(statement)
-
-    data = schemas.DashboardStats(
-        tvl_in_all_vaults=tvl_in_all_vaults,
-        total_depositors=count,
-        tvl_composition=tvl_composition,
-        vaults=data,
-    )
-    return data
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 
 @router.get("/{vault_id}/tvl-history")
-async def get_vault_performance(session: SessionDep, vault_id: str):
+async def get_vault_performance(
+    session: AsyncSessionDep,
+    request: Request,
+    vault_id: str,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = Query(None),
+    resolution: Optional[str] = Query(None, enum=HISTORY_RESOLUTIONS),
+):
     # Get the VaultPerformance records for the given vault_id
-    statement = select(Vault).where(Vault.id == vault_id)
-    vault = session.exec(statement).first()
+    vault = (await session.exec(select(Vault).where(Vault.id == vault_id))).first()
     if vault is None:
         raise HTTPException(
             status_code=400,
             detail="The data not found in the database.",
         )
+    if from_ is not None and to is not None and from_ > to:
+        raise HTTPException(status_code=400, detail="from must be before to")
 
-    perf_hist = session.exec(
-        select(VaultPerformance)
-        .where(VaultPerformance.vault_id == vault.id)
-        .order_by(VaultPerformance.datetime.asc())
-    ).all()
-    if len(perf_hist) == 0:
+    count, last_datetime = await session.run_sync(
+        load_history_version, VaultPerformance, vault.id, from_, to
+    )
+    etag = history_etag("tvl", vault.id, from_, to, resolution, count, last_datetime)
+    not_modified = not_modified_response(request, etag, last_datetime)
+    if not_modified is not None:
+        return not_modified
+
+    # buckets keep their latest tvl, the value at the end of the period
+    pps_history_df = await session.run_sync(
+        load_vault_performance_history,
+        vault.id,
+        ["total_locked_value"],
+        start=from_,
+        end=to,
+        downsample=resolution,
+        aggregate="last",
+    )
+    if pps_history_df.empty:
         return {"date": [], "tvl": []}
 
-    # Convert the list of VaultPerformance objects to a DataFrame
-    pps_history_df = pd.DataFrame([vars(rec) for rec in perf_hist])
-
     # Rename the datetime column to date
     pps_history_df.rename(columns={"datetime": "date"}, inplace=True)
 
@@ -159,5 +130,11 @@ async def get_vault_performance(session: SessionDep, vault_id: str):
     pps_history_df["date"] = pps_history_df["date"].dt.strftime("%Y-%m-%dT%H:%M:%S")
     pps_history_df.fillna(0, inplace=True)
 
-    # Convert the DataFrame to a dictionary and return it
-    return pps_history_df[["date", "tvl"]].to_dict(orient="list")
+    return history_response(
+        {
+            "date": pps_history_df["date"].tolist(),
+            "tvl": pps_history_df["tvl"].tolist(),
+        },
+        etag,
+        last_datetime,
+    )
@@ -1,16 +1,26 @@
 import json
-from typing import List
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-import pandas as pd
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, and_, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 import schemas
-from api.api_v1.deps import SessionDep
+from api.api_v1.deps import AsyncSessionDep
 from core import constants
 from models import PointDistributionHistory, Vault
 from models.vault_performance import VaultPerformance
 from models.vaults import NetworkChain, VaultCategory
+from services.history_loader import load_history_version, load_vault_performance_history
+from utils.history_response import (
+    HISTORY_RESOLUTIONS,
+    history_etag,
+    history_response,
+    not_modified_response,
+)
 
 router = APIRouter()
 
@@ -25,29 +35,7 @@ def _update_vault_apy(vault: Vault) -> schemas.Vault:
     return schema_vault
 
 
-def get_vault_earned_point_by_partner(
-    session: Session, vault: Vault, partner_name: str
-) -> PointDistributionHistory:
-    """
-    Get the latest PointDistributionHistory record for the given vault_id
-    """
-    statement = (
-        select(PointDistributionHistory)
-        .where(
-            PointDistributionHistory.vault_id == vault.id,
-            PointDistributionHistory.partner_name == partner_name,
-        )
-        .order_by(PointDistributionHistory.created_at.desc())
-    )
-    point_dist_hist = session.exec(statement).first()
-    if point_dist_hist is None:
-        return PointDistributionHistory(
-            vault_id=vault.id, partner_name=partner_name, point=0.0
-        )
-    return point_dist_hist
-
-
-def get_earned_points(session: Session, vault: Vault) -> List[schemas.EarnedPoints]:
+def _get_partners(vault: Vault) -> List[str]:
     routes = (
         json.loads(vault.routes) + [constants.EIGENLAYER]
         if vault.routes is not None
@@ -59,10 +47,47 @@ def get_earned_points(session: Session, vault: Vault) -> List[schemas.EarnedPoin
 
     if vault.network_chain == NetworkChain.base:
         partners.append(constants.BSX)
+    return partners
+
+
+async def get_latest_earned_points(
+    session: AsyncSession, vaults: List[Vault]
+) -> Dict[Tuple[uuid.UUID, str], PointDistributionHistory]:
+    """
+    Latest PointDistributionHistory record of every (vault, partner) pair of
+    the given vaults, fetched with one DISTINCT ON query.
+    """
+    pairs = [(vault.id, partner) for vault in vaults for partner in _get_partners(vault)]
+    if not pairs:
+        return {}
+
+    statement = (
+        select(PointDistributionHistory)
+        .where(
+            tuple_(
+                PointDistributionHistory.vault_id, PointDistributionHistory.partner_name
+            ).in_(pairs)
+        )
+        .distinct(PointDistributionHistory.vault_id, PointDistributionHistory.partner_name)
+        .order_by(
+            PointDistributionHistory.vault_id,
+            PointDistributionHistory.partner_name,
+            PointDistributionHistory.created_at.desc(),
+        )
+    )
+    return {
+        (point_dist_hist.vault_id, point_dist_hist.partner_name): point_dist_hist
+        for point_dist_hist in (await session.exec(statement)).all()
+    }
+
 
+def get_earned_points(
+    vault: Vault,
+    latest_points: Dict[Tuple[uuid.UUID, str], PointDistributionHistory],
+) -> List[schemas.EarnedPoints]:
     earned_points = []
-    for partner in partners:
-        point_dist_hist = get_vault_earned_point_by_partner(session, vault, partner)
+    for partner in _get_partners(vault):
+        point_dist_hist = latest_points.get((vault.id, partner))
         if point_dist_hist is not None:
             earned_points.append(
                 schemas.EarnedPoints(
@@ -86,32 +111,28 @@ def get_earned_points(session: Session, vault: Vault) -> List[schemas.EarnedPoin
 
 @router.get("/", response_model=List[schemas.Vault])
 async def get_all_vaults(
-    session: SessionDep,
+    session: AsyncSessionDep,
     category: VaultCategory = Query(None),
     network_chain: NetworkChain = Query(None),
 ):
     statement = select(Vault).where(Vault.is_active == True)
-    if category or network_chain:
-        conditions = []
-        if category:
-            conditions.append(Vault.category == category)
-        if network_chain:
-            conditions.append(Vault.network_chain == network_chain)
-        statement = statement.where(and_(*conditions))
-
-    vaults = session.exec(statement).all()
+    if category:
+        statement = statement.where(Vault.category == category)
+    if network_chain:
+        statement = statement.where(Vault.network_chain == network_chain)
+    vaults = (await session.exec(statement)).all()
+    latest_points = await get_latest_earned_points(session, vaults)
     data = []
     for vault in vaults:
         schema_vault = _update_vault_apy(vault)
-        schema_vault.points = get_earned_points(session, vault)
+        schema_vault.points = get_earned_points(vault, latest_points)
         data.append(schema_vault)
     return data
 
 
 @router.get("/{vault_slug}", response_model=schemas.Vault)
-async def get_vault_info(session: SessionDep, vault_slug: str):
-    statement = select(Vault).where(Vault.slug == vault_slug)
-    vault = session.exec(statement).first()
+async def get_vault_info(session: AsyncSessionDep, vault_slug: str):
+    vault = (await session.exec(select(Vault).where(Vault.slug == vault_slug))).first()
     if vault is None:
         raise HTTPException(
             status_code=400,
@@ -119,31 +140,55 @@ async def get_vault_info(session: SessionDep, vault_slug: str):
         )
 
     schema_vault = _update_vault_apy(vault)
-    schema_vault.points = get_earned_points(session, vault)
+    schema_vault.points = get_earned_points(
+        vault, await get_latest_earned_points(session, [vault])
+    )
     return schema_vault
 
 
 @router.get("/{vault_slug}/performance")
-async def get_vault_performance(session: SessionDep, vault_slug: str):
+async def get_vault_performance(
+    session: AsyncSessionDep,
+    request: Request,
+    vault_slug: str,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = Query(None),
+    resolution: Optional[str] = Query(None, enum=HISTORY_RESOLUTIONS),
+):
     # Get the VaultPerformance records for the given vault_id
-    statement = select(Vault).where(Vault.slug == vault_slug)
-    vault = session.exec(statement).first()
+    vault = (await session.exec(select(Vault).where(Vault.slug == vault_slug))).first()
     if vault is None:
         raise HTTPException(
             status_code=400,
             detail="The data not found in the database.",
         )
+    if from_ is not None and to is not None and from_ > to:
+        raise HTTPException(status_code=400, detail="from must be before to")
 
-    perf_hist = session.exec(
-        select(VaultPerformance)
-        .where(VaultPerformance.vault_id == vault.id)
-        .order_by(VaultPerformance.datetime.asc())
-    ).all()
-    if len(perf_hist) == 0:
-        return {"date": [], "apy": []}
+    daily_chart = (
+        vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY
+        and vault.network_chain in {NetworkChain.arbitrum_one, NetworkChain.base}
+    )
+    downsample = resolution or ("day" if daily_chart else None)
 
-    # Convert the list of VaultPerformance objects to a DataFrame
-    pps_history_df = pd.DataFrame([vars(rec) for rec in perf_hist])
+    count, last_datetime = await session.run_sync(
+        load_history_version, VaultPerformance, vault.id, from_, to
+    )
+    etag = history_etag("performance", vault.id, from_, to, downsample, count, last_datetime)
+    not_modified = not_modified_response(request, etag, last_datetime)
+    if not_modified is not None:
+        return not_modified
+
+    pps_history_df = await session.run_sync(
+        load_vault_performance_history,
+        vault.id,
+        ["apy_1m", "apy_ytd"],
+        start=from_,
+        end=to,
+        downsample=downsample,
+    )
+    if pps_history_df.empty:
+        return {"date": [], "apy": []}
 
     # Rename the datetime column to date
     pps_history_df.rename(columns={"datetime": "date"}, inplace=True)
@@ -151,11 +196,10 @@ async def get_vault_performance(session: SessionDep, vault_slug: str):
     if vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY:
         pps_history_df["apy"] = pps_history_df["apy_1m"]
 
-        if vault.network_chain in {NetworkChain.arbitrum_one, NetworkChain.base}:
+        if daily_chart and downsample == "day":
             pps_history_df = pps_history_df[["date", "apy"]].copy()
-            
-            # resample pps_history_df to daily frequency
-            pps_history_df["date"] = pd.to_datetime(pps_history_df["date"])
+
+            # fill the days without a record, rows are already daily averages
             pps_history_df.set_index("date", inplace=True)
             pps_history_df = pps_history_df.resample("D").mean()
             pps_history_df.ffill(inplace=True)
@@ -172,5 +216,11 @@ async def get_vault_performance(session: SessionDep, vault_slug: str):
     pps_history_df["date"] = pps_history_df["date"].dt.strftime("%Y-%m-%dT%H:%M:%S")
     pps_history_df.fillna(0, inplace=True)
 
-    # Convert the DataFrame to a dictionary and return it
-    return pps_history_df[["date", "apy"]].to_dict(orient="list")
+    return history_response(
+        {
+            "date": pps_history_df["date"].tolist(),
+            "apy": pps_history_df["apy"].tolist(),
+        },
+        etag,
+        last_datetime,
+    )
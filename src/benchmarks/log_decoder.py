@@ -0,0 +1,154 @@
+"""
+Decoding throughput of the vault event logs, the typed ``services.log_decoder``
+against the previous hex string path, on synthetic Deposited / RequestFunds /
+Withdrawn logs of stablecoin and delta neutral vaults:
+
+    python -m benchmarks.log_decoder --logs 100000
+
+Both decoders must agree on every log, the run fails otherwise. No database
+or RPC is needed.
+"""
+
+import json
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+import click
+from hexbytes import HexBytes
+
+from core import constants
+from core.config import settings
+from log import setup_logging_to_console
+from models.vaults import Vault
+from services.log_decoder import decode_vault_event
+
+logger = logging.getLogger("log_decoder_benchmark")
+logger.setLevel(logging.INFO)
+
+TOPICS = {
+    constants.OPTIONS_WHEEL_STRATEGY: [
+        settings.STABLECOIN_DEPOSIT_VAULT_FILTER_TOPICS,
+        settings.STABLECOIN_INITIATE_WITHDRAW_VAULT_FILTER_TOPICS,
+        settings.STABLECOIN_COMPLETE_WITHDRAW_VAULT_FILTER_TOPICS,
+    ],
+    constants.DELTA_NEUTRAL_STRATEGY: [
+        settings.DELTA_NEUTRAL_DEPOSIT_EVENT_TOPIC,
+        settings.DELTA_NEUTRAL_INITIATE_WITHDRAW_EVENT_TOPIC,
+        settings.DELTA_NEUTRAL_COMPLETE_WITHDRAW_EVENT_TOPIC,
+    ],
+}
+
+
+def _legacy_extract_stablecoin_event(entry):
+    data = entry["data"].hex()
+    value = int(data[2:66], 16) / 1e6
+    shares = int("0x" + data[66:], 16) / 1e6
+
+    from_address = None
+    if len(entry["topics"]) >= 2:
+        from_address = f'0x{entry["topics"][1].hex()[26:]}'
+    return value, shares, from_address
+
+
+def _legacy_extract_delta_neutral_event(entry):
+    from_address = None
+    if len(entry["topics"]) >= 2:
+        from_address = f'0x{entry["topics"][1].hex()[26:]}'
+
+    data = entry["data"].hex()
+    amount = int(data[2:66], 16)
+    amount = amount / 1e18 if len(str(amount)) >= 18 else amount / 1e6
+
+    shares = int(data[66 : 66 + 64], 16) / 1e6
+    return amount, shares, from_address
+
+
+def legacy_extract_event(vault: Vault, entry):
+    if vault.strategy_name == constants.OPTIONS_WHEEL_STRATEGY:
+        return _legacy_extract_stablecoin_event(entry)
+    return _legacy_extract_delta_neutral_event(entry)
+
+
+def synthetic_logs(count: int, seed: int = 0) -> List[Tuple[Vault, dict]]:
+    rng = random.Random(seed)
+    vaults = [
+        Vault(name=strategy_name, strategy_name=strategy_name, vault_currency="USDC")
+        for strategy_name in TOPICS
+    ]
+
+    logs = []
+    for _ in range(count):
+        vault = rng.choice(vaults)
+        amount = rng.randrange(1, 10**12)
+        shares = rng.randrange(1, 10**12)
+        logs.append(
+            (
+                vault,
+                {
+                    "data": HexBytes(amount.to_bytes(32, "big") + shares.to_bytes(32, "big")),
+                    "topics": [
+                        HexBytes(rng.choice(TOPICS[vault.strategy_name])),
+                        HexBytes(bytes(12) + rng.randbytes(20)),
+                    ],
+                },
+            )
+        )
+    return logs
+
+
+def _time(decode: Callable, logs: List[Tuple[Vault, dict]], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for vault, entry in logs:
+            decode(vault, entry)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(count: int, repeat: int) -> Dict[str, float]:
+    logs = synthetic_logs(count)
+    for vault, entry in logs:
+        if decode_vault_event(vault, entry) != legacy_extract_event(vault, entry):
+            raise ValueError(f"Decoders disagree on {entry}")
+
+    legacy = _time(legacy_extract_event, logs, repeat)
+    typed = _time(decode_vault_event, logs, repeat)
+    return {
+        "logs": count,
+        "legacy_seconds": legacy,
+        "typed_seconds": typed,
+        "legacy_logs_per_second": count / legacy,
+        "typed_logs_per_second": count / typed,
+        "speedup": legacy / typed,
+    }
+
+
+@click.command()
+@click.option("--logs", "count", default=100_000, help="Synthetic logs to decode")
+@click.option("--repeat", default=5, help="Runs per decoder, the best is kept")
+@click.option("--output", type=click.Path(), default=None, help="Write the results as JSON")
+def main(count: int, repeat: int, output: str):
+    setup_logging_to_console(level=logging.INFO, logger=logger)
+
+    result = run(count, repeat)
+    logger.info(
+        "%s logs: string path %.3fs (%.0f logs/s), typed %.3fs (%.0f logs/s), %.2fx",
+        count,
+        result["legacy_seconds"],
+        result["legacy_logs_per_second"],
+        result["typed_seconds"],
+        result["typed_logs_per_second"],
+        result["speedup"],
+    )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
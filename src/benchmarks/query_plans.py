@@ -0,0 +1,301 @@
+"""
+EXPLAIN ANALYZE timings of the hot query shapes with and without the
+composite indexes, on synthetic data at a multiple of the current volume.
+
+Everything runs in one transaction which is rolled back at the end, so the
+seeded rows and the dropped/recreated indexes never reach the database:
+
+    python -m benchmarks.query_plans --scale 10 --scale 100
+"""
+
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import click
+from sqlalchemy import Connection, func, insert, select, text
+
+from core.db import engine
+from log import setup_logging_to_console
+from models.point_distribution_history import PointDistributionHistory
+from models.pps_history import PricePerShareHistory
+from models.user_points import UserPoints
+from models.user_points_history import UserPointsHistory
+from models.user_portfolio import PositionStatus, UserPortfolio
+from models.vault_performance import VaultPerformance
+from models.vaults import Vault
+
+logger = logging.getLogger("query_plans")
+logger.setLevel(logging.INFO)
+
+MODELS = [
+    PricePerShareHistory,
+    VaultPerformance,
+    UserPortfolio,
+    PointDistributionHistory,
+    UserPoints,
+    UserPointsHistory,
+]
+PARTNERS = ["renzo", "zircuit", "kelpdao", "eigenlayer", "Harmonix"]
+BATCH_SIZE = 10_000
+
+QUERIES = {
+    "latest_pps": """
+        SELECT price_per_share FROM pps_history
+        WHERE vault_id = :vault_id ORDER BY datetime DESC LIMIT 1
+    """,
+    "latest_vault_performance": """
+        SELECT * FROM vault_performance
+        WHERE vault_id = :vault_id ORDER BY datetime DESC LIMIT 1
+    """,
+    "user_positions": """
+        SELECT * FROM user_portfolio
+        WHERE user_address = :user_address AND vault_id = :vault_id AND status = :status
+    """,
+    "latest_points_per_partner": """
+        SELECT DISTINCT ON (vault_id, partner_name) vault_id, partner_name, point
+        FROM point_distribution_history
+        WHERE vault_id = :vault_id
+        ORDER BY vault_id, partner_name, created_at DESC
+    """,
+    "latest_user_points_history": """
+        SELECT * FROM user_points_history
+        WHERE user_points_id = :user_points_id ORDER BY created_at DESC LIMIT 1
+    """,
+}
+
+
+def _composite_indexes():
+    # the multi-column indexes declared on the models, i.e. the ones under test
+    return [
+        index
+        for model in MODELS
+        for index in model.__table__.indexes
+        if len(index.expressions) > 1
+    ]
+
+
+def _insert(conn: Connection, model, rows: List[dict]):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(model), rows[start : start + BATCH_SIZE])
+
+
+def _count(conn: Connection, model) -> int:
+    return conn.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+def seed(conn: Connection, scale: int, min_rows: int) -> Dict[str, int]:
+    """Grow every hot table to ``scale`` times its current size."""
+    vault_ids = conn.execute(select(Vault.id)).scalars().all()
+    if not vault_ids:
+        vault_ids = [uuid.uuid4() for _ in range(10)]
+        _insert(
+            conn,
+            Vault,
+            [{"id": vault_id, "name": f"Benchmark {i}"} for i, vault_id in enumerate(vault_ids)],
+        )
+
+    now = datetime.now(timezone.utc)
+    targets = {}
+    for model in [PricePerShareHistory, VaultPerformance, UserPortfolio, PointDistributionHistory]:
+        count = _count(conn, model)
+        targets[model.__tablename__] = max(count, min_rows) * scale - count
+
+    rows = targets["pps_history"]
+    _insert(
+        conn,
+        PricePerShareHistory,
+        [
+            {
+                "vault_id": vault_ids[i % len(vault_ids)],
+                "datetime": now - timedelta(hours=i // len(vault_ids)),
+                "price_per_share": 1 + random.random(),
+            }
+            for i in range(rows)
+        ],
+    )
+
+    rows = targets["vault_performance"]
+    _insert(
+        conn,
+        VaultPerformance,
+        [
+            {
+                "vault_id": vault_ids[i % len(vault_ids)],
+                "datetime": now - timedelta(hours=i // len(vault_ids)),
+                "total_locked_value": random.random() * 1e6,
+                "apy_1m": random.random() * 100,
+                "apy_1w": random.random() * 100,
+                "benchmark": 3000.0,
+                "pct_benchmark": 0.0,
+            }
+            for i in range(rows)
+        ],
+    )
+
+    rows = targets["user_portfolio"]
+    _insert(
+        conn,
+        UserPortfolio,
+        [
+            {
+                "vault_id": vault_ids[i % len(vault_ids)],
+                "user_address": "0x{:040x}".format(i // 2),
+                "total_balance": random.random() * 1e4,
+                "init_deposit": random.random() * 1e4,
+                "status": PositionStatus.CLOSED if i % 5 == 0 else PositionStatus.ACTIVE,
+                "trade_start_date": now - timedelta(days=i % 365),
+            }
+            for i in range(rows)
+        ],
+    )
+
+    rows = targets["point_distribution_history"]
+    _insert(
+        conn,
+        PointDistributionHistory,
+        [
+            {
+                "id": uuid.uuid4(),
+                "vault_id": vault_ids[i % len(vault_ids)],
+                "partner_name": PARTNERS[(i // len(vault_ids)) % len(PARTNERS)],
+                "point": random.random() * 1e6,
+                "created_at": now - timedelta(hours=i),
+            }
+            for i in range(rows)
+        ],
+    )
+
+    # every user points row gets a history of hourly snapshots
+    points_count = max(_count(conn, UserPoints), min_rows // 10) * scale
+    user_points_ids = [uuid.uuid4() for _ in range(points_count - _count(conn, UserPoints))]
+    _insert(
+        conn,
+        UserPoints,
+        [
+            {
+                "id": user_points_id,
+                "vault_id": vault_ids[i % len(vault_ids)],
+                "wallet_address": "0x{:040x}".format(i),
+                "points": 0.0,
+                "partner_name": PARTNERS[i % len(PARTNERS)],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i, user_points_id in enumerate(user_points_ids)
+        ],
+    )
+    history_count = _count(conn, UserPointsHistory)
+    rows = max(history_count, min_rows) * scale - history_count
+    if user_points_ids:
+        _insert(
+            conn,
+            UserPointsHistory,
+            [
+                {
+                    "user_points_id": user_points_ids[i % len(user_points_ids)],
+                    "point": random.random() * 1e3,
+                    "created_at": now - timedelta(hours=i // len(user_points_ids)),
+                }
+                for i in range(rows)
+            ],
+        )
+
+    conn.execute(text("ANALYZE"))
+    return {model.__tablename__: _count(conn, model) for model in MODELS}
+
+
+def _query_params(conn: Connection) -> dict:
+    portfolio = conn.execute(
+        select(UserPortfolio.user_address, UserPortfolio.vault_id, UserPortfolio.status)
+        .order_by(func.random())
+        .limit(1)
+    ).one()
+    user_points_id = conn.execute(
+        select(UserPointsHistory.user_points_id).order_by(func.random()).limit(1)
+    ).scalar_one_or_none()
+    return {
+        "vault_id": portfolio.vault_id,
+        "user_address": portfolio.user_address,
+        # the enum is stored by name
+        "status": portfolio.status.name,
+        "user_points_id": user_points_id or uuid.uuid4(),
+    }
+
+
+def explain(conn: Connection, params: dict, iterations: int) -> Dict[str, float]:
+    """Best execution time in ms of every query over ``iterations`` runs."""
+    timings = {}
+    for name, query in QUERIES.items():
+        best = None
+        for _ in range(iterations):
+            plan = conn.execute(
+                text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), params
+            ).scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            execution_time = plan[0]["Execution Time"]
+            best = execution_time if best is None else min(best, execution_time)
+        timings[name] = best
+    return timings
+
+
+def run_scale(scale: int, min_rows: int, iterations: int) -> dict:
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            started_at = time.perf_counter()
+            counts = seed(conn, scale, min_rows)
+            logger.info(
+                "Seeded x%s in %.1fs: %s", scale, time.perf_counter() - started_at, counts
+            )
+            params = _query_params(conn)
+
+            indexes = _composite_indexes()
+            for index in indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            conn.execute(text("ANALYZE"))
+            before = explain(conn, params, iterations)
+
+            for index in indexes:
+                index.create(conn)
+            conn.execute(text("ANALYZE"))
+            after = explain(conn, params, iterations)
+        finally:
+            transaction.rollback()
+
+    return {"scale": scale, "rows": counts, "before_ms": before, "after_ms": after}
+
+
+@click.command()
+@click.option("--scale", "scales", multiple=True, type=int, default=[10, 100], help="Volume multipliers to benchmark")
+@click.option("--min-rows", default=1000, help="Base row count of tables smaller than this")
+@click.option("--iterations", default=3, help="EXPLAIN ANALYZE runs per query, the best is kept")
+@click.option("--output", type=click.Path(), default=None, help="Write the results as JSON")
+def main(scales, min_rows: int, iterations: int, output: str):
+    setup_logging_to_console(level=logging.INFO, logger=logger)
+
+    results = [run_scale(scale, min_rows, iterations) for scale in scales]
+    for result in results:
+        logger.info("x%s", result["scale"])
+        for name in QUERIES:
+            before, after = result["before_ms"][name], result["after_ms"][name]
+            logger.info(
+                "  %-28s %10.3f ms -> %10.3f ms (%.1fx)",
+                name,
+                before,
+                after,
+                before / after if after else float("inf"),
+            )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Replay recorded vault logs through the listener's ``handle_events`` and
+measure the event pipeline: events/sec, p50/p99 latency per event and DB
+queries per event.
+
+The input is a JSONL file with one log per line, in the shape of the
+``event_data`` fixture of ``tests/test_web3_listener.py`` with hex strings for
+``data`` and ``topics``. Logs are routed to their event like the listener
+does, from the vaults in the database, and applied in batches of
+``--batch-size``; a batch size of 1 is the per-event ``handle_event`` path.
+Without a file, ``--synthetic`` deposit / withdrawal logs are generated for
+the active vaults, and ``--write`` saves them for later runs.
+
+Everything runs in one transaction rolled back at the end, the commits of
+``handle_events`` only release savepoints, so replaying against a local
+Postgres leaves it unchanged:
+
+    python -m benchmarks.replay_events events.jsonl --batch-size 1 --batch-size 100
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import click
+from hexbytes import HexBytes
+from sqlalchemy import event
+from sqlmodel import Session
+
+from core import constants
+from core.config import settings
+from core.db import engine
+from log import setup_logging_to_console
+from services.vault_registry import vault_registry
+from web3_listener import _build_routes, _log_position, _route_log, handle_events
+
+logger = logging.getLogger("replay_events")
+logger.setLevel(logging.INFO)
+
+SYNTHETIC_TOPICS = {
+    constants.OPTIONS_WHEEL_STRATEGY: [
+        settings.STABLECOIN_DEPOSIT_VAULT_FILTER_TOPICS,
+        settings.STABLECOIN_INITIATE_WITHDRAW_VAULT_FILTER_TOPICS,
+        settings.STABLECOIN_COMPLETE_WITHDRAW_VAULT_FILTER_TOPICS,
+    ],
+    constants.DELTA_NEUTRAL_STRATEGY: [
+        settings.DELTA_NEUTRAL_DEPOSIT_EVENT_TOPIC,
+        settings.DELTA_NEUTRAL_INITIATE_WITHDRAW_EVENT_TOPIC,
+        settings.DELTA_NEUTRAL_COMPLETE_WITHDRAW_EVENT_TOPIC,
+    ],
+}
+
+
+class QueryCounter:
+    """Counts the statements sent to Postgres by every connection of the engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def load_logs(path: str) -> List[dict]:
+    logs = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            entry["data"] = HexBytes(entry["data"])
+            entry["topics"] = [HexBytes(topic) for topic in entry["topics"]]
+            logs.append(entry)
+    return logs
+
+
+def write_logs(path: str, logs: List[dict]):
+    with open(path, "w") as f:
+        for entry in logs:
+            record = dict(entry)
+            record["data"] = "0x" + bytes(entry["data"]).hex()
+            record["topics"] = ["0x" + bytes(topic).hex() for topic in entry["topics"]]
+            f.write(json.dumps(record) + "\n")
+
+
+def synthetic_logs(count: int, users: int, seed: int = 0) -> List[dict]:
+    """Deposits, then withdrawal requests and withdrawals of the same users."""
+    rng = random.Random(seed)
+    vaults = [
+        vault
+        for vault in vault_registry.get_active_vaults()
+        if vault.contract_address and vault.strategy_name in SYNTHETIC_TOPICS
+    ]
+    if not vaults:
+        raise ValueError("No active vault to generate logs for")
+
+    addresses = [bytes(12) + rng.randbytes(20) for _ in range(users)]
+    logs = []
+    block_number = 1
+    for index in range(count):
+        vault = rng.choice(vaults)
+        # mostly deposits, the rest split between the withdrawal steps
+        kind = 0 if rng.random() < 0.6 else rng.choice([1, 2])
+        amount = rng.randrange(10**6, 10**10)
+        logs.append(
+            {
+                "removed": False,
+                "logIndex": index % 100,
+                "transactionIndex": 0,
+                "transactionHash": "0x" + uuid.UUID(int=rng.getrandbits(128)).hex * 2,
+                "blockHash": "0x" + "00" * 32,
+                "blockNumber": block_number,
+                "address": vault.contract_address,
+                "data": HexBytes(amount.to_bytes(32, "big") + amount.to_bytes(32, "big")),
+                "topics": [
+                    HexBytes(SYNTHETIC_TOPICS[vault.strategy_name][kind]),
+                    HexBytes(rng.choice(addresses)),
+                ],
+            }
+        )
+        if index % 100 == 99:
+            block_number += 1
+    return logs
+
+
+def route_logs(logs: List[dict]) -> Tuple[List[Tuple[str, dict, str]], int]:
+    """The (vault_address, entry, event_name) of every log, and the count of unroutable logs."""
+    routes = _build_routes([vault for vault in vault_registry.all() if vault.contract_address])
+    events = []
+    for entry in sorted(logs, key=_log_position):
+        event_name = _route_log(routes, entry)
+        if event_name is not None:
+            events.append((entry["address"], entry, event_name))
+    return events, len(logs) - len(events)
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def replay(events: List[Tuple[str, dict, str]], batch_size: int) -> Dict[str, float]:
+    """Apply ``events`` in batches, every event's latency is the time until its batch committed."""
+    latencies: List[float] = []
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            db_session = Session(bind=conn, join_transaction_mode="create_savepoint")
+            with QueryCounter() as counter:
+                started_at = time.perf_counter()
+                for start in range(0, len(events), batch_size):
+                    batch = events[start : start + batch_size]
+                    batch_started_at = time.perf_counter()
+                    handle_events(batch, db_session=db_session)
+                    latencies.extend([time.perf_counter() - batch_started_at] * len(batch))
+                elapsed = time.perf_counter() - started_at
+            db_session.close()
+        finally:
+            transaction.rollback()
+
+    return {
+        "batch_size": batch_size,
+        "events": len(events),
+        "seconds": elapsed,
+        "events_per_second": len(events) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "queries": counter.count,
+        "queries_per_event": counter.count / len(events) if events else 0.0,
+    }
+
+
+@click.command()
+@click.argument("path", type=click.Path(exists=True), required=False)
+@click.option("--synthetic", default=10_000, help="Logs to generate when no file is given")
+@click.option("--users", default=1000, help="Distinct users of the generated logs")
+@click.option("--write", type=click.Path(), default=None, help="Save the generated logs as JSONL")
+@click.option("--batch-size", "batch_sizes", multiple=True, type=int, default=[1, settings.WEB3_LISTENER_MAX_BATCH_SIZE], help="Events per handle_events call")
+@click.option("--output", type=click.Path(), default=None, help="Write the results as JSON")
+def main(
+    path: Optional[str],
+    synthetic: int,
+    users: int,
+    write: Optional[str],
+    batch_sizes,
+    output: Optional[str],
+):
+    setup_logging_to_console(level=logging.INFO, logger=logger)
+    # the per-event logs of the handlers would dominate the timings
+    logging.getLogger("web3_listener").setLevel(logging.WARNING)
+
+    if path is not None:
+        logs = load_logs(path)
+    else:
+        logs = synthetic_logs(synthetic, users)
+        if write:
+            write_logs(write, logs)
+
+    events, skipped = route_logs(logs)
+    logger.info("Replaying %s events, %s logs of unknown vaults or topics skipped", len(events), skipped)
+
+    results = [replay(events, batch_size) for batch_size in batch_sizes]
+    for result in results:
+        logger.info(
+            "batch %5s: %9.1f events/s, p50 %8.2f ms, p99 %8.2f ms, %.2f queries/event",
+            result["batch_size"],
+            result["events_per_second"],
+            result["p50_ms"],
+            result["p99_ms"],
+            result["queries_per_event"],
+        )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({"skipped": skipped, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,183 +1,198 @@
+"""
+Recover the vault events the web3 listener missed.
+
+Deposited / InitiateWithdrawal / Withdrawn logs of the active vaults of every
+chain are pulled for the last days with chunked eth_getLogs. Transactions
+already recorded are dropped with one query per chunk, and the rest go
+through the listener's ``handle_events``. The scan stops at the listener
+checkpoint of the chain: later logs are still the listener's to apply.
+``--rpc-url`` points a single-chain scan at a local dev chain.
+"""
+
+import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+import time
+from typing import Dict, List, Optional, Tuple
 
-import pendulum
-import requests
+import click
 import seqlog
-from dateutil.relativedelta import FR, relativedelta
+from aiohttp import ClientSession, ClientTimeout
 from sqlmodel import Session, select
+from web3 import AsyncWeb3
 
 from core.config import settings
 from core.db import engine
+from core.web3_provider import ensure_async_session, get_async_web3, run_async
 from log import setup_logging_to_file
-from models import (PositionStatus, PricePerShareHistory, Transaction,
-                    UserPortfolio, Vault)
-from models.pps_history import PricePerShareHistory
-from models.vault_performance import VaultPerformance
+from models import Transaction, Vault
 from models.vaults import NetworkChain
-from utils.calculate_price import calculate_avg_entry_price
+from services.listener_checkpoint import END_OF_BLOCK, get_checkpoints
+from web3_listener import handle_events, iter_vault_logs
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
-START_BLOCK = 0
-END_BLOCK = 99999999
-OFFSET = 100
 THREE_DAYS_AGO = 3 * 24 * 60 * 60
 
-api_key = settings.ARBISCAN_API_KEY
-url = settings.ARBISCAN_GET_TRANSACTIONS_URL
-
 session = Session(engine)
 
 
-def decode_transaction_input(transaction):
-    transaction_amount = int(transaction["input"][10:74], 16)
-    transaction_amount = transaction_amount / 1e6
-    return transaction_amount
-
-
-def get_transactions(vault_address, page):
-    query_params = {
-        "address": vault_address,
-        "startblock": START_BLOCK,
-        "endblock": END_BLOCK,
-        "page": page,
-        "offset": OFFSET,
-        "sort": "desc",
-        "apikey": api_key,
-    }
-    api_url = (
-        f"{url}&{'&'.join(f'{key}={value}' for key, value in query_params.items())}"
+async def find_block_by_timestamp(w3: AsyncWeb3, timestamp: int, head: int) -> int:
+    """First block mined at or after ``timestamp``, by binary search."""
+    low, high = 0, head
+    while low < high:
+        mid = (low + high) // 2
+        block = await w3.eth.get_block(mid)
+        if block["timestamp"] < timestamp:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+
+def get_scan_end_block(network_chain: str, head: int) -> int:
+    checkpoints = get_checkpoints(session, network_chain)
+    if not checkpoints:
+        return head
+
+    # the slowest listener partition, a partially applied block is left to it
+    block_number, log_index = min(checkpoints.values())
+    return min(head, block_number if log_index == END_OF_BLOCK else block_number - 1)
+
+
+def apply_missing_events(
+    events: List[Tuple[str, dict, str]], dry_run: bool = False
+) -> int:
+    """Apply the events whose transaction is not recorded yet, returns their count."""
+    txhashes = {entry["transactionHash"] for _, entry, _ in events}
+    existing_txhashes = set(
+        session.exec(
+            select(Transaction.txhash).where(Transaction.txhash.in_(txhashes))
+        ).all()
     )
-    response = requests.get(api_url)
-    response_json = response.json()
-    transactions = response_json["result"]
-    return transactions
-
-
-def check_missing_transactions():
 
+    missing_events = [
+        event for event in events if event[1]["transactionHash"] not in existing_txhashes
+    ]
+    for vault_address, entry, event_name in missing_events:
+        logger.info(
+            "Missing %s %s in vault %s",
+            event_name,
+            entry["transactionHash"],
+            vault_address,
+        )
+
+    if missing_events and not dry_run:
+        handle_events(missing_events, db_session=session)
+    return len(missing_events)
+
+
+async def scan_chain(
+    network_chain: NetworkChain,
+    vaults: List[Vault],
+    since: int,
+    rpc_url: Optional[str] = None,
+    dry_run: bool = False,
+) -> int:
+    rpc_session = None
+    if rpc_url is not None:
+        # the pooled sessions only serve the configured RPCs, this one is ours to close
+        rpc_session = ClientSession(
+            timeout=ClientTimeout(total=settings.WEB3_HTTP_TIMEOUT_SECONDS)
+        )
+        w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url))
+        await w3.provider.cache_async_session(rpc_session)
+    else:
+        await ensure_async_session(network_chain)
+        w3 = get_async_web3(network_chain)
+
+    try:
+        head = await w3.eth.block_number
+        from_block = await find_block_by_timestamp(w3, since, head)
+        to_block = get_scan_end_block(network_chain.value, head)
+
+        missing = 0
+        async for _, events in iter_vault_logs(w3, vaults, from_block, to_block):
+            if events:
+                missing += apply_missing_events(events, dry_run=dry_run)
+    finally:
+        if rpc_session is not None:
+            await rpc_session.close()
+
+    logger.info(
+        "Scanned blocks %s-%s of %s vaults on %s: %s missing events",
+        from_block,
+        to_block,
+        len(vaults),
+        network_chain.value,
+        missing,
+    )
+    return missing
+
+
+async def check_missing_transactions(
+    seconds: int = THREE_DAYS_AGO,
+    network_chains: Optional[List[NetworkChain]] = None,
+    rpc_url: Optional[str] = None,
+    dry_run: bool = False,
+) -> Dict[NetworkChain, object]:
+    """
+    Scan every chain concurrently. Returns chain -> missing event count, or
+    the exception which failed the chain's scan.
+    """
     # query all active vaults
-    vaults = session.exec(
-        select(Vault)
-        .where(Vault.is_active == True)
-        .where(Vault.network_chain == NetworkChain.arbitrum_one)
-    ).all()
-
-    timestamp_three_days_ago = float(datetime.now().timestamp()) - THREE_DAYS_AGO
-    flag = True
+    vaults = session.exec(select(Vault).where(Vault.is_active == True)).all()
 
+    vaults_by_chain: Dict[NetworkChain, List[Vault]] = {}
     for vault in vaults:
-        page = 1
-
-        while flag:
-            transactions = get_transactions(vault.contract_address, page)
-            if transactions == "Max rate limit reached":
-                break
-            if not transactions:
-                break
-            for transaction in transactions:
-                transaction_timestamp = float(transaction["timeStamp"])
-                if transaction_timestamp > timestamp_three_days_ago:
-                    from_address = transaction["from"]
-
-                    transaction_date = pendulum.from_timestamp(
-                        int(transaction["timeStamp"]), tz=pendulum.UTC
-                    )
-                    transaction_date = datetime(
-                        transaction_date.year,
-                        transaction_date.month,
-                        transaction_date.day,
-                    )
-                    # get price per share from range friday to friday
-                    last_friday = transaction_date + relativedelta(weekday=FR(-1))
-                    this_thursday = last_friday + timedelta(days=6)
-
-                    history_pps = session.exec(
-                        select(PricePerShareHistory)
-                        .where(PricePerShareHistory.vault_id == vault.id)
-                        .where(PricePerShareHistory.datetime >= last_friday)
-                        .where(PricePerShareHistory.datetime <= this_thursday)
-                        .order_by(PricePerShareHistory.datetime.desc())
-                    ).first()
-
-                    if history_pps is not None:
-                        history_pps = history_pps[0].price_per_share
-                    else:
-                        history_pps = 1
-
-                    user_portfolio = session.exec(
-                        select(UserPortfolio)
-                        .where(UserPortfolio.user_address == from_address)
-                        .where(UserPortfolio.vault_id == vault.id)
-                        .where(UserPortfolio.status == PositionStatus.ACTIVE)
-                    ).first()
-
-                    if (
-                        transaction["functionName"]
-                        == "deposit(uint256 visrDeposit, address from, address to)"
-                    ):
-                        transaction_hash = transaction["hash"]
-                        existing_transaction = session.exec(
-                            select(Transaction).where(
-                                Transaction.txhash == transaction_hash
-                            )
-                        ).first()
-                        if existing_transaction is None:
-                            trx = Transaction(
-                                txhash=transaction_hash,
-                            )
-                            session.add(trx)
-                            value = decode_transaction_input(transaction)
-                            if user_portfolio is None:
-                                # Create new user_portfolio for this user address
-                                user_portfolio = UserPortfolio(
-                                    vault_id=vault.id,
-                                    user_address=from_address,
-                                    total_balance=value,
-                                    init_deposit=value,
-                                    entry_price=history_pps,
-                                    pnl=0,
-                                    status=PositionStatus.ACTIVE,
-                                    trade_start_date=datetime.now(timezone.utc),
-                                    total_shares=value / history_pps,
-                                )
-                                session.add(user_portfolio)
-                                logger.info(
-                                    f"User with address {from_address} added to user_portfolio table"
-                                )
-                            else:
-                                # Update the user_portfolio
-                                user_portfolio = user_portfolio[0]
-                                user_portfolio.total_balance += value
-                                user_portfolio.init_deposit += value
-                                user_portfolio.entry_price = calculate_avg_entry_price(
-                                    user_portfolio, history_pps, value
-                                )
-                                user_portfolio.total_shares += value / history_pps
-                                session.add(user_portfolio)
-                                logger.info(
-                                    f"User with address {from_address} updated in user_portfolio table"
-                                )
-                        else:
-                            logger.info(
-                                f"Transaction with txhash {transaction_hash} already exists"
-                            )
-                else:
-                    flag = False
-                    break
-            page += 1
-            if not flag:
-                break
-    session.commit()
+        if vault.network_chain is None or not vault.contract_address:
+            continue
+        if network_chains and vault.network_chain not in network_chains:
+            continue
+        vaults_by_chain.setdefault(NetworkChain(vault.network_chain), []).append(vault)
+
+    since = int(time.time()) - seconds
+    chains = list(vaults_by_chain.keys())
+    results = await asyncio.gather(
+        *[
+            scan_chain(chain, vaults_by_chain[chain], since, rpc_url, dry_run)
+            for chain in chains
+        ],
+        return_exceptions=True,
+    )
 
+    report = dict(zip(chains, results))
+    for chain, result in report.items():
+        if isinstance(result, Exception):
+            logger.error("Scan of %s failed: %s", chain.value, result, exc_info=result)
+    return report
 
-if __name__ == "__main__":
+
+@click.command()
+@click.option("--days", default=3, help="How far back to scan")
+@click.option("--chain", "chains", multiple=True, help="Chains to scan, all by default")
+@click.option("--rpc-url", default=None, help="RPC endpoint to scan instead, e.g. a local dev chain")
+@click.option("--dry-run", is_flag=True, help="Only log the missing events")
+def main(days: int, chains: Tuple[str, ...], rpc_url: Optional[str], dry_run: bool):
     setup_logging_to_file(
         app="check_transaction_missing_every_three_days", level=logging.INFO, logger=logger
     )
 
     if settings.SEQ_SERVER_URL is not None or settings.SEQ_SERVER_URL != "":
         seqlog.configure_from_file("./config/seqlog.yml")
-    
-    check_missing_transactions()
+
+    network_chains = [NetworkChain[chain.lower()] for chain in chains]
+    if rpc_url is not None and len(network_chains) != 1:
+        raise click.UsageError("--rpc-url needs exactly one --chain")
+
+    run_async(
+        check_missing_transactions(
+            seconds=days * 24 * 60 * 60,
+            network_chains=network_chains,
+            rpc_url=rpc_url,
+            dry_run=dry_run,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
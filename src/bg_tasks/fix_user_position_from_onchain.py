@@ -11,29 +11,43 @@ totalBalance = shares * pps
 - shares
 - totalBalance
 
-
+Whole vaults are reconciled in bulk: pricePerShare is read once per vault, the
+per-user reads go out as JSON-RPC batches of eth_call (they depend on
+msg.sender, so Multicall3 cannot serve them), positions are diffed in memory
+and only the drifted rows are written, with one bulk UPDATE per vault.
 """
 
+import json
+import logging
+import math
+from typing import Dict, List, Optional
+
+import click
+from sqlalchemy import update
 from sqlmodel import Session, select
 from web3 import Web3
 from web3.contract import Contract
 
 from core import constants
-from core.abi_reader import read_abi
 from core.db import engine
+from core.web3_provider import get_async_contract, get_contract, get_web3, run_async
+from log import setup_logging_to_console
 from models.user_portfolio import PositionStatus, UserPortfolio
 from models.vaults import Vault
+from services.onchain_reader import ContractCall, batch_eth_call, read_contracts
+
+logger = logging.getLogger("fix_user_position_from_onchain")
+logger.setLevel(logging.INFO)
 
 session = Session(engine)
 
+RECONCILED_FIELDS = ["init_deposit", "total_shares", "total_balance", "pending_withdrawal"]
 
-def get_vault_contract(vault: Vault, contract_abi_name) -> tuple[Contract, Web3]:
-    w3 = Web3(Web3.HTTPProvider(constants.NETWORK_RPC_URLS[vault.network_chain]))
 
-    rockonyx_delta_neutral_vault_abi = read_abi(contract_abi_name)
-    vault_contract = w3.eth.contract(
-        address=vault.contract_address,
-        abi=rockonyx_delta_neutral_vault_abi,
+def get_vault_contract(vault: Vault, contract_abi_name) -> tuple[Contract, Web3]:
+    w3 = get_web3(vault.network_chain)
+    vault_contract = get_contract(
+        vault.network_chain, vault.contract_address, contract_abi_name
     )
     return vault_contract, w3
 
@@ -63,38 +77,128 @@ def get_pps(vault_contract: Contract) -> int:
     return pps
 
 
-def fix_user_position_for_vault(vault: Vault):
-    abi_name = (
+def _get_abi_name(vault: Vault) -> str:
+    return (
         "rockonyxdeltaneutralvault"
         if vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY
         else "rockonyxstablecoin"
     )
-    vault_contract, w3 = get_vault_contract(vault, abi_name)
 
+
+def _onchain_position(user_state, pps: int, pending_withdrawal: int) -> Dict[str, float]:
+    return {
+        "init_deposit": user_state[0] / 1e6,
+        "total_shares": user_state[1] / 1e6,
+        "total_balance": (user_state[1] * pps) / 1e12,
+        "pending_withdrawal": pending_withdrawal / 1e6,
+    }
+
+
+def _has_drifted(db_value: Optional[float], onchain_value: float) -> bool:
+    if db_value is None:
+        return True
+    # amounts are 6 decimals tokens, anything below that is float noise
+    return not math.isclose(db_value, onchain_value, rel_tol=1e-9, abs_tol=1e-6)
+
+
+async def read_onchain_positions(
+    vault: Vault, user_positions: List[UserPortfolio]
+) -> Dict[int, Dict[str, float]]:
+    """position id -> on-chain values, or the exception of a failed read."""
+    vault_contract = get_async_contract(
+        vault.network_chain, vault.contract_address, _get_abi_name(vault)
+    )
+    (pps,) = await read_contracts(
+        [ContractCall(vault.network_chain, vault_contract, "pricePerShare")],
+        use_cache=False,
+    )
+
+    calls = []
+    for user_portfolio in user_positions:
+        for function_name in ["getUserVaultState", "getUserWithdrawlShares"]:
+            calls.append(
+                ContractCall(
+                    vault.network_chain,
+                    vault_contract,
+                    function_name,
+                    sender=user_portfolio.user_address,
+                )
+            )
+    values = await batch_eth_call(calls, return_exceptions=True)
+
+    onchain_positions = {}
+    for index, user_portfolio in enumerate(user_positions):
+        user_state, pending_withdrawal = values[2 * index], values[2 * index + 1]
+        if isinstance(user_state, Exception):
+            onchain_positions[user_portfolio.id] = user_state
+        elif isinstance(pending_withdrawal, Exception):
+            onchain_positions[user_portfolio.id] = pending_withdrawal
+        else:
+            onchain_positions[user_portfolio.id] = _onchain_position(
+                user_state, pps, pending_withdrawal
+            )
+    return onchain_positions
+
+
+def fix_user_position_for_vault(vault: Vault, dry_run: bool = False) -> List[dict]:
+    """
+    Reconcile the active positions of the vault with the chain. Returns the
+    drift report, one entry per drifted field or failed read.
+    """
     user_positions = session.exec(
         select(UserPortfolio)
         .where(UserPortfolio.vault_id == vault.id)
         .where(UserPortfolio.status == PositionStatus.ACTIVE)
     ).all()
+    if not user_positions:
+        return []
 
-    for user_portfolio in user_positions:
-        user_state = get_user_state(vault_contract, user_portfolio.user_address)
-        pps = get_pps(vault_contract)
-        total_balance = (user_state[1] * pps) / 1e12
-        user_portfolio.init_deposit = user_state[0] / 1e6
-        user_portfolio.total_shares = user_state[1] / 1e6
-        user_portfolio.total_balance = total_balance
-
-        pending_withdrawal = get_pending_withdrawal_shares(
-            vault_contract, user_portfolio.user_address
-        )
-        user_portfolio.pending_withdrawal = pending_withdrawal / 1e6
+    onchain_positions = run_async(read_onchain_positions(vault, user_positions))
 
-        session.add(user_portfolio)
+    drift = []
+    changed_rows = []
+    for user_portfolio in user_positions:
+        onchain_position = onchain_positions[user_portfolio.id]
+        if isinstance(onchain_position, Exception):
+            drift.append(
+                {
+                    "vault": vault.contract_address,
+                    "user_address": user_portfolio.user_address,
+                    "error": str(onchain_position),
+                }
+            )
+            continue
+
+        changes = {}
+        for field in RECONCILED_FIELDS:
+            db_value = getattr(user_portfolio, field)
+            if _has_drifted(db_value, onchain_position[field]):
+                changes[field] = onchain_position[field]
+                drift.append(
+                    {
+                        "vault": vault.contract_address,
+                        "user_address": user_portfolio.user_address,
+                        "field": field,
+                        "db": db_value,
+                        "onchain": onchain_position[field],
+                    }
+                )
+        if changes:
+            changed_rows.append({"id": user_portfolio.id, **changes})
+
+    if changed_rows and not dry_run:
+        # bulk UPDATE by primary key, one executemany for the vault
+        session.execute(update(UserPortfolio), changed_rows)
         session.commit()
-        print(f"User {user_portfolio.user_address} position updated")
-    
-    print(f"Vault {vault.contract_address} user positions updated")
+
+    logger.info(
+        "Vault %s: %s positions, %s drifted%s",
+        vault.contract_address,
+        len(user_positions),
+        len(changed_rows),
+        " (dry run)" if dry_run else "",
+    )
+    return drift
 
 
 def fix_user_position_by_address(vault: Vault, user_address: str):
@@ -104,12 +208,7 @@ def fix_user_position_by_address(vault: Vault, user_address: str):
         .where(UserPortfolio.status == PositionStatus.ACTIVE)
     ).first()
 
-    abi_name = (
-        "rockonyxdeltaneutralvault"
-        if vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY
-        else "rockonyxstablecoin"
-    )
-    vault_contract, w3 = get_vault_contract(vault, abi_name)
+    vault_contract, w3 = get_vault_contract(vault, _get_abi_name(vault))
     
     user_state = get_user_state(vault_contract, user_address)
     pps = get_pps(vault_contract)
@@ -136,18 +235,37 @@ def fix_user_position_by_address(vault: Vault, user_address: str):
     session.add(user_portfolio)
     session.commit()
 
-def main():
-    # vaults = session.exec(
-    #     select(Vault).where(Vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY)
-    # ).all()
-    # for vault in vaults:
-    #     fix_user_position_for_vault(vault)
-
-    vault = session.exec(
-        select(Vault).where(Vault.id == '65f75bd7-a2d2-4764-ae31-78e4bb132c62')
-    ).first()
-
-    fix_user_position_by_address(vault, '0x7354F8aDFDfc6ca4D9F81Fc20d04eb8A7b11b01b'.lower())
+@click.command()
+@click.option("--vault-id", "vault_ids", multiple=True, help="Vaults to reconcile, all active delta neutral vaults by default")
+@click.option("--dry-run", is_flag=True, help="Only report the drift")
+@click.option("--report", "report_path", type=click.Path(), default=None, help="Write the drift report as JSON")
+def main(vault_ids, dry_run: bool, report_path: Optional[str]):
+    setup_logging_to_console(level=logging.INFO, logger=logger)
+
+    # only the delta neutral vaults expose getUserVaultState / getUserWithdrawlShares
+    statement = (
+        select(Vault)
+        .where(Vault.is_active == True)
+        .where(Vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY)
+    )
+    if vault_ids:
+        statement = select(Vault).where(Vault.id.in_(vault_ids))
+    vaults = session.exec(statement).all()
+
+    drift = []
+    for vault in vaults:
+        try:
+            drift.extend(fix_user_position_for_vault(vault, dry_run=dry_run))
+        except Exception as e:
+            session.rollback()
+            logger.error("Failed to reconcile vault %s: %s", vault.contract_address, e, exc_info=True)
+            drift.append({"vault": vault.contract_address, "error": str(e)})
+
+    for entry in drift:
+        logger.info("Drift: %s", entry)
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(drift, f, indent=2, default=str)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 import logging
 from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import Session, select
-from uuid import UUID
+from uuid import UUID, uuid4
 from log import setup_logging_to_file
 from models.point_distribution_history import PointDistributionHistory
 from models.points_multiplier_config import PointsMultiplierConfig
@@ -22,7 +25,7 @@ logger = logging.getLogger(__name__)
 session = Session(engine)
 
 
-def harmonix_distribute_points(current_time):
+def _get_active_reward_session(current_time):
     # get reward session with end_date = null, and partner_name = Harmonix
     reward_session_query = (
         select(RewardSessions)
@@ -33,7 +36,7 @@ def harmonix_distribute_points(current_time):
 
     if not reward_session:
         logger.info("No active reward session found for Harmonix.")
-        return
+        return None
 
     # get reward session config
     reward_session_config_query = select(RewardSessionConfig).where(
@@ -42,7 +45,7 @@ def harmonix_distribute_points(current_time):
     reward_session_config = session.exec(reward_session_config_query).first()
     if not reward_session_config:
         logger.info("No reward session config found for Harmonix.")
-        return
+        return None
     session_start_date = reward_session.start_date.replace(tzinfo=timezone.utc)
     session_end_date = (
         session_start_date
@@ -52,11 +55,11 @@ def harmonix_distribute_points(current_time):
         reward_session.end_date = current_time
         session.commit()
         logger.info(f"{reward_session.session_name} has ended.")
-        return
+        return None
 
     if current_time < session_start_date:
         logger.info(f"{reward_session.session_name} has not started yet.")
-        return
+        return None
     total_points_distributed = 0
     if (
         reward_session.points_distributed is not None
@@ -80,8 +83,17 @@ def harmonix_distribute_points(current_time):
         logger.info(
             f"Maximum points for {reward_session.session_name} have been distributed."
         )
-        return
+        return None
 
+    return (
+        reward_session,
+        reward_session_config,
+        session_start_date,
+        total_points_distributed,
+    )
+
+
+def _get_multipliers():
     # get all points mutiplier config and make a dictionary with vault_id as key
     multiplier_config_query = select(PointsMultiplierConfig)
     multiplier_configs = session.exec(multiplier_config_query).all()
@@ -91,6 +103,25 @@ def harmonix_distribute_points(current_time):
             multiplier_config.multiplier
         )
 
+    return multiplier_config_dict
+
+
+def harmonix_distribute_points_row_by_row(current_time):
+    """
+    One query and commit per portfolio. Superseded by
+    harmonix_distribute_points and kept as its reference.
+    """
+    active_session = _get_active_reward_session(current_time)
+    if active_session is None:
+        return
+    (
+        reward_session,
+        reward_session_config,
+        session_start_date,
+        total_points_distributed,
+    ) = active_session
+    multiplier_config_dict = _get_multipliers()
+
     # Fetch active user portfolios
     active_portfolios_query = select(UserPortfolio).where(
         UserPortfolio.status == PositionStatus.ACTIVE
@@ -194,6 +225,162 @@ def harmonix_distribute_points(current_time):
     logger.info("Points distribution job completed.")
 
 
+def accrue_harmonix_points(
+    portfolios,
+    user_points: Dict[Tuple[str, UUID], Tuple[UUID, datetime]],
+    multipliers: Dict[UUID, float],
+    session_id: UUID,
+    session_start_date: datetime,
+    current_time: datetime,
+    max_points: float,
+    total_points_distributed: float,
+):
+    """
+    Compute the points of every portfolio for the interval in one pass.
+
+    ``portfolios`` are (vault_id, user_address, total_balance, trade_start_date)
+    rows sorted by trade_start_date, the max points cap is applied in that
+    order. ``user_points`` maps (wallet_address, vault_id) to the id and last
+    accrual time of the session's user points. Returns the user points rows
+    to upsert, holding the points to add, the history rows and the new total.
+    """
+    user_points_rows = {}
+    history = []
+    for vault_id, user_address, total_balance, trade_start_date in portfolios:
+        if vault_id not in multipliers:
+            continue
+
+        key = (user_address, vault_id)
+        if key in user_points:
+            user_points_id, accrued_since = user_points[key]
+            accrued_since = accrued_since.replace(tzinfo=timezone.utc)
+        else:
+            user_points_id = uuid4()
+            accrued_since = max(
+                session_start_date.replace(tzinfo=timezone.utc),
+                trade_start_date.replace(tzinfo=timezone.utc),
+            )
+
+        duration_hours = (current_time - accrued_since).total_seconds() / 3600
+        points = (total_balance / 100) * duration_hours * multipliers[vault_id]
+
+        # Check if the total points exceed the maximum allowed
+        if total_points_distributed + points > max_points:
+            points = max_points - total_points_distributed
+
+        user_points[key] = (user_points_id, current_time)
+        row = user_points_rows.setdefault(
+            user_points_id,
+            {
+                "id": user_points_id,
+                "vault_id": vault_id,
+                "wallet_address": user_address,
+                "points": 0,
+                "partner_name": constants.HARMONIX,
+                "session_id": session_id,
+                "created_at": current_time,
+                "updated_at": current_time,
+            },
+        )
+        row["points"] += points
+        history.append(
+            {
+                "id": uuid4(),
+                "user_points_id": user_points_id,
+                "point": points,
+                "created_at": current_time,
+            }
+        )
+
+        total_points_distributed += points
+        if total_points_distributed >= max_points:
+            break
+
+    return list(user_points_rows.values()), history, total_points_distributed
+
+
+def harmonix_distribute_points(current_time):
+    active_session = _get_active_reward_session(current_time)
+    if active_session is None:
+        return
+    (
+        reward_session,
+        reward_session_config,
+        session_start_date,
+        total_points_distributed,
+    ) = active_session
+    multiplier_config_dict = _get_multipliers()
+
+    # Fetch active user portfolios of the vaults which earn points
+    active_portfolios = session.exec(
+        select(
+            UserPortfolio.vault_id,
+            UserPortfolio.user_address,
+            UserPortfolio.total_balance,
+            UserPortfolio.trade_start_date,
+        )
+        .where(UserPortfolio.status == PositionStatus.ACTIVE)
+        .where(UserPortfolio.vault_id.in_(multiplier_config_dict.keys()))
+        .order_by(UserPortfolio.trade_start_date, UserPortfolio.id)
+    ).all()
+
+    # user points of the session with the time of their last accrual
+    user_points_query = (
+        select(
+            UserPoints.id,
+            UserPoints.wallet_address,
+            UserPoints.vault_id,
+            func.coalesce(func.max(UserPointsHistory.created_at), UserPoints.updated_at),
+        )
+        .outerjoin(UserPointsHistory, UserPointsHistory.user_points_id == UserPoints.id)
+        .where(UserPoints.partner_name == constants.HARMONIX)
+        .where(UserPoints.session_id == reward_session.session_id)
+        .group_by(UserPoints.id)
+    )
+    user_points = {}
+    for user_points_id, wallet_address, vault_id, accrued_at in session.exec(
+        user_points_query
+    ).all():
+        user_points.setdefault((wallet_address, vault_id), (user_points_id, accrued_at))
+
+    user_points_rows, history, total_points_distributed = accrue_harmonix_points(
+        active_portfolios,
+        user_points,
+        multiplier_config_dict,
+        reward_session.session_id,
+        session_start_date,
+        current_time,
+        reward_session_config.max_points,
+        total_points_distributed,
+    )
+
+    try:
+        if user_points_rows:
+            # new user points are inserted, existing ones get the points added
+            statement = insert(UserPoints)
+            statement = statement.on_conflict_do_update(
+                index_elements=[UserPoints.id],
+                set_={
+                    "points": UserPoints.points + statement.excluded.points,
+                    "updated_at": statement.excluded.updated_at,
+                },
+            )
+            session.execute(statement, user_points_rows)
+            session.execute(insert(UserPointsHistory), history)
+
+        if total_points_distributed >= reward_session_config.max_points:
+            reward_session.end_date = current_time
+        reward_session.points_distributed = total_points_distributed
+        reward_session.update_date = current_time
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    logger.info(
+        "Points distribution job completed, %d positions accrued.", len(history)
+    )
+
+
 def update_vault_points(current_time):
     active_vaults_query = select(Vault).where(Vault.is_active == True)
     active_vaults = session.exec(active_vaults_query).all()
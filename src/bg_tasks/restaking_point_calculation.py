@@ -7,12 +7,16 @@ In our system, we have multiple vaults that have VaultCategory = points, we need
 
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, List
-from uuid import UUID
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from uuid import UUID, uuid4
 
+import numpy as np
 import seqlog
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import Session, col, select
 
 from core import constants
@@ -24,27 +28,49 @@ from models.user_points import UserPointAudit, UserPoints
 from models.user_portfolio import PositionStatus, UserPortfolio
 from models.vaults import Vault, VaultCategory
 from schemas import EarnedRestakingPoints
-from services import renzo_service, zircuit_service, kelpdao_service
+from services.partner_points_client import PARTNER_SERVICES, partner_points_client
 
 session = Session(engine)
 
-GET_POINTS_SERVICE = {
-    constants.RENZO: renzo_service.get_points,
-    constants.ZIRCUIT: zircuit_service.get_points,
-    constants.KELPDAO: kelpdao_service.get_points,
-}
-
-
 # # Initialize logger
 logger = logging.getLogger("restaking_point_calculation")
 logger.setLevel(logging.INFO)
 
 
-def get_earned_points(vault_address: str, partner_name: str) -> EarnedRestakingPoints:
-    assert partner_name in GET_POINTS_SERVICE, f"Partner {partner_name} not supported"
+async def get_earned_points(
+    vault_address: str, partner_name: str
+) -> EarnedRestakingPoints:
+    assert partner_name in PARTNER_SERVICES, f"Partner {partner_name} not supported"
+
+    return await partner_points_client.get_points(partner_name, vault_address)
 
-    get_points_func = GET_POINTS_SERVICE[partner_name]
-    return get_points_func(vault_address)
+
+async def fetch_earned_points(
+    vaults: List[Vault],
+) -> Dict[Tuple[str, str], EarnedRestakingPoints | BaseException]:
+    """
+    Fetch the earned points of every (vault address, partner) pair concurrently.
+    A failed pair maps to its exception so it only fails its own vault.
+    """
+    pairs = {}
+    for vault in vaults:
+        try:
+            partners = json.loads(vault.routes)
+        except (TypeError, ValueError) as e:
+            # the vault fails on its own when its points are calculated
+            logger.error("Skip vault %s with invalid routes: %s", vault.name, e)
+            continue
+        for partner_name in partners:
+            pairs.setdefault((vault.contract_address, partner_name), None)
+    pairs = list(pairs)
+
+    try:
+        results = await asyncio.gather(
+            *[get_earned_points(*pair) for pair in pairs], return_exceptions=True
+        )
+    finally:
+        await partner_points_client.aclose()
+    return dict(zip(pairs, results))
 
 
 def get_previous_point_distribution(vault_id: UUID, partner_name: str) -> float:
@@ -72,47 +98,72 @@ def distribute_points_to_users(
 ):
     """
     Distribute points to users based on their share percentages.
+
+    Share percentages are computed in one shot, the existing user points of
+    the (vault, partner) are prefetched with one query and the points plus
+    their audits are written as one batch each. The caller commits.
     """
-    total_deposit_amount = sum([user.init_deposit for user in user_positions])
-    for user in user_positions:
-        shares_pct = user.init_deposit / total_deposit_amount
-
-        old_point_value = 0
-        user_points = session.exec(
-            select(UserPoints)
-            .where(UserPoints.wallet_address == user.user_address)
-            .where(UserPoints.partner_name == partner_name)
-            .where(UserPoints.vault_id == vault_id)
-        ).first()
-
-        if user_points:
-            old_point_value = user_points.points
-            user_points.points += earned_points * shares_pct
-
-        else:
-            user_points = UserPoints(
-                wallet_address=user.user_address,
-                points=earned_points * shares_pct,
-                partner_name=partner_name,
-                vault_id=vault_id,
-            )
+    if not user_positions:
+        return
+
+    deposits = np.array([user.init_deposit for user in user_positions], dtype=float)
+    total_deposit_amount = deposits.sum()
+    if total_deposit_amount == 0:
+        raise ValueError(f"Total deposit of vault {vault_id} is zero")
+    shares_pct = deposits / total_deposit_amount
+    user_earned_points = earned_points * shares_pct
+
+    # wallet_address -> (user points id, points)
+    current_points: Dict[str, Tuple[UUID, float]] = {}
+    for user_points_id, wallet_address, points in session.exec(
+        select(UserPoints.id, UserPoints.wallet_address, UserPoints.points)
+        .where(UserPoints.partner_name == partner_name)
+        .where(UserPoints.vault_id == vault_id)
+    ).all():
+        current_points.setdefault(wallet_address, (user_points_id, points))
+
+    now = datetime.now(timezone.utc)
+    user_points_rows = {}
+    audits = []
+    for user, share_pct, points in zip(user_positions, shares_pct, user_earned_points):
+        user_points_id, old_point_value = current_points.get(
+            user.user_address, (uuid4(), 0)
+        )
+        new_point_value = old_point_value + float(points)
+        current_points[user.user_address] = (user_points_id, new_point_value)
 
         logger.info(
             "User %s, Share pct = %s, Points: %s",
             user.user_address,
-            shares_pct,
-            user_points.points,
+            share_pct,
+            new_point_value,
         )
-        session.add(user_points)
-        session.commit()
-
-        # add UserPointAudit record
-        audit = UserPointAudit(
-            user_points_id=user_points.id,
-            old_value=old_point_value,
-            new_value=user_points.points,
+        user_points_rows[user_points_id] = {
+            "id": user_points_id,
+            "wallet_address": user.user_address,
+            "points": new_point_value,
+            "partner_name": partner_name,
+            "vault_id": vault_id,
+            "created_at": now,
+            "updated_at": now,
+        }
+        audits.append(
+            {
+                "id": uuid4(),
+                "user_points_id": user_points_id,
+                "old_value": old_point_value,
+                "new_value": new_point_value,
+                "created_at": now,
+            }
         )
-        session.add(audit)
+
+    statement = insert(UserPoints)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserPoints.id],
+        set_={"points": statement.excluded.points},
+    )
+    session.execute(statement, list(user_points_rows.values()))
+    session.execute(insert(UserPointAudit), audits)
 
 
 def distribute_points(
@@ -144,7 +195,13 @@ def distribute_points(
     session.add(point_distribution)
 
 
-def calculate_point_distributions(vault: Vault):
+def calculate_point_distributions(
+    vault: Vault,
+    earned_points: Dict[Tuple[str, str], EarnedRestakingPoints | BaseException] = None,
+):
+    if earned_points is None:
+        earned_points = asyncio.run(fetch_earned_points([vault]))
+
     user_positions: List[UserPortfolio] = []
 
     # get all users who have points in the vault
@@ -167,7 +224,9 @@ def calculate_point_distributions(vault: Vault):
             prev_point,
         )
 
-        total_earned_points = get_earned_points(vault.contract_address, partner_name)
+        total_earned_points = earned_points[(vault.contract_address, partner_name)]
+        if isinstance(total_earned_points, BaseException):
+            raise total_earned_points
         total_earned_points.total_points = (
             total_earned_points.total_points
             if total_earned_points.total_points >= prev_point
@@ -238,11 +297,15 @@ def main():
         .where(Vault.is_active == True)
     ).all()
 
+    # query every partner up front, concurrently, instead of one by one
+    earned_points = asyncio.run(fetch_earned_points(vaults))
+
     for vault in vaults:
         try:
             logger.info(f"Calculating points for vault {vault.name}")
-            calculate_point_distributions(vault)
+            calculate_point_distributions(vault, earned_points)
         except Exception as e:
+            session.rollback()
             logger.error(
                 "An error occurred while calculating points for vault %s: %s",
                 vault.name,
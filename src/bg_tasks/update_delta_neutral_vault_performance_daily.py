@@ -1,6 +1,9 @@
+import asyncio
 import logging
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Union
 
 import click
 import pandas as pd
@@ -20,6 +23,13 @@ from core import constants
 from core.abi_reader import read_abi
 from core.config import settings
 from core.db import engine
+from core.web3_provider import (
+    ensure_async_session,
+    get_async_contract,
+    get_contract,
+    get_web3,
+    run_async,
+)
 from models import Vault
 from models.pps_history import PricePerShareHistory
 from models.user_portfolio import UserPortfolio
@@ -27,7 +37,12 @@ from models.vault_performance import VaultPerformance
 from models.vaults import NetworkChain
 from schemas.fee_info import FeeInfo
 from schemas.vault_state import VaultState
+from services.dashboard_stats import save_dashboard_stats_snapshot
+from services.history_loader import load_pps_history, load_vault_performance_history
+from services.latest_pps import upsert_latest_price_per_share
 from services.market_data import get_price
+from services.onchain_reader import ContractCall, read_contracts
+from services.pps_statistics import record_price_per_share
 
 if settings.SEQ_SERVER_URL is not None or settings.SEQ_SERVER_URL != "":
     seqlog.configure_from_file("./config/seqlog.yml")
@@ -39,26 +54,30 @@ logger.setLevel(logging.INFO)
 session = Session(engine)
 token_abi = read_abi("ERC20")
 
+# (price per share, total value locked, vault state) read from the vault contract
+OnchainState = Tuple[float, float, VaultState]
 
-def get_price_per_share_history(vault_id: uuid.UUID) -> pd.DataFrame:
-    pps_history = session.exec(
-        select(PricePerShareHistory)
-        .where(PricePerShareHistory.vault_id == vault_id)
-        .order_by(PricePerShareHistory.datetime.asc())
-    ).all()
 
-    # Convert the list of PricePerShareHistory objects to a DataFrame
-    pps_history_df = pd.DataFrame([vars(pps) for pps in pps_history])
+def get_price_per_share_history(
+    vault_id: uuid.UUID, db_session: Optional[Session] = None
+) -> pd.DataFrame:
+    pps_history_df = load_pps_history(db_session or session, vault_id)
+    pps_history_df["vault_id"] = vault_id
 
     return pps_history_df[["datetime", "price_per_share", "vault_id"]]
 
 
-def update_price_per_share(vault_id: uuid.UUID, current_price_per_share: float):
+def update_price_per_share(
+    vault_id: uuid.UUID,
+    current_price_per_share: float,
+    db_session: Optional[Session] = None,
+):
+    db_session = db_session or session
     # update today to hour with minute = 0 and second = 0
     today = pendulum.now(tz=pendulum.UTC).replace(minute=0, second=0, microsecond=0)
 
     # Check if a PricePerShareHistory record for today already exists
-    existing_pps = session.exec(
+    existing_pps = db_session.exec(
         select(PricePerShareHistory).where(
             PricePerShareHistory.vault_id == vault_id,
             PricePerShareHistory.datetime == today,
@@ -73,9 +92,11 @@ def update_price_per_share(vault_id: uuid.UUID, current_price_per_share: float):
         new_pps = PricePerShareHistory(
             datetime=today, price_per_share=current_price_per_share, vault_id=vault_id
         )
-        session.add(new_pps)
+        db_session.add(new_pps)
 
-    session.commit()
+    upsert_latest_price_per_share(db_session, vault_id, current_price_per_share, today)
+    record_price_per_share(db_session, vault_id, today, current_price_per_share)
+    db_session.commit()
 
 
 def get_current_pps(vault_contract: Contract):
@@ -105,6 +126,10 @@ def get_vault_state(vault_contract: Contract, owner_address: str):
     state = vault_contract.functions.getVaultState().call(
         {"from": Web3.to_checksum_address(owner_address)}
     )
+    return _to_vault_state(state)
+
+
+def _to_vault_state(state) -> VaultState:
     vault_state = VaultState(
         performance_fee=state[0] / 1e6,
         management_fee=state[1] / 1e6,
@@ -129,13 +154,14 @@ def get_next_day():
     return next_day
 
 
-def calculate_apy_ytd(vault_id, current_price_per_share):
+def calculate_apy_ytd(vault_id, current_price_per_share, db_session: Optional[Session] = None):
+    db_session = db_session or session
     now = pendulum.now(tz=pendulum.UTC)
-    vault = session.exec(select(Vault).where(Vault.id == vault_id)).first()
+    vault = db_session.exec(select(Vault).where(Vault.id == vault_id)).first()
 
     # Get the start of the year or the first logged price per share
     start_of_year = pendulum.datetime(now.year, 1, 1, tz="UTC")
-    price_per_share_start = session.exec(
+    price_per_share_start = db_session.exec(
         select(PricePerShareHistory)
         .where(
             PricePerShareHistory.vault_id == vault.id
@@ -159,11 +185,20 @@ def calculate_apy_ytd(vault_id, current_price_per_share):
 # Step 4: Calculate Performance Metrics
 def calculate_performance(
     vault_id: uuid.UUID,
-    vault_contract: Contract,
+    vault_contract: Optional[Contract],
     owner_address: str,
     update_freq: str = "daily",
+    current_price: Optional[float] = None,
+    onchain_state: Optional[OnchainState] = None,
+    db_session: Optional[Session] = None,
 ):
-    current_price = get_price("ETHUSDT")
+    """
+    ``current_price`` and ``onchain_state`` are read here unless the caller
+    already fetched them; ``db_session`` defaults to the job's session.
+    """
+    db_session = db_session or session
+    if current_price is None:
+        current_price = get_price("ETHUSDT")
 
     # today = datetime.strptime(df["Date"].iloc[-1], "%Y-%m-%d")
     today = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
@@ -172,12 +207,16 @@ def calculate_performance(
 
     # price_per_share_df = get_price_per_share_history(vault_id)
 
-    current_price_per_share = get_current_pps(vault_contract)
-    total_balance = get_current_tvl(vault_contract)
+    if onchain_state is None:
+        onchain_state = (
+            get_current_pps(vault_contract),
+            get_current_tvl(vault_contract),
+            get_vault_state(vault_contract, owner_address=owner_address),
+        )
+    current_price_per_share, total_balance, vault_state = onchain_state
     fee_info = get_fee_info()
-    vault_state = get_vault_state(vault_contract, owner_address=owner_address)
     # Calculate Monthly APY
-    month_ago_price_per_share = get_before_price_per_shares(session, vault_id, days=30)
+    month_ago_price_per_share = get_before_price_per_shares(db_session, vault_id, days=30)
     month_ago_datetime = pendulum.instance(month_ago_price_per_share.datetime).in_tz(
         pendulum.UTC
     )
@@ -188,7 +227,7 @@ def calculate_performance(
         current_price_per_share, month_ago_price_per_share.price_per_share, days=days
     )
 
-    week_ago_price_per_share = get_before_price_per_shares(session, vault_id, days=7)
+    week_ago_price_per_share = get_before_price_per_shares(db_session, vault_id, days=7)
     week_ago_datetime = pendulum.instance(week_ago_price_per_share.datetime).in_tz(
         pendulum.UTC
     )
@@ -198,9 +237,9 @@ def calculate_performance(
         current_price_per_share, week_ago_price_per_share.price_per_share, days=days
     )
 
-    apy_ytd = calculate_apy_ytd(vault_id, current_price_per_share)
+    apy_ytd = calculate_apy_ytd(vault_id, current_price_per_share, db_session=db_session)
 
-    performance_history = session.exec(
+    performance_history = db_session.exec(
         select(VaultPerformance).order_by(VaultPerformance.datetime.asc()).limit(1)
     ).first()
 
@@ -214,16 +253,10 @@ def calculate_performance(
     if update_freq == "daily":
         last_7_day = datetime.now(timezone.utc) - timedelta(days=6)
 
-        last_6_days = session.exec(
-            select(VaultPerformance)
-            .where(VaultPerformance.vault_id == vault_id)
-            .where(VaultPerformance.datetime >= last_7_day)
-            .order_by(VaultPerformance.datetime.desc())
-        ).all()
-
-        # convert last 6 days apy to dataframe
-        last_6_days_df = pd.DataFrame([vars(rec) for rec in last_6_days])
-        last_6_days_df = last_6_days_df[["datetime", "apy_1m", "apy_1w"]].copy()
+        # last 6 days apy as a dataframe
+        last_6_days_df = load_vault_performance_history(
+            db_session, vault_id, ["apy_1m", "apy_1w"], start=last_7_day
+        )
 
         # append latest apy
         new_row = pd.DataFrame(
@@ -249,7 +282,7 @@ def calculate_performance(
             apy_1w = last_6_days_df.ffill()["apy_1w"].mean()
 
     all_time_high_per_share, sortino, downside, risk_factor = calculate_pps_statistics(
-        session, vault_id
+        db_session, vault_id
     )
 
     # count all portfolio of vault
@@ -258,7 +291,7 @@ def calculate_performance(
         .select_from(UserPortfolio)
         .where(UserPortfolio.vault_id == vault_id)
     )
-    count = session.scalar(statement)
+    count = db_session.scalar(statement)
 
     # Create a new VaultPerformance object
     performance = VaultPerformance(
@@ -279,61 +312,221 @@ def calculate_performance(
         earned_fee=vault_state.performance_fee + vault_state.management_fee,
         fee_structure=fee_info,
     )
-    update_price_per_share(vault_id, current_price_per_share)
+    update_price_per_share(vault_id, current_price_per_share, db_session=db_session)
 
     return performance
 
 
 def get_vault_contract(vault: Vault) -> tuple[Contract, Web3]:
-    w3 = Web3(Web3.HTTPProvider(constants.NETWORK_RPC_URLS[vault.network_chain]))
-
-    rockonyx_delta_neutral_vault_abi = read_abi("RockOnyxDeltaNeutralVault")
-    vault_contract = w3.eth.contract(
-        address=vault.contract_address,
-        abi=rockonyx_delta_neutral_vault_abi,
+    w3 = get_web3(vault.network_chain)
+    vault_contract = get_contract(
+        vault.network_chain, vault.contract_address, "RockOnyxDeltaNeutralVault"
     )
     return vault_contract, w3
 
 
+def _get_update_freq(network_chain: NetworkChain) -> str:
+    return (
+        "daily"
+        if network_chain in {NetworkChain.arbitrum_one, NetworkChain.base}
+        else "weekly"
+    )
+
+
+def _get_async_vault_contract(vault: Vault):
+    return get_async_contract(
+        vault.network_chain, vault.contract_address, "RockOnyxDeltaNeutralVault"
+    )
+
+
+async def _read_pps_and_tvl(vaults: List[Vault]) -> List[Tuple[float, float]]:
+    calls = []
+    for vault in vaults:
+        vault_contract = _get_async_vault_contract(vault)
+        calls.append(ContractCall(vault.network_chain, vault_contract, "pricePerShare"))
+        calls.append(ContractCall(vault.network_chain, vault_contract, "totalValueLocked"))
+
+    values = await read_contracts(calls, use_cache=False)
+    return [(values[2 * i] / 1e6, values[2 * i + 1] / 1e6) for i in range(len(vaults))]
+
+
+async def _read_vault_state(vault: Vault) -> VaultState:
+    await ensure_async_session(vault.network_chain)
+    # getVaultState is restricted to the owner, so it cannot go through Multicall3
+    state = await _get_async_vault_contract(vault).functions.getVaultState().call(
+        {"from": Web3.to_checksum_address(vault.owner_wallet_address)}
+    )
+    return _to_vault_state(state)
+
+
+async def fetch_onchain_states(
+    vaults: List[Vault],
+) -> Dict[uuid.UUID, Union[OnchainState, Exception]]:
+    """
+    Read the on-chain state of every vault: pricePerShare and totalValueLocked
+    with one multicall per chain and getVaultState concurrently, all chains at
+    once. A vault whose reads fail maps to the exception.
+    """
+    vaults_by_chain: Dict[NetworkChain, List[Vault]] = {}
+    for vault in vaults:
+        vaults_by_chain.setdefault(vault.network_chain, []).append(vault)
+
+    chain_results, vault_states = await asyncio.gather(
+        asyncio.gather(
+            *[_read_pps_and_tvl(chain_vaults) for chain_vaults in vaults_by_chain.values()],
+            return_exceptions=True,
+        ),
+        asyncio.gather(
+            *[_read_vault_state(vault) for vault in vaults], return_exceptions=True
+        ),
+    )
+
+    pps_and_tvl = {}
+    retry_vaults = []
+    for chain_vaults, result in zip(vaults_by_chain.values(), chain_results):
+        if isinstance(result, Exception):
+            # one failing vault fails the whole multicall, isolate it
+            logger.warning(
+                "Multicall on %s failed, reading its vaults one by one: %s",
+                chain_vaults[0].network_chain,
+                result,
+            )
+            retry_vaults.extend(chain_vaults)
+        else:
+            pps_and_tvl.update(
+                {vault.id: values for vault, values in zip(chain_vaults, result)}
+            )
+
+    retry_results = await asyncio.gather(
+        *[_read_pps_and_tvl([vault]) for vault in retry_vaults], return_exceptions=True
+    )
+    for vault, result in zip(retry_vaults, retry_results):
+        pps_and_tvl[vault.id] = result if isinstance(result, Exception) else result[0]
+
+    onchain_states = {}
+    for vault, vault_state in zip(vaults, vault_states):
+        values = pps_and_tvl[vault.id]
+        if isinstance(values, Exception):
+            onchain_states[vault.id] = values
+        elif isinstance(vault_state, Exception):
+            onchain_states[vault.id] = vault_state
+        else:
+            onchain_states[vault.id] = (*values, vault_state)
+    return onchain_states
+
+
+def update_vault_performance(
+    vault_id: uuid.UUID, onchain_state: OnchainState, current_price: float
+):
+    """Compute and store the vault's performance in its own session."""
+    with Session(engine) as db_session:
+        vault = db_session.get(Vault, vault_id)
+        new_performance_rec = calculate_performance(
+            vault.id,
+            None,
+            vault.owner_wallet_address,
+            update_freq=_get_update_freq(vault.network_chain),
+            current_price=current_price,
+            onchain_state=onchain_state,
+            db_session=db_session,
+        )
+        # Add the new performance record to the session and commit
+        db_session.add(new_performance_rec)
+
+        # Update the vault with the new information
+        vault.ytd_apy = new_performance_rec.apy_ytd
+        vault.monthly_apy = new_performance_rec.apy_1m
+        vault.weekly_apy = new_performance_rec.apy_1w
+        vault.next_close_round_date = None
+
+        db_session.commit()
+
+
+def update_vaults_performance(vaults: List[Vault]) -> Dict[uuid.UUID, Optional[Exception]]:
+    """
+    Update every vault, the on-chain reads of all chains first, then the DB
+    work of the vaults in parallel. Returns vault id -> None when updated or
+    the exception which failed it; a failing vault does not stop the others.
+    """
+    current_price = get_price("ETHUSDT")
+    onchain_states = run_async(fetch_onchain_states(vaults))
+
+    report: Dict[uuid.UUID, Optional[Exception]] = {}
+    with ThreadPoolExecutor(max_workers=settings.PERFORMANCE_JOB_WORKERS) as executor:
+        futures = {}
+        for vault in vaults:
+            onchain_state = onchain_states[vault.id]
+            if isinstance(onchain_state, Exception):
+                report[vault.id] = onchain_state
+                continue
+            future = executor.submit(
+                update_vault_performance, vault.id, onchain_state, current_price
+            )
+            futures[future] = vault
+
+        for future in as_completed(futures):
+            vault = futures[future]
+            try:
+                future.result()
+                report[vault.id] = None
+            except Exception as e:
+                report[vault.id] = e
+
+    for vault in vaults:
+        error = report[vault.id]
+        if error is None:
+            logger.info("Updated %s on %s", vault.name, vault.network_chain)
+        else:
+            logger.error(
+                "Failed to update %s on %s: %s",
+                vault.name,
+                vault.network_chain,
+                error,
+                exc_info=error,
+            )
+    logger.info(
+        "Updated %s of %s vaults",
+        sum(error is None for error in report.values()),
+        len(vaults),
+    )
+    return report
+
+
 # Main Execution
 @click.command()
-@click.option("--chain", default="arbitrum_one", help="Blockchain network to use")
-def main(chain: str):
+@click.option(
+    "--chain",
+    "chains",
+    multiple=True,
+    default=["arbitrum_one"],
+    type=click.Choice(["all", *constants.NETWORK_RPC_URLS], case_sensitive=False),
+    help="Blockchain network to use, repeat it for several or pass all for the daily chains",
+)
+def main(chains: Tuple[str, ...]):
     try:
         # Parse chain to NetworkChain enum
-        network_chain = NetworkChain[chain.lower()]
+        if "all" in chains:
+            # the weekly chains have their own cron entry
+            network_chains = [
+                chain
+                for chain in NetworkChain
+                if chain.value in constants.NETWORK_RPC_URLS
+                and _get_update_freq(chain) == "daily"
+            ]
+        else:
+            network_chains = [NetworkChain[chain.lower()] for chain in chains]
 
-        # Get the vault from the Vault table with name = "Delta Neutral Vault"
+        # Get the active delta neutral vaults of the chains
         vaults = session.exec(
             select(Vault)
             .where(Vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY)
             .where(Vault.is_active == True)
-            .where(Vault.network_chain == network_chain)
+            .where(Vault.network_chain.in_(network_chains))
         ).all()
 
-        for vault in vaults:
-            vault_contract, _ = get_vault_contract(vault)
-
-            new_performance_rec = calculate_performance(
-                vault.id,
-                vault_contract,
-                vault.owner_wallet_address,
-                update_freq=(
-                    "daily"
-                    if network_chain in {NetworkChain.arbitrum_one, NetworkChain.base}
-                    else "weekly"
-                ),
-            )
-            # Add the new performance record to the session and commit
-            session.add(new_performance_rec)
-
-            # Update the vault with the new information
-            vault.ytd_apy = new_performance_rec.apy_ytd
-            vault.monthly_apy = new_performance_rec.apy_1m
-            vault.weekly_apy = new_performance_rec.apy_1w
-            vault.next_close_round_date = None
+        update_vaults_performance(vaults)
 
-            session.commit()
+        save_dashboard_stats_snapshot(session)
     except Exception as e:
         logger.error(
             "An error occurred while updating delta neutral performance: %s",
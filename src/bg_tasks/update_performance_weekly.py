@@ -16,13 +16,18 @@ from core import constants
 from core.abi_reader import read_abi
 from core.config import settings
 from core.db import engine
+from core.web3_provider import get_contract, get_web3
 from models import Vault
 from models.pps_history import PricePerShareHistory
 from models.user_portfolio import UserPortfolio
 from models.vault_performance import VaultPerformance
 from schemas.fee_info import FeeInfo
 from schemas.vault_state import VaultState
+from services.dashboard_stats import save_dashboard_stats_snapshot
+from services.history_loader import load_pps_history
+from services.latest_pps import upsert_latest_price_per_share
 from services.market_data import get_price
+from services.pps_statistics import record_price_per_share
 
 if settings.SEQ_SERVER_URL is not None or settings.SEQ_SERVER_URL != "":
     seqlog.configure_from_file("./config/seqlog.yml")
@@ -46,12 +51,9 @@ token_abi = read_abi("ERC20")
 session = Session(engine)
 
 def get_vault_contract(vault: Vault) -> tuple[Contract, Web3]:
-    w3 = Web3(Web3.HTTPProvider(constants.NETWORK_RPC_URLS[vault.network_chain]))
-
-    rockonyx_delta_neutral_vault_abi = read_abi("RockOnyxStableCoin")
-    vault_contract = w3.eth.contract(
-        address=vault.contract_address,
-        abi=rockonyx_delta_neutral_vault_abi,
+    w3 = get_web3(vault.network_chain)
+    vault_contract = get_contract(
+        vault.network_chain, vault.contract_address, "RockOnyxStableCoin"
     )
     return vault_contract, w3
 
@@ -63,14 +65,8 @@ def balance_of(wallet_address, token_address):
 
 
 def get_price_per_share_history(vault_id: uuid.UUID) -> pd.DataFrame:
-    pps_history = session.exec(
-        select(PricePerShareHistory)
-        .where(PricePerShareHistory.vault_id == vault_id)
-        .order_by(PricePerShareHistory.datetime.asc())
-    ).all()
-
-    # Convert the list of PricePerShareHistory objects to a DataFrame
-    pps_history_df = pd.DataFrame([vars(pps) for pps in pps_history])
+    pps_history_df = load_pps_history(session, vault_id)
+    pps_history_df["vault_id"] = vault_id
 
     return pps_history_df[["datetime", "price_per_share", "vault_id"]]
 
@@ -96,6 +92,8 @@ def update_price_per_share(vault_id: uuid.UUID, current_price_per_share: float):
         )
         session.add(new_pps)
 
+    upsert_latest_price_per_share(session, vault_id, current_price_per_share, today)
+    record_price_per_share(session, vault_id, today, current_price_per_share)
     session.commit()
 
 
@@ -278,6 +276,8 @@ def main():
         vault.next_close_round_date = get_next_friday()
 
         session.commit()
+
+        save_dashboard_stats_snapshot(session)
     except Exception as e:
         logger.error(
             "An error occurred while updating the performance metrics: %s",
@@ -6,6 +6,7 @@ import pendulum
 from sqlmodel import Session, select
 from models.pps_history import PricePerShareHistory
 from empyrical import sortino_ratio, downside_risk
+from services.pps_statistics import calculate_pps_statistics
 
 
 def get_before_price_per_shares(
@@ -56,19 +57,13 @@ def calculate_risk_factor(returns):
     return risk_factor
 
 
-def calculate_pps_statistics(session, vault_id):
-    statement = (
-        select(PricePerShareHistory)
-        .where(PricePerShareHistory.vault_id == vault_id)
-        .order_by(PricePerShareHistory.datetime.asc())
-    )
-    pps = session.exec(statement).all()
-
-    list_pps = []
-    for p in pps:
-        list_pps.append({"datetime": p.datetime, "price_per_share": p.price_per_share})
-    df = pd.DataFrame(list_pps)
-    df.set_index("datetime", inplace=True)
+def calculate_pps_statistics_from_history(price_per_shares: pd.Series):
+    """
+    Statistics over a full pps series indexed by datetime with empyrical.
+    The jobs use the incremental engine of services.pps_statistics, this is
+    the reference it is checked against.
+    """
+    df = pd.DataFrame({"price_per_share": price_per_shares})
     df.sort_index(inplace=True)
     df["pct_change"] = df["price_per_share"].pct_change()
 
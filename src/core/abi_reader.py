@@ -1,7 +1,13 @@
+import functools
 import json
 
 
 def read_abi(token: str):
-    with open(f"./config/{token.lower()}_abi.json") as f:
+    return _read_abi(token.lower())
+
+
+@functools.lru_cache(maxsize=None)
+def _read_abi(token: str):
+    with open(f"./config/{token}_abi.json") as f:
         data = json.load(f)
         return data
@@ -102,6 +102,11 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URI: PostgresDsn | None = None
+    # connection pool of each engine, sync (jobs) and async (API)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
 
     PYTHONPATH: Optional[str] = None
     NODE_ENV: Optional[str] = None
@@ -114,6 +119,13 @@ class Settings(BaseSettings):
     RENZO_BASE_API_URL: Optional[str] = "https://app.renzoprotocol.com/api/"
     ZIRCUIT_BASE_API_URL: Optional[str] = "https://stake.zircuit.com/api/"
     KELPDAO_BASE_API_URL: Optional[str] = "https://common.kelpdao.xyz/"
+    PARTNER_HTTP_POOL_SIZE: int = 10
+    PARTNER_HTTP_TIMEOUT_SECONDS: int = 20
+    PARTNER_MAX_CONCURRENCY: int = 8
+    # requests per second allowed against each partner API
+    PARTNER_RATE_LIMITS: dict = {"renzo": 5, "zircuit": 2, "kelpdao": 5}
+    PARTNER_RETRY_ATTEMPTS: int = 4
+    PARTNER_POINTS_CACHE_TTL_SECONDS: int = 300
 
     # Seq log
     SEQ_SERVER_URL: Optional[str] = None
@@ -121,6 +133,41 @@ class Settings(BaseSettings):
 
     ARBISCAN_API_KEY: str
     ARBISCAN_GET_TRANSACTIONS_URL: str = "https://api.arbiscan.io/api?module=account&action=txlist"
+
+    # Web3 listener
+    # queued logs are handed to the workers in batches collected over this window
+    WEB3_LISTENER_BATCH_WINDOW_MS: int = 200
+    WEB3_LISTENER_MAX_BATCH_SIZE: int = 500
+    # the reader waits once this many logs are queued
+    WEB3_LISTENER_QUEUE_SIZE: int = 1000
+    # handler threads, logs are partitioned across them by user address
+    WEB3_LISTENER_WORKERS: int = 4
+    # largest eth_getLogs range when backfilling from the checkpoint
+    WEB3_LISTENER_BACKFILL_CHUNK_BLOCKS: int = 2000
+    WEB3_LISTENER_RECONNECT_DELAY_SECONDS: int = 5
+    # how often the active vaults are reloaded to refresh the subscription
+    WEB3_LISTENER_VAULT_REFRESH_SECONDS: int = 60
+
+    # In-process caches
+    VAULT_REGISTRY_TTL_SECONDS: int = 300
+    LATEST_PPS_CACHE_TTL_SECONDS: int = 60
+    ONCHAIN_CACHE_TTL_SECONDS: int = 5
+    ONCHAIN_CACHE_MAX_SIZE: int = 1024
+    # eth_call requests per JSON-RPC batch
+    ONCHAIN_BATCH_SIZE: int = 100
+    # JSON-RPC batches in flight per batch_eth_call, and attempts on 429 / 5xx
+    ONCHAIN_BATCH_CONCURRENCY: int = 4
+    ONCHAIN_RETRY_ATTEMPTS: int = 4
+    DASHBOARD_STATS_CACHE_TTL_SECONDS: int = 30
+    HISTORY_CACHE_MAX_AGE_SECONDS: int = 300
+
+    # vaults whose performance is computed in parallel by the performance job
+    PERFORMANCE_JOB_WORKERS: int = 4
+
+    # Web3 providers
+    WEB3_HTTP_POOL_SIZE: int = 20
+    WEB3_HTTP_TIMEOUT_SECONDS: int = 30
+
     @field_validator("SQLALCHEMY_DATABASE_URI", mode="before")
     def assemble_db_connection(cls, v: str | None, info: ValidationInfo) -> Any:
         if isinstance(v, str):
@@ -1,11 +1,13 @@
 from datetime import datetime
 
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from core import constants
 from core.config import settings
-from models.pps_history import PricePerShareHistory
+from models.pps_history import LatestPricePerShare, PricePerShareHistory
 from models.referralcodes import ReferralCode
 from models.reward_session_config import RewardSessionConfig
 from models.reward_sessions import RewardSessions
@@ -13,7 +15,16 @@ from models.user import User
 from models.vault_performance import VaultPerformance
 from models.vaults import NetworkChain, Vault
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+_pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+)
+
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **_pool_options)
+# psycopg 3 serves both engines, the async one backs the API sessions
+async_engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI), **_pool_options)
 
 
 # make sure all SQLModel models are imported (models) before initializing DB
@@ -74,6 +85,25 @@ def seed_stablecoin_pps_history(session: Session, vault: Vault):
         session.commit()
 
 
+def seed_latest_pps(session: Session):
+    # latest point of every vault without a latest_pps row, like the migration
+    latest_points = (
+        select(
+            PricePerShareHistory.vault_id,
+            PricePerShareHistory.datetime,
+            PricePerShareHistory.price_per_share,
+        )
+        .distinct(PricePerShareHistory.vault_id)
+        .order_by(PricePerShareHistory.vault_id, PricePerShareHistory.datetime.desc())
+    )
+    session.execute(
+        insert(LatestPricePerShare)
+        .from_select(["vault_id", "datetime", "price_per_share"], latest_points)
+        .on_conflict_do_nothing(index_elements=[LatestPricePerShare.vault_id])
+    )
+    session.commit()
+
+
 def seed_vault_performance(stablecoin_vault: Vault, session):
     cnt = session.exec(select(func.count()).select_from(VaultPerformance)).one()
     if cnt == 0:
@@ -275,3 +305,5 @@ def init_db(session: Session) -> None:
         select(Vault).where(Vault.slug == "kelpdao-restaking-delta-neutral-vault")
     ).first()
     init_pps_history(session, renzo_zircuit_restaking)
+
+    seed_latest_pps(session)
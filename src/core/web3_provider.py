@@ -0,0 +1,131 @@
+"""
+Process-wide Web3 providers and contracts per network.
+
+Providers are created once per network on keep-alive HTTP sessions whose
+connection pool is sized by WEB3_HTTP_POOL_SIZE, and contract objects are
+memoized per (network, address, ABI), so API requests and cron jobs stop
+paying a TLS handshake and ABI parsing on every call.
+"""
+
+import asyncio
+import functools
+import weakref
+from typing import Awaitable, Dict, Tuple, TypeVar
+
+import requests
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3
+from web3.contract import AsyncContract, Contract
+
+from core import constants
+from core.abi_reader import read_abi
+from core.config import settings
+
+T = TypeVar("T")
+
+# network -> (event loop, pooled aiohttp session created on that loop)
+_async_sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, ClientSession]] = {}
+# serializes the session creation of concurrent callers on the same loop
+_async_session_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def get_rpc_url(network_chain: str) -> str:
+    if network_chain not in constants.NETWORK_RPC_URLS:
+        raise ValueError(f"Unsupported network: {network_chain}")
+    return constants.NETWORK_RPC_URLS[network_chain]
+
+
+@functools.lru_cache(maxsize=None)
+def get_web3(network_chain: str) -> Web3:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.WEB3_HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return Web3(
+        Web3.HTTPProvider(
+            get_rpc_url(network_chain),
+            request_kwargs={"timeout": settings.WEB3_HTTP_TIMEOUT_SECONDS},
+            session=session,
+        )
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_contract(network_chain: str, address: str, abi_name: str) -> Contract:
+    return get_web3(network_chain).eth.contract(
+        address=Web3.to_checksum_address(address), abi=read_abi(abi_name)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_web3(network_chain: str) -> AsyncWeb3:
+    return AsyncWeb3(
+        AsyncWeb3.AsyncHTTPProvider(
+            get_rpc_url(network_chain),
+            request_kwargs={
+                "timeout": ClientTimeout(total=settings.WEB3_HTTP_TIMEOUT_SECONDS)
+            },
+        )
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_contract(network_chain: str, address: str, abi_name: str) -> AsyncContract:
+    return get_async_web3(network_chain).eth.contract(
+        address=Web3.to_checksum_address(address), abi=read_abi(abi_name)
+    )
+
+
+async def ensure_async_session(network_chain: str):
+    """
+    Attach a pooled keep-alive aiohttp session to the network's async provider.
+    aiohttp sessions are bound to an event loop, so this is done once per loop.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_sessions.get(network_chain)
+    if entry is not None and entry[0] is loop:
+        return
+
+    lock = _async_session_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        # another caller may have created it while we were waiting
+        entry = _async_sessions.get(network_chain)
+        if entry is not None and entry[0] is loop:
+            return
+
+        session = ClientSession(
+            connector=TCPConnector(limit=settings.WEB3_HTTP_POOL_SIZE),
+            timeout=ClientTimeout(total=settings.WEB3_HTTP_TIMEOUT_SECONDS),
+        )
+        await get_async_web3(network_chain).provider.cache_async_session(session)
+        _async_sessions[network_chain] = (loop, session)
+
+
+async def get_async_session(network_chain: str) -> ClientSession:
+    """The pooled aiohttp session of the network on the running loop."""
+    await ensure_async_session(network_chain)
+    return _async_sessions[network_chain][1]
+
+
+async def close_async_sessions():
+    """Close the pooled sessions created on the running loop, before it ends."""
+    loop = asyncio.get_running_loop()
+    for network_chain, (session_loop, session) in list(_async_sessions.items()):
+        if session_loop is loop:
+            del _async_sessions[network_chain]
+            await session.close()
+
+
+def run_async(coroutine: Awaitable[T]) -> T:
+    """``asyncio.run`` which closes the pooled sessions the coroutine opened."""
+
+    async def main() -> T:
+        try:
+            return await coroutine
+        finally:
+            await close_async_sessions()
+
+    return asyncio.run(main())
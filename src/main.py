@@ -6,6 +6,8 @@ from api.api_v1.api import api_router
 from starlette.middleware.cors import CORSMiddleware
 
 from core.config import settings
+from core.web3_provider import close_async_sessions
+from services.onchain_cache import onchain_cache
 
 app = FastAPI(
     title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
@@ -55,5 +57,16 @@ async def exception_handler(request: Request, exc: Exception):
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+@app.on_event("shutdown")
+async def close_web3_sessions():
+    await close_async_sessions()
+
+
+@app.get("/health")
+async def health():
+    # counters of the in-process caches, per API worker
+    return {"status": "ok", "onchain_cache": onchain_cache.stats()}
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -1,7 +1,7 @@
 from sqlmodel import Field, Relationship, SQLModel
 from .vaults import Vault, VaultBase
 from .vault_performance import VaultPerformance, VaultPerformanceBase
-from .pps_history import PricePerShareHistory, PricePerShareHistoryBase
+from .pps_history import LatestPricePerShare, PricePerShareHistory, PricePerShareHistoryBase
 from .user_portfolio import UserPortfolio, PositionStatus
 from .transaction import Transaction
 from .price_feed_oracle_history import PriceFeedOracleHistory
@@ -14,4 +14,7 @@ from .user import User
 from .reward_sessions import RewardSessions
 from .points_multiplier_config import PointsMultiplierConfig
 from .reward_session_config import RewardSessionConfig
-from .user_points_history import UserPointsHistory
\ No newline at end of file
+from .user_points_history import UserPointsHistory
+from .dashboard_stats_snapshot import DashboardStatsSnapshot
+from .pps_statistics import VaultPpsStatistics
+from .listener_checkpoint import ListenerCheckpoint
@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from sqlmodel import Field, SQLModel
+
+
+class DashboardStatsSnapshot(SQLModel, table=True):
+    __tablename__ = "dashboard_stats_snapshot"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    # schemas.DashboardStats serialized as JSON
+    payload: str
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), index=True
+    )
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger
+from sqlmodel import Field, SQLModel
+
+
+class ListenerCheckpoint(SQLModel, table=True):
+    """
+    Position of the last vault log the web3 listener processed on a chain, per
+    worker partition of user addresses.
+    """
+
+    __tablename__ = "listener_checkpoint"
+
+    network_chain: str = Field(primary_key=True)
+    partition: int = Field(default=0, primary_key=True)
+    block_number: int = Field(sa_type=BigInteger)
+    log_index: int
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -1,4 +1,5 @@
 import uuid
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from uuid import UUID
@@ -7,6 +8,14 @@ from datetime import datetime, timezone
 
 class PointDistributionHistory(SQLModel, table=True):
     __tablename__ = "point_distribution_history"
+    __table_args__ = (
+        Index(
+            "ix_point_distribution_history_vault_id_partner_name_created_at",
+            "vault_id",
+            "partner_name",
+            text("created_at DESC"),
+        ),
+    )
 
     id: Optional[UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
     vault_id: UUID = Field(foreign_key="vaults.id")
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field
 import uuid
 
@@ -10,6 +11,17 @@ class PricePerShareHistoryBase(SQLModel):
 
 class PricePerShareHistory(PricePerShareHistoryBase, table=True):
     __tablename__ = "pps_history"
+    __table_args__ = (
+        Index("ix_pps_history_vault_id_datetime", "vault_id", text("datetime DESC")),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     vault_id: uuid.UUID = Field(foreign_key="vaults.id")
+
+
+class LatestPricePerShare(PricePerShareHistoryBase, table=True):
+    """Latest pps_history point of every vault, maintained by the performance jobs."""
+
+    __tablename__ = "latest_pps"
+
+    vault_id: uuid.UUID = Field(foreign_key="vaults.id", primary_key=True)
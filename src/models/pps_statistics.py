@@ -0,0 +1,28 @@
+from datetime import datetime
+import uuid
+
+from sqlmodel import Field, SQLModel
+
+
+class VaultPpsStatistics(SQLModel, table=True):
+    """
+    Running state of the pps statistics of a vault. Every pps point except the
+    last one is folded into the sums; the last point is kept apart so the
+    performance jobs can overwrite it in place.
+    """
+
+    __tablename__ = "vault_pps_statistics"
+
+    vault_id: uuid.UUID = Field(foreign_key="vaults.id", primary_key=True)
+    point_count: int = 0
+    # highest pps among the folded points
+    all_time_high_per_share: float | None = None
+    previous_price_per_share: float | None = None
+    last_price_per_share: float | None = None
+    last_datetime: datetime | None = None
+    # aggregates of the returns between folded points, NaN returns are skipped
+    return_count: int = 0
+    return_sum: float = 0
+    negative_return_count: int = 0
+    negative_return_sum: float = 0
+    negative_return_square_sum: float = 0
@@ -1,9 +1,17 @@
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field
 from uuid import UUID, uuid4
 from datetime import datetime, timezone
 
 class UserPointsHistory(SQLModel, table=True):
     __tablename__ = "user_points_history"
+    __table_args__ = (
+        Index(
+            "ix_user_points_history_user_points_id_created_at",
+            "user_points_id",
+            text("created_at DESC"),
+        ),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_points_id: UUID = Field(foreign_key="user_points.id")
@@ -0,0 +1,149 @@
+"""
+Dashboard statistics snapshot.
+
+The performance jobs build ``schemas.DashboardStats`` once when they finish
+and store it in ``dashboard_stats_snapshot``. The API serves the newest
+snapshot from ``dashboard_stats_cache`` so a hit costs neither per-vault
+queries nor a count over ``user_portfolio``.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, distinct, func
+from sqlmodel import Session, select
+
+import schemas
+from core import constants
+from core.config import settings
+from models import Vault
+from models.dashboard_stats_snapshot import DashboardStatsSnapshot
+from models.user_portfolio import UserPortfolio
+from models.vault_performance import VaultPerformance
+from services.latest_pps import get_latest_price_per_shares
+
+
+def build_dashboard_stats(session: Session) -> schemas.DashboardStats:
+    vaults = session.exec(
+        select(Vault)
+        .where(Vault.is_active == True)
+        .where(Vault.strategy_name != None)
+    ).all()
+    vault_ids = [vault.id for vault in vaults]
+
+    # latest performance record of every vault in one query
+    performances = {
+        performance.vault_id: performance
+        for performance in session.exec(
+            select(VaultPerformance)
+            .where(VaultPerformance.vault_id.in_(vault_ids))
+            .distinct(VaultPerformance.vault_id)
+            .order_by(VaultPerformance.vault_id, VaultPerformance.datetime.desc())
+        ).all()
+    }
+    latest_pps = get_latest_price_per_shares(session, vault_ids)
+
+    data = []
+    tvl_in_all_vaults = 0
+    tvl_composition = {}
+    for vault in vaults:
+        performance = performances.get(vault.id)
+        if performance is None:
+            continue
+
+        statistic = schemas.VaultStats(
+            name=vault.name,
+            price_per_share=latest_pps.get(vault.id) or 0,
+            apy_1y=(
+                performance.apy_ytd
+                if vault.strategy_name == constants.OPTIONS_WHEEL_STRATEGY
+                else performance.apy_1m
+            ),
+            risk_factor=performance.risk_factor,
+            total_value_locked=performance.total_locked_value,
+            slug=vault.slug,
+            id=vault.id,
+        )
+        tvl_in_all_vaults += performance.total_locked_value
+        tvl_composition[vault.name] = performance.total_locked_value
+        data.append(statistic)
+
+    for key in tvl_composition:
+        tvl_composition[key] = (
+            tvl_composition[key] / tvl_in_all_vaults if tvl_in_all_vaults > 0 else 0
+        )
+
+    # count all portfolio of vault
+    statement = select(func.count(distinct(UserPortfolio.user_address))).select_from(
+        UserPortfolio
+    )
+    count = session.scalar(statement)
+
+    return schemas.DashboardStats(
+        tvl_in_all_vaults=tvl_in_all_vaults,
+        total_depositors=count,
+        tvl_composition=tvl_composition,
+        vaults=data,
+    )
+
+
+def save_dashboard_stats_snapshot(session: Session) -> DashboardStatsSnapshot:
+    snapshot = DashboardStatsSnapshot(
+        payload=build_dashboard_stats(session).model_dump_json()
+    )
+    session.add(snapshot)
+    session.flush()
+    # only the newest snapshot is ever served, replace the previous ones
+    session.execute(
+        delete(DashboardStatsSnapshot).where(DashboardStatsSnapshot.id != snapshot.id)
+    )
+    session.commit()
+    return snapshot
+
+
+def get_latest_dashboard_stats_snapshot(
+    session: Session,
+) -> Optional[DashboardStatsSnapshot]:
+    return session.exec(
+        select(DashboardStatsSnapshot)
+        .order_by(DashboardStatsSnapshot.created_at.desc())
+        .limit(1)
+    ).first()
+
+
+class DashboardStatsCache:
+    def __init__(self, ttl_seconds: float = settings.DASHBOARD_STATS_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (loaded_at, payload, etag)
+        self._entry: Optional[Tuple[float, str, str]] = None
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+
+    def get(self, session: Session) -> Tuple[str, str]:
+        """
+        Return the JSON payload of the newest snapshot and its ETag. Falls back
+        to building the stats live when no job has written a snapshot yet.
+        """
+        now = time.monotonic()
+        entry = self._entry
+        if entry is not None and now - entry[0] < self.ttl_seconds:
+            return entry[1], entry[2]
+
+        snapshot = get_latest_dashboard_stats_snapshot(session)
+        if snapshot is not None:
+            payload = snapshot.payload
+        else:
+            payload = build_dashboard_stats(session).model_dump_json()
+
+        etag = '"%s"' % hashlib.sha1(payload.encode()).hexdigest()
+        with self._lock:
+            self._entry = (now, payload, etag)
+        return payload, etag
+
+
+dashboard_stats_cache = DashboardStatsCache()
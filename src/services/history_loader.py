@@ -0,0 +1,139 @@
+"""
+Column-oriented loaders for the time series tables.
+
+Only the requested columns are selected and the frame is built straight from
+the result tuples, so no ORM objects are materialized. An optional date range
+and downsampling bucket (Postgres ``date_trunc``) shrink the result in the
+database rather than in pandas.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from models.pps_history import PricePerShareHistory
+from models.vault_performance import VaultPerformance
+
+DOWNSAMPLE_UNITS = {"hour", "day", "week", "month"}
+DOWNSAMPLE_AGGREGATES = {"mean", "last"}
+
+
+def load_history(
+    session: Session,
+    model,
+    vault_id: uuid.UUID,
+    columns: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    downsample: Optional[str] = None,
+    aggregate: str = "mean",
+) -> pd.DataFrame:
+    """
+    Load ``datetime`` and ``columns`` of ``model`` for a vault, oldest first.
+
+    With ``downsample`` set to one of DOWNSAMPLE_UNITS the rows are grouped by
+    the truncated datetime, keeping either the average (``mean``) or the
+    latest value (``last``) of each bucket.
+    """
+    if downsample is not None and downsample not in DOWNSAMPLE_UNITS:
+        raise ValueError(f"Unsupported downsample unit: {downsample}")
+    if aggregate not in DOWNSAMPLE_AGGREGATES:
+        raise ValueError(f"Unsupported aggregate: {aggregate}")
+
+    value_columns = [getattr(model, column) for column in columns]
+    if downsample is None:
+        bucket = model.datetime
+        statement = select(bucket, *value_columns).order_by(bucket.asc())
+    elif aggregate == "mean":
+        bucket = func.date_trunc(downsample, model.datetime)
+        statement = (
+            select(bucket, *[func.avg(column) for column in value_columns])
+            .group_by(bucket)
+            .order_by(bucket.asc())
+        )
+    else:
+        bucket = func.date_trunc(downsample, model.datetime)
+        statement = (
+            select(bucket, *value_columns)
+            .distinct(bucket)
+            .order_by(bucket.asc(), model.datetime.desc())
+        )
+
+    statement = statement.where(model.vault_id == vault_id)
+    if start is not None:
+        statement = statement.where(model.datetime >= start)
+    if end is not None:
+        statement = statement.where(model.datetime <= end)
+
+    rows = session.exec(statement).all()
+    df = pd.DataFrame.from_records(
+        rows, columns=["datetime", *columns], coerce_float=True
+    )
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    return df
+
+
+def load_history_version(
+    session: Session,
+    model,
+    vault_id: uuid.UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Tuple[int, Optional[datetime]]:
+    """
+    Row count and latest datetime of the vault's rows in the range, which
+    change whenever the series does. Cheap enough to validate caches with.
+    """
+    statement = select(func.count(), func.max(model.datetime)).where(
+        model.vault_id == vault_id
+    )
+    if start is not None:
+        statement = statement.where(model.datetime >= start)
+    if end is not None:
+        statement = statement.where(model.datetime <= end)
+    count, last_datetime = session.exec(statement).one()
+    return count, last_datetime
+
+
+def load_pps_history(
+    session: Session,
+    vault_id: uuid.UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    downsample: Optional[str] = None,
+) -> pd.DataFrame:
+    return load_history(
+        session,
+        PricePerShareHistory,
+        vault_id,
+        ["price_per_share"],
+        start=start,
+        end=end,
+        downsample=downsample,
+        aggregate="last",
+    )
+
+
+def load_vault_performance_history(
+    session: Session,
+    vault_id: uuid.UUID,
+    columns: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    downsample: Optional[str] = None,
+    aggregate: str = "mean",
+) -> pd.DataFrame:
+    return load_history(
+        session,
+        VaultPerformance,
+        vault_id,
+        columns,
+        start=start,
+        end=end,
+        downsample=downsample,
+        aggregate=aggregate,
+    )
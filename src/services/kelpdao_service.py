@@ -4,17 +4,14 @@ from core.config import settings
 from schemas import EarnedRestakingPoints
 from core import constants
 
+headers = {"Accept-Encoding": "gzip"}
 
-def get_points(user_address: str) -> EarnedRestakingPoints:
-    url = f"{settings.KELPDAO_BASE_API_URL}km-el-points/user/{user_address}"
-    headers = {"Accept-Encoding": "gzip"}
-    response = requests.get(url, headers=headers)
 
-    if response.status_code != 200:
-        raise Exception(f"Request failed with status {response.status_code}")
+def get_points_url(user_address: str) -> str:
+    return f"{settings.KELPDAO_BASE_API_URL}km-el-points/user/{user_address}"
 
-    data = response.json()
 
+def parse_points(user_address: str, data: Dict[str, Any]) -> EarnedRestakingPoints:
     point_res = data["value"]
     return EarnedRestakingPoints(
         wallet_address=user_address,
@@ -24,6 +21,16 @@ def get_points(user_address: str) -> EarnedRestakingPoints:
     )
 
 
+def get_points(user_address: str) -> EarnedRestakingPoints:
+    url = get_points_url(user_address)
+    response = requests.get(url, headers=headers)
+
+    if response.status_code != 200:
+        raise Exception(f"Request failed with status {response.status_code}")
+
+    return parse_points(user_address, response.json())
+
+
 # Usage:
 # points = get_points('0xBC05da14287317FE12B1a2b5a0E1d756Ff1801Aa')
 # print(points)
@@ -0,0 +1,118 @@
+"""
+Latest price per share of every vault.
+
+The performance jobs upsert ``latest_pps`` whenever they write ``pps_history``
+so readers get the latest pps with a primary key lookup instead of sorting the
+whole history. ``latest_pps_cache`` adds an in-memory read-through layer for
+the API.
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from core.config import settings
+from models.pps_history import LatestPricePerShare, PricePerShareHistory
+
+
+def upsert_latest_price_per_share(
+    session: Session, vault_id: uuid.UUID, price_per_share: float, pps_datetime: datetime
+):
+    """
+    Record a pps point as the latest one of the vault unless a newer point is
+    already stored. The caller commits.
+    """
+    statement = insert(LatestPricePerShare).values(
+        vault_id=vault_id, datetime=pps_datetime, price_per_share=price_per_share
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[LatestPricePerShare.vault_id],
+        set_={
+            "datetime": statement.excluded.datetime,
+            "price_per_share": statement.excluded.price_per_share,
+        },
+        where=LatestPricePerShare.datetime <= statement.excluded.datetime,
+    )
+    session.execute(statement)
+
+
+def get_latest_price_per_shares(
+    session: Session, vault_ids: Iterable[uuid.UUID]
+) -> Dict[uuid.UUID, float]:
+    vault_ids = set(vault_ids)
+    if not vault_ids:
+        return {}
+
+    latest_pps = dict(
+        session.exec(
+            select(LatestPricePerShare.vault_id, LatestPricePerShare.price_per_share)
+            .where(LatestPricePerShare.vault_id.in_(vault_ids))
+        ).all()
+    )
+
+    # vaults which have never been written by the jobs fall back to pps_history
+    missing_vault_ids = vault_ids - latest_pps.keys()
+    if missing_vault_ids:
+        latest_pps.update(
+            session.exec(
+                select(PricePerShareHistory.vault_id, PricePerShareHistory.price_per_share)
+                .where(PricePerShareHistory.vault_id.in_(missing_vault_ids))
+                .distinct(PricePerShareHistory.vault_id)
+                .order_by(
+                    PricePerShareHistory.vault_id, PricePerShareHistory.datetime.desc()
+                )
+            ).all()
+        )
+
+    return latest_pps
+
+
+class LatestPpsCache:
+    def __init__(self, ttl_seconds: float = settings.LATEST_PPS_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # vault_id -> (loaded_at, price_per_share)
+        self._entries: Dict[uuid.UUID, Tuple[float, Optional[float]]] = {}
+
+    def invalidate(self, vault_id: Optional[uuid.UUID] = None):
+        with self._lock:
+            if vault_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(vault_id, None)
+
+    def get_many(
+        self, session: Session, vault_ids: Iterable[uuid.UUID]
+    ) -> Dict[uuid.UUID, Optional[float]]:
+        now = time.monotonic()
+        result = {}
+        stale_vault_ids = set()
+        for vault_id in vault_ids:
+            vault_id = (
+                vault_id if isinstance(vault_id, uuid.UUID) else uuid.UUID(str(vault_id))
+            )
+            entry = self._entries.get(vault_id)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                result[vault_id] = entry[1]
+            else:
+                stale_vault_ids.add(vault_id)
+
+        if stale_vault_ids:
+            latest_pps = get_latest_price_per_shares(session, stale_vault_ids)
+            with self._lock:
+                for vault_id in stale_vault_ids:
+                    result[vault_id] = latest_pps.get(vault_id)
+                    self._entries[vault_id] = (now, result[vault_id])
+
+        return result
+
+    def get(self, session: Session, vault_id: uuid.UUID) -> Optional[float]:
+        return next(iter(self.get_many(session, [vault_id]).values()))
+
+
+latest_pps_cache = LatestPpsCache()
@@ -0,0 +1,67 @@
+"""
+Per-chain checkpoint of the web3 listener.
+
+Every log at or before the stored (block_number, log_index) has been applied.
+The checkpoint is written in the same transaction as the handlers of the logs
+it covers, so a restart resumes exactly after the last applied log. Listener
+workers own one partition of user addresses each and keep their own
+checkpoint, the chain is caught up to the lowest of them.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from models.listener_checkpoint import ListenerCheckpoint
+
+# log index marking a block as fully processed
+END_OF_BLOCK = 2**31 - 1
+
+
+def get_checkpoints(session: Session, network_chain: str) -> Dict[int, Tuple[int, int]]:
+    """partition -> (block_number, log_index) of the chain."""
+    rows = session.execute(
+        select(
+            ListenerCheckpoint.partition,
+            ListenerCheckpoint.block_number,
+            ListenerCheckpoint.log_index,
+        ).where(ListenerCheckpoint.network_chain == network_chain)
+    ).all()
+    return {partition: (block_number, log_index) for partition, block_number, log_index in rows}
+
+
+def get_checkpoint(
+    session: Session, network_chain: str, partition: int = 0
+) -> Optional[Tuple[int, int]]:
+    return get_checkpoints(session, network_chain).get(partition)
+
+
+def save_checkpoint(
+    session: Session,
+    network_chain: str,
+    block_number: int,
+    log_index: int,
+    partition: int = 0,
+):
+    """Move the checkpoint forward, never backwards. The caller commits."""
+    statement = insert(ListenerCheckpoint).values(
+        network_chain=network_chain,
+        partition=partition,
+        block_number=block_number,
+        log_index=log_index,
+        updated_at=datetime.now(timezone.utc),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[ListenerCheckpoint.network_chain, ListenerCheckpoint.partition],
+        set_={
+            "block_number": statement.excluded.block_number,
+            "log_index": statement.excluded.log_index,
+            "updated_at": statement.excluded.updated_at,
+        },
+        where=tuple_(ListenerCheckpoint.block_number, ListenerCheckpoint.log_index)
+        < tuple_(statement.excluded.block_number, statement.excluded.log_index),
+    )
+    session.execute(statement)
@@ -0,0 +1,196 @@
+"""
+Typed decoding of the vault event logs.
+
+The layouts of the Deposited / InitiateWithdrawal / RequestFunds / Withdrawn
+events are compiled once from the ABIs in ``config/`` into ``EventSchema``s
+keyed by topic0, so a log is decoded with ``int.from_bytes`` on slices of its
+raw bytes instead of through hex strings. Amounts are scaled with the
+decimals of the token named by the event, else of the vault currency; a
+token or currency whose decimals are not known is rejected rather than
+guessed, a wrong guess would misstate the amount by orders of magnitude.
+"""
+
+import functools
+import glob
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+from web3 import Web3
+
+from core.config import settings
+from models.vaults import Vault
+
+WORD_SIZE = 32
+ABI_DIR = "./config"
+
+# events the listener applies to the user positions
+VAULT_EVENT_NAMES = {"Deposited", "InitiateWithdrawal", "RequestFunds", "Withdrawn"}
+
+# events emitted by the deployed vaults which are missing from the ABIs in config/
+EXTRA_EVENT_ABIS = [
+    {
+        "type": "event",
+        "name": "Deposited",
+        "anonymous": False,
+        "inputs": [
+            {"name": "account", "type": "address", "indexed": True},
+            {"name": "tokenIn", "type": "address", "indexed": True},
+            {"name": "amount", "type": "uint256", "indexed": False},
+            {"name": "shares", "type": "uint256", "indexed": False},
+        ],
+    },
+]
+
+# vault shares are minted with 6 decimals whatever the deposited token
+SHARES_DECIMALS = 6
+CURRENCY_DECIMALS = {
+    "usdc": 6,
+    "usdc.e": 6,
+    "usdt": 6,
+    "dai": 18,
+    "eth": 18,
+    "weth": 18,
+    "wsteth": 18,
+}
+
+
+@dataclass(frozen=True)
+class EventSchema:
+    name: str
+    signature: str
+    topic0: bytes
+    topic_count: int
+    data_size: int
+    # topic of the user and of the deposited token, data offset of amount and shares
+    account_topic: Optional[int]
+    token_topic: Optional[int]
+    amount_offset: int
+    shares_offset: Optional[int]
+
+
+def _as_bytes(value: Union[bytes, str]) -> bytes:
+    # logs read back from JSON carry hex strings instead of bytes
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return value
+
+
+def _address_from_topic(topic) -> str:
+    return "0x" + memoryview(_as_bytes(topic))[12:].hex()
+
+
+def compile_event(event_abi: dict) -> Optional[EventSchema]:
+    """The schema of a vault event, None if the event is not one the listener applies."""
+    if event_abi["name"] not in VAULT_EVENT_NAMES:
+        return None
+
+    types = [param["type"] for param in event_abi["inputs"]]
+    signature = f"{event_abi['name']}({','.join(types)})"
+
+    indexed_addresses: List[int] = []
+    amounts: List[int] = []
+    topic_count, words = 1, 0
+    for param in event_abi["inputs"]:
+        if param["indexed"]:
+            if param["type"] == "address":
+                indexed_addresses.append(topic_count)
+            topic_count += 1
+            continue
+
+        if param["type"] in ("string", "bytes") or param["type"].endswith("]"):
+            raise ValueError(f"Dynamic parameter {param['name']} of {signature} is not supported")
+        if param["type"].startswith("uint"):
+            amounts.append(words * WORD_SIZE)
+        words += 1
+
+    if not indexed_addresses or not amounts:
+        return None
+
+    return EventSchema(
+        name=event_abi["name"],
+        signature=signature,
+        topic0=bytes(Web3.keccak(text=signature)),
+        topic_count=topic_count,
+        data_size=words * WORD_SIZE,
+        account_topic=indexed_addresses[0],
+        token_topic=indexed_addresses[1] if len(indexed_addresses) > 1 else None,
+        amount_offset=amounts[0],
+        shares_offset=amounts[1] if len(amounts) > 1 else None,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def event_schemas(abi_dir: str = ABI_DIR) -> Dict[bytes, EventSchema]:
+    """The vault event schemas of every ABI in ``abi_dir``, keyed by topic0."""
+    event_abis = list(EXTRA_EVENT_ABIS)
+    for path in sorted(glob.glob(os.path.join(abi_dir, "*_abi.json"))):
+        with open(path) as f:
+            abi = json.load(f)
+        event_abis.extend(item for item in abi if item.get("type") == "event")
+
+    schemas: Dict[bytes, EventSchema] = {}
+    for event_abi in event_abis:
+        schema = compile_event(event_abi)
+        if schema is None:
+            continue
+        if schema.topic0 in schemas and schemas[schema.topic0] != schema:
+            raise ValueError(f"Conflicting layouts of {schema.signature} in the ABIs")
+        schemas[schema.topic0] = schema
+    return schemas
+
+
+@functools.lru_cache(maxsize=None)
+def token_decimals() -> Dict[str, int]:
+    """Decimals of the tokens which can be named by a vault event, by lowercase address."""
+    tokens = {
+        settings.USDC_ADDRESS: 6,
+        settings.USDCE_ADDRESS: 6,
+        settings.WSTETH_ADDRESS: 18,
+    }
+    tokens.update({address: 18 for address in settings.DAI_ADDRESS.values()})
+    return {address.lower(): decimals for address, decimals in tokens.items()}
+
+
+def amount_decimals(vault: Vault, token_address: Optional[str] = None) -> int:
+    if token_address is not None:
+        if token_address not in token_decimals():
+            raise ValueError(f"Unknown decimals of token {token_address}")
+        return token_decimals()[token_address]
+
+    currency = (vault.vault_currency or "").strip().lower()
+    if currency not in CURRENCY_DECIMALS:
+        raise ValueError(
+            f"Unknown decimals of currency {vault.vault_currency!r} of vault {vault.name}"
+        )
+    return CURRENCY_DECIMALS[currency]
+
+
+def decode_vault_event(vault: Vault, entry) -> Tuple[float, float, Optional[str]]:
+    """The (amount, shares, user address) of a vault event log."""
+    topics = entry["topics"]
+    schema = event_schemas().get(bytes(_as_bytes(topics[0]))) if topics else None
+    if schema is None:
+        raise ValueError("Unknown event topic")
+
+    data = memoryview(_as_bytes(entry["data"]))
+    if len(topics) < schema.topic_count or len(data) < schema.data_size:
+        raise ValueError(f"Malformed {schema.signature} log")
+
+    token_address = None
+    if schema.token_topic is not None:
+        token_address = _address_from_topic(topics[schema.token_topic])
+
+    offset = schema.amount_offset
+    amount = int.from_bytes(data[offset : offset + WORD_SIZE], "big")
+    shares = 0
+    if schema.shares_offset is not None:
+        offset = schema.shares_offset
+        shares = int.from_bytes(data[offset : offset + WORD_SIZE], "big")
+
+    return (
+        amount / 10.0 ** amount_decimals(vault, token_address),
+        shares / 10.0**SHARES_DECIMALS,
+        _address_from_topic(topics[schema.account_topic]),
+    )
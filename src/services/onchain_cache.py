@@ -0,0 +1,126 @@
+"""
+Short-lived cache for on-chain view calls.
+
+Values are keyed by (chain, contract, function, args, block tag), expire after
+ONCHAIN_CACHE_TTL_SECONDS and are evicted least recently used first once
+ONCHAIN_CACHE_MAX_SIZE is reached. Concurrent reads of a key which is already
+being fetched wait for that fetch instead of issuing their own RPC.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from core.config import settings
+
+# view functions whose result only changes when the vault settles
+CACHEABLE_FUNCTIONS = {"pricePerShare", "totalValueLocked"}
+
+
+class OnchainCallCache:
+    def __init__(
+        self,
+        ttl_seconds: float = settings.ONCHAIN_CACHE_TTL_SECONDS,
+        max_size: int = settings.ONCHAIN_CACHE_MAX_SIZE,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # key -> (expires_at, value), ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        network_chain: str,
+        contract_address: str,
+        function_name: str,
+        args: tuple = (),
+        block_tag: str = "latest",
+    ) -> Hashable:
+        return (network_chain, contract_address.lower(), function_name, args, block_tag)
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+        if entry is not None:
+            del self._entries[key]
+        return False, None
+
+    def in_flight(self, key: Hashable) -> Optional[asyncio.Future]:
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def start(self, key: Hashable) -> asyncio.Future:
+        """Register the caller as the one fetching ``key``."""
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        return future
+
+    def complete(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def fail(self, key: Hashable, exc: Optional[BaseException] = None):
+        future = self._in_flight.pop(key, None)
+        if future is None or future.done():
+            return
+
+        if exc is None or isinstance(exc, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(exc)
+            # the error is raised to the fetching caller, waiters are optional
+            future.exception()
+
+    async def get_or_load(self, key: Hashable, loader) -> Any:
+        found, value = self.lookup(key)
+        if found:
+            return value
+
+        future = self.in_flight(key)
+        if future is not None:
+            return await future
+
+        self.start(key)
+        try:
+            value = await loader()
+        except BaseException as e:
+            self.fail(key, e)
+            raise
+        self.complete(key, value)
+        return value
+
+    def invalidate(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+onchain_cache = OnchainCallCache()
@@ -0,0 +1,292 @@
+"""
+Batched, non-blocking contract reads.
+
+View calls are grouped per chain into one Multicall3 ``aggregate3`` call and
+the chains are queried concurrently, so N reads cost one round trip per chain
+instead of N sequential RPCs, without blocking the event loop. Providers
+and contracts come from the pooled ``core.web3_provider`` factory.
+
+Calls which depend on ``msg.sender`` cannot go through Multicall3, where the
+sender is the multicall contract; ``batch_eth_call`` sends them as JSON-RPC
+batches of ``eth_call`` with ``from`` instead, on the same pooled session, at
+most ONCHAIN_BATCH_CONCURRENCY batches at a time, retrying 429 and 5xx
+responses with exponential backoff.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from hexbytes import HexBytes
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
+from web3 import AsyncWeb3, Web3
+from web3._utils.abi import get_abi_output_types
+from web3.contract import AsyncContract
+
+from core.config import settings
+from core.web3_provider import (
+    ensure_async_session,
+    get_async_contract,
+    get_async_session,
+    get_async_web3,
+    get_rpc_url,
+)
+from models.vaults import NetworkChain
+from services.onchain_cache import CACHEABLE_FUNCTIONS, onchain_cache
+
+# Multicall3 is deployed at the same address on every supported chain
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+
+class RpcRequestError(Exception):
+    def __init__(self, network_chain: str, status_code: int, error: Any = None):
+        if error is None:
+            message = f"{network_chain} RPC request failed with status {status_code}"
+        else:
+            message = f"{network_chain} RPC rejected the batch: {error}"
+        super().__init__(message)
+        self.status_code = status_code
+        self.error = error
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return True
+    # a whole batch rejected with a 200 is mostly a rate limit, e.g. -32005
+    return isinstance(exc, RpcRequestError) and (
+        exc.error is not None or exc.status_code == 429 or exc.status_code >= 500
+    )
+
+
+@dataclass
+class ContractCall:
+    network_chain: NetworkChain
+    contract: AsyncContract
+    function_name: str
+    args: Tuple[Any, ...] = field(default_factory=tuple)
+    # msg.sender of the call, only used by batch_eth_call
+    sender: Optional[str] = None
+
+
+def _decode_result(w3: AsyncWeb3, call: ContractCall, return_data: bytes) -> Any:
+    function_abi = call.contract.get_function_by_name(call.function_name).abi
+    values = w3.codec.decode(get_abi_output_types(function_abi), return_data)
+    return values[0] if len(values) == 1 else values
+
+
+async def _aggregate(network_chain: NetworkChain, calls: List[ContractCall]) -> List[Any]:
+    await ensure_async_session(network_chain)
+    w3 = get_async_web3(network_chain)
+    multicall = get_async_contract(network_chain, MULTICALL3_ADDRESS, "Multicall3")
+
+    results = await multicall.functions.aggregate3(
+        [
+            (
+                call.contract.address,
+                True,
+                call.contract.encodeABI(fn_name=call.function_name, args=call.args),
+            )
+            for call in calls
+        ]
+    ).call()
+
+    values = []
+    for call, (success, return_data) in zip(calls, results):
+        if not success:
+            raise ValueError(
+                f"{call.function_name} call to {call.contract.address} failed"
+            )
+        values.append(_decode_result(w3, call, return_data))
+    return values
+
+
+async def _read_uncached(calls: List[Tuple[int, ContractCall]]) -> Dict[int, Any]:
+    calls_by_chain: Dict[NetworkChain, List[Tuple[int, ContractCall]]] = {}
+    for index, call in calls:
+        calls_by_chain.setdefault(call.network_chain, []).append((index, call))
+
+    chains = list(calls_by_chain.keys())
+    chain_results = await asyncio.gather(
+        *[
+            _aggregate(chain, [call for _, call in calls_by_chain[chain]])
+            for chain in chains
+        ]
+    )
+
+    results = {}
+    for chain, values in zip(chains, chain_results):
+        for (index, _), value in zip(calls_by_chain[chain], values):
+            results[index] = value
+    return results
+
+
+def _cache_key(call: ContractCall):
+    if call.function_name not in CACHEABLE_FUNCTIONS:
+        return None
+    return onchain_cache.make_key(
+        call.network_chain, call.contract.address, call.function_name, tuple(call.args)
+    )
+
+
+async def read_contracts(calls: List[ContractCall], use_cache: bool = True) -> List[Any]:
+    """
+    Execute the calls with one multicall per chain, all chains concurrently.
+    Results are returned in the order of ``calls``.
+
+    Cacheable calls are served from ``onchain_cache`` when fresh, or wait for
+    an identical call already in flight, so only the misses reach the chain.
+    """
+    results: List[Any] = [None] * len(calls)
+    pending: List[Tuple[int, ContractCall]] = []
+    waiting: List[Tuple[int, asyncio.Future]] = []
+    owned_keys = {}
+    for index, call in enumerate(calls):
+        key = _cache_key(call) if use_cache else None
+        if key is not None:
+            found, value = onchain_cache.lookup(key)
+            if found:
+                results[index] = value
+                continue
+
+            future = owned_keys.get(key) or onchain_cache.in_flight(key)
+            if future is not None:
+                waiting.append((index, future))
+                continue
+
+            owned_keys[key] = onchain_cache.start(key)
+        pending.append((index, call))
+
+    try:
+        values = await _read_uncached(pending) if pending else {}
+    except BaseException as e:
+        for key in owned_keys:
+            onchain_cache.fail(key, e)
+        raise
+
+    for index, call in pending:
+        results[index] = values[index]
+        key = _cache_key(call) if use_cache else None
+        if key is not None:
+            onchain_cache.complete(key, values[index])
+
+    for index, future in waiting:
+        results[index] = await future
+    return results
+
+
+async def _post_batch(
+    network_chain: NetworkChain,
+    payload: List[dict],
+    retry_attempts: int,
+    backoff_seconds: float,
+) -> List[dict]:
+    session = await get_async_session(network_chain)
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(retry_attempts),
+        wait=wait_exponential(multiplier=backoff_seconds, max=10),
+        retry=retry_if_exception(_is_retryable),
+        reraise=True,
+    ):
+        with attempt:
+            async with session.post(get_rpc_url(network_chain), json=payload) as response:
+                if response.status != 200:
+                    raise RpcRequestError(network_chain, response.status)
+                body = await response.json()
+                if not isinstance(body, list):
+                    error = body.get("error") if isinstance(body, dict) else None
+                    raise RpcRequestError(network_chain, response.status, error or body)
+                return body
+
+
+async def _eth_call_batch(
+    network_chain: NetworkChain,
+    calls: List[ContractCall],
+    retry_attempts: int,
+    backoff_seconds: float,
+) -> List[Any]:
+    payload = [
+        {
+            "jsonrpc": "2.0",
+            "id": index,
+            "method": "eth_call",
+            "params": [
+                {
+                    "from": Web3.to_checksum_address(call.sender),
+                    "to": call.contract.address,
+                    "data": call.contract.encodeABI(fn_name=call.function_name, args=call.args),
+                },
+                "latest",
+            ],
+        }
+        for index, call in enumerate(calls)
+    ]
+    items = await _post_batch(network_chain, payload, retry_attempts, backoff_seconds)
+
+    w3 = get_async_web3(network_chain)
+    values: List[Any] = [None] * len(calls)
+    for item in items:
+        call = calls[item["id"]]
+        if "error" in item:
+            values[item["id"]] = ValueError(
+                f"{call.function_name} call to {call.contract.address} "
+                f"from {call.sender} failed: {item['error']}"
+            )
+        else:
+            values[item["id"]] = _decode_result(w3, call, HexBytes(item["result"]))
+
+    # items the provider left out of its answer
+    for index, value in enumerate(values):
+        if value is None:
+            values[index] = ValueError(f"no result for id {index}")
+    return values
+
+
+async def batch_eth_call(
+    calls: List[ContractCall],
+    batch_size: int = settings.ONCHAIN_BATCH_SIZE,
+    return_exceptions: bool = False,
+    max_concurrency: int = settings.ONCHAIN_BATCH_CONCURRENCY,
+    retry_attempts: int = settings.ONCHAIN_RETRY_ATTEMPTS,
+    backoff_seconds: float = 0.5,
+) -> List[Any]:
+    """
+    Execute calls with their ``sender`` as ``from``, ``batch_size`` calls per
+    JSON-RPC batch request, ``max_concurrency`` batches in flight. Results are
+    returned in the order of ``calls``; with ``return_exceptions`` a failed
+    call yields its exception instead of raising.
+    """
+    batches = []
+    for network_chain in {call.network_chain for call in calls}:
+        indexed_calls = [
+            (index, call) for index, call in enumerate(calls) if call.network_chain == network_chain
+        ]
+        for start in range(0, len(indexed_calls), batch_size):
+            batches.append((network_chain, indexed_calls[start : start + batch_size]))
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def send(network_chain: NetworkChain, batch: List[Tuple[int, ContractCall]]):
+        async with semaphore:
+            return await _eth_call_batch(
+                network_chain, [call for _, call in batch], retry_attempts, backoff_seconds
+            )
+
+    results: List[Any] = [None] * len(calls)
+    batch_results = await asyncio.gather(
+        *[send(network_chain, batch) for network_chain, batch in batches],
+        return_exceptions=True,
+    )
+
+    for (_, batch), values in zip(batches, batch_results):
+        for position, (index, _) in enumerate(batch):
+            value = values if isinstance(values, Exception) else values[position]
+            if isinstance(value, Exception) and not return_exceptions:
+                raise value
+            results[index] = value
+    return results
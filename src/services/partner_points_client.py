@@ -0,0 +1,153 @@
+"""
+Async client for the restaking partners' points APIs.
+
+Requests share one pooled ``httpx.AsyncClient`` per event loop, run with at
+most PARTNER_MAX_CONCURRENCY in flight, are spaced by a per-partner rate
+limit, time out after PARTNER_HTTP_TIMEOUT_SECONDS and are retried with
+exponential backoff on transport errors, 429 and 5xx responses. Successful
+responses are cached for PARTNER_POINTS_CACHE_TTL_SECONDS.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from core import constants
+from core.config import settings
+from schemas import EarnedRestakingPoints
+from services import kelpdao_service, renzo_service, zircuit_service
+
+PARTNER_SERVICES = {
+    constants.RENZO: renzo_service,
+    constants.ZIRCUIT: zircuit_service,
+    constants.KELPDAO: kelpdao_service,
+}
+
+
+class PartnerRequestError(Exception):
+    def __init__(self, partner_name: str, status_code: int):
+        super().__init__(
+            f"{partner_name} request failed with status {status_code}"
+        )
+        self.status_code = status_code
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return isinstance(exc, PartnerRequestError) and (
+        exc.status_code == 429 or exc.status_code >= 500
+    )
+
+
+class _RateLimiter:
+    def __init__(self, requests_per_second: float):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class PartnerPointsClient:
+    def __init__(
+        self,
+        max_concurrency: int = settings.PARTNER_MAX_CONCURRENCY,
+        rate_limits: Optional[Dict[str, float]] = None,
+        retry_attempts: int = settings.PARTNER_RETRY_ATTEMPTS,
+        cache_ttl_seconds: float = settings.PARTNER_POINTS_CACHE_TTL_SECONDS,
+        backoff_seconds: float = 0.5,
+    ):
+        self.max_concurrency = max_concurrency
+        self.rate_limits = (
+            rate_limits if rate_limits is not None else settings.PARTNER_RATE_LIMITS
+        )
+        self.retry_attempts = retry_attempts
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.backoff_seconds = backoff_seconds
+        # (partner_name, address) -> (expires_at, points)
+        self._cache: Dict[Tuple[str, str], Tuple[float, EarnedRestakingPoints]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _bind(self):
+        # the http client, semaphore and limiters belong to the running loop
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        self._client = httpx.AsyncClient(
+            timeout=settings.PARTNER_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.PARTNER_HTTP_POOL_SIZE,
+                max_keepalive_connections=settings.PARTNER_HTTP_POOL_SIZE,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._limiters = {
+            partner_name: _RateLimiter(self.rate_limits.get(partner_name, 0))
+            for partner_name in PARTNER_SERVICES
+        }
+        self._loop = loop
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    def invalidate(self):
+        self._cache.clear()
+
+    async def _get_json(self, partner_name: str, url: str, headers: dict):
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.retry_attempts),
+            wait=wait_exponential(multiplier=self.backoff_seconds, max=10),
+            retry=retry_if_exception(_is_retryable),
+            reraise=True,
+        ):
+            with attempt:
+                await self._limiters[partner_name].acquire()
+                response = await self._client.get(url, headers=headers)
+                if response.status_code != 200:
+                    raise PartnerRequestError(partner_name, response.status_code)
+                return response.json()
+
+    async def get_points(
+        self, partner_name: str, user_address: str
+    ) -> EarnedRestakingPoints:
+        if partner_name not in PARTNER_SERVICES:
+            raise ValueError(f"Partner {partner_name} not supported")
+
+        key = (partner_name, user_address.lower())
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1].model_copy()
+
+        self._bind()
+        service = PARTNER_SERVICES[partner_name]
+        async with self._semaphore:
+            data = await self._get_json(
+                partner_name, service.get_points_url(user_address), service.headers
+            )
+
+        points = service.parse_points(user_address, data)
+        self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, points)
+        return points.model_copy()
+
+
+partner_points_client = PartnerPointsClient()
@@ -0,0 +1,184 @@
+"""
+Incremental pps statistics.
+
+The all time high, sortino ratio, downside risk and risk factor of a vault
+are derived from running aggregates stored in ``vault_pps_statistics``, so a
+new pps point costs O(1) instead of reloading and re-evaluating the whole
+``pps_history``. The results match the empyrical computation over the full
+history (weekly annualization, required return 0).
+"""
+
+import math
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, Tuple
+
+from sqlmodel import Session, select
+
+from models.pps_history import PricePerShareHistory
+from models.pps_statistics import VaultPpsStatistics
+
+# empyrical annualization factor of the "weekly" period
+WEEKS_PER_YEAR = 52
+
+
+def _normalize_datetime(value) -> datetime:
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _pct_change(previous: float, current: float) -> float:
+    # same as pandas pct_change, division by zero gives inf or NaN
+    if previous == 0:
+        return math.nan if current == 0 else math.copysign(math.inf, current)
+    return current / previous - 1
+
+
+def _finite_or_zero(value: float) -> float:
+    return value if math.isfinite(value) else 0
+
+
+def _fold_return(state: VaultPpsStatistics, pct_change: float):
+    if math.isnan(pct_change):
+        return
+    state.return_count += 1
+    state.return_sum += pct_change
+    if pct_change < 0:
+        state.negative_return_count += 1
+        state.negative_return_sum += pct_change
+        state.negative_return_square_sum += pct_change**2
+
+
+def _append_point(state: VaultPpsStatistics, pps_datetime: datetime, price_per_share: float):
+    if state.last_price_per_share is not None:
+        if state.previous_price_per_share is not None:
+            _fold_return(
+                state,
+                _pct_change(state.previous_price_per_share, state.last_price_per_share),
+            )
+        if state.all_time_high_per_share is None or (
+            state.last_price_per_share > state.all_time_high_per_share
+        ):
+            state.all_time_high_per_share = state.last_price_per_share
+        state.previous_price_per_share = state.last_price_per_share
+
+    state.last_price_per_share = price_per_share
+    state.last_datetime = pps_datetime
+    state.point_count += 1
+
+
+def apply_price_per_share(
+    state: VaultPpsStatistics, pps_datetime: datetime, price_per_share: float
+) -> bool:
+    """
+    Add a pps point to the state. A point at the datetime of the last one
+    replaces it. Returns False when the point is older than the last one, the
+    state has to be rebuilt from history then.
+    """
+    pps_datetime = _normalize_datetime(pps_datetime)
+    if state.last_datetime is not None:
+        if pps_datetime < state.last_datetime:
+            return False
+        if pps_datetime == state.last_datetime:
+            state.last_price_per_share = price_per_share
+            return True
+
+    _append_point(state, pps_datetime, price_per_share)
+    return True
+
+
+def compute_pps_statistics(
+    state: VaultPpsStatistics,
+) -> Tuple[float, float, float, float]:
+    """Return (all_time_high_per_share, sortino, downside, risk_factor)."""
+    if state.point_count == 0:
+        return 0, 0, 0, 0
+
+    folded = VaultPpsStatistics(
+        return_count=state.return_count,
+        return_sum=state.return_sum,
+        negative_return_count=state.negative_return_count,
+        negative_return_sum=state.negative_return_sum,
+        negative_return_square_sum=state.negative_return_square_sum,
+    )
+    if state.previous_price_per_share is not None:
+        _fold_return(
+            folded, _pct_change(state.previous_price_per_share, state.last_price_per_share)
+        )
+
+    all_time_high_per_share = state.last_price_per_share
+    if state.all_time_high_per_share is not None:
+        all_time_high_per_share = max(
+            state.all_time_high_per_share, state.last_price_per_share
+        )
+
+    downside = 0
+    sortino = 0
+    if folded.return_count > 0:
+        downside = _finite_or_zero(
+            math.sqrt(folded.negative_return_square_sum / folded.return_count)
+            * math.sqrt(WEEKS_PER_YEAR)
+        )
+        # empyrical needs at least two pps points for a sortino ratio
+        if state.point_count >= 2 and downside != 0:
+            mean_return = folded.return_sum / folded.return_count
+            sortino = _finite_or_zero(mean_return * WEEKS_PER_YEAR / downside)
+
+    risk_factor = 0
+    if folded.negative_return_count > 0:
+        # population standard deviation of the negative returns, as np.std
+        mean_negative = folded.negative_return_sum / folded.negative_return_count
+        variance = (
+            folded.negative_return_square_sum / folded.negative_return_count
+            - mean_negative**2
+        )
+        risk_factor = _finite_or_zero(math.sqrt(max(variance, 0)))
+
+    return all_time_high_per_share, sortino, downside, risk_factor
+
+
+def build_pps_statistics(
+    vault_id: uuid.UUID, points: Iterable[Tuple[datetime, float]]
+) -> VaultPpsStatistics:
+    """Fold (datetime, pps) points, sorted by datetime, into a new state."""
+    state = VaultPpsStatistics(vault_id=vault_id)
+    for pps_datetime, price_per_share in points:
+        _append_point(state, _normalize_datetime(pps_datetime), price_per_share)
+    return state
+
+
+def rebuild_pps_statistics(session: Session, vault_id: uuid.UUID) -> VaultPpsStatistics:
+    """Recompute the state of the vault from pps_history. The caller commits."""
+    points = session.exec(
+        select(PricePerShareHistory.datetime, PricePerShareHistory.price_per_share)
+        .where(PricePerShareHistory.vault_id == vault_id)
+        .order_by(PricePerShareHistory.datetime.asc())
+    ).all()
+    return session.merge(build_pps_statistics(vault_id, points))
+
+
+def get_pps_statistics_state(session: Session, vault_id: uuid.UUID) -> VaultPpsStatistics:
+    state = session.get(VaultPpsStatistics, vault_id)
+    if state is None:
+        state = rebuild_pps_statistics(session, vault_id)
+    return state
+
+
+def calculate_pps_statistics(session: Session, vault_id: uuid.UUID):
+    return compute_pps_statistics(get_pps_statistics_state(session, vault_id))
+
+
+def record_price_per_share(
+    session: Session, vault_id: uuid.UUID, pps_datetime: datetime, price_per_share: float
+):
+    """
+    Apply a pps point which has just been written to pps_history to the state
+    of the vault. The caller commits.
+    """
+    state = session.get(VaultPpsStatistics, vault_id)
+    if state is None or not apply_price_per_share(state, pps_datetime, price_per_share):
+        # pps_history already holds the point once the session autoflushes
+        rebuild_pps_statistics(session, vault_id)
@@ -31,18 +31,16 @@ class WebSocketManager:
         await self.disconnect()
         await self.connect()
 
-    async def read_messages(self, read_timeout=0.1, backoff=0.1, on_disconnect=None):
+    async def read_messages(self, on_disconnect=None):
+        # recv() suspends until the next frame, no polling between messages
         while True:
             try:
-                message = await asyncio.wait_for(
-                    self.websocket.recv(), timeout=read_timeout
-                )
-                yield message
+                message = await self.websocket.recv()
             except (ConnectionClosedError, ConnectionClosedOK) as e:
                 raise e
-            except asyncio.TimeoutError:
-                await asyncio.sleep(backoff)
             except Exception as e:
                 self.logger.error(e)
                 self.logger.error(traceback.format_exc())
                 await asyncio.sleep(1)
+                continue
+            yield message
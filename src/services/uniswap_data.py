@@ -1,6 +1,8 @@
 import requests
 from web3 import Web3
 from core.config import settings
+from core.web3_provider import get_web3
+from models.vaults import NetworkChain
 
 
 headers = {
@@ -21,7 +23,7 @@ class Quotation:
 
 
 def get_uniswap_quote(token_in, src_amount, token_out, chain_id=42161) -> Quotation:
-    w3 = Web3(Web3.HTTPProvider(settings.ARBITRUM_MAINNET_INFURA_URL))
+    w3 = get_web3(NetworkChain.arbitrum_one)
 
     if not w3.is_connected():
         raise Exception("Web3 provider is not connected")
@@ -0,0 +1,161 @@
+"""
+In-process cache of the static routing fields of the vaults.
+
+The listener and the jobs resolve vaults from memory by id, slug or lowercase
+contract address instead of querying Postgres on every log. Only the fields
+which change a few times a month are cached (address, chain, strategy,
+currency, ...); APY, rounds and the other fields the jobs rewrite are left
+None and must be read from the vaults table. The cache is reloaded after
+VAULT_REGISTRY_TTL_SECONDS, when ``invalidate`` is called, or when a lookup
+misses.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Union
+
+from sqlmodel import Session, select
+
+from core import constants
+from core.abi_reader import read_abi
+from core.config import settings
+from core.db import engine
+from models.vaults import NetworkChain, Vault, VaultCategory
+
+logger = logging.getLogger(__name__)
+
+VAULT_ABI_NAMES = {
+    constants.DELTA_NEUTRAL_STRATEGY: "RockOnyxDeltaNeutralVault",
+    constants.OPTIONS_WHEEL_STRATEGY: "RockOnyxStableCoin",
+}
+
+# the fields of the cached vaults, the others are None
+VAULT_ROUTING_FIELDS = [
+    "id",
+    "name",
+    "slug",
+    "contract_address",
+    "vault_currency",
+    "routes",
+    "category",
+    "network_chain",
+    "strategy_name",
+    "is_active",
+    "owner_wallet_address",
+]
+
+# a lookup miss reloads the vaults at most once in this interval
+MISS_RELOAD_INTERVAL_SECONDS = 5
+
+
+class VaultRegistry:
+    def __init__(self, ttl_seconds: float = settings.VAULT_REGISTRY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._vaults: List[Vault] = []
+        self._by_id: Dict[uuid.UUID, Vault] = {}
+        self._by_slug: Dict[str, Vault] = {}
+        self._by_address: Dict[str, Vault] = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _reload(self):
+        with self._lock:
+            self._load()
+
+    async def refresh(self):
+        """Reload the vaults on a worker thread, for callers on the event loop."""
+        await asyncio.to_thread(self._reload)
+
+    def _load(self):
+        with Session(engine) as session:
+            rows = session.exec(
+                select(*[getattr(Vault, field) for field in VAULT_ROUTING_FIELDS])
+            ).all()
+        vaults = [Vault(**dict(zip(VAULT_ROUTING_FIELDS, row))) for row in rows]
+
+        self._vaults = list(vaults)
+        self._by_id = {vault.id: vault for vault in vaults}
+        self._by_slug = {vault.slug: vault for vault in vaults if vault.slug}
+        self._by_address = {
+            vault.contract_address.lower(): vault
+            for vault in vaults
+            if vault.contract_address
+        }
+        self._loaded_at = time.monotonic()
+        logger.info("Vault registry loaded %s vaults", len(vaults))
+
+    def _ensure_loaded(self, max_age: Optional[float] = None):
+        max_age = self.ttl_seconds if max_age is None else max_age
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < max_age:
+            return
+
+        with self._lock:
+            # another thread may have reloaded while we were waiting for the lock
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= max_age:
+                self._load()
+
+    def _lookup(self, index_name: str, key) -> Optional[Vault]:
+        self._ensure_loaded()
+        vault = getattr(self, index_name).get(key)
+        if vault is None:
+            self._ensure_loaded(max_age=MISS_RELOAD_INTERVAL_SECONDS)
+            vault = getattr(self, index_name).get(key)
+        return vault
+
+    def all(self) -> List[Vault]:
+        self._ensure_loaded()
+        return list(self._vaults)
+
+    def get_active_vaults(
+        self,
+        category: Optional[VaultCategory] = None,
+        network_chain: Optional[NetworkChain] = None,
+        strategy_name: Optional[str] = None,
+    ) -> List[Vault]:
+        return [
+            vault
+            for vault in self.all()
+            if vault.is_active
+            and (category is None or vault.category == category)
+            and (network_chain is None or vault.network_chain == network_chain)
+            and (strategy_name is None or vault.strategy_name == strategy_name)
+        ]
+
+    def get_by_id(self, vault_id: Union[str, uuid.UUID]) -> Optional[Vault]:
+        if not isinstance(vault_id, uuid.UUID):
+            try:
+                vault_id = uuid.UUID(str(vault_id))
+            except ValueError:
+                return None
+        return self._lookup("_by_id", vault_id)
+
+    def get_by_slug(self, slug: str) -> Optional[Vault]:
+        return self._lookup("_by_slug", slug)
+
+    def get_by_address(self, contract_address: str) -> Optional[Vault]:
+        if not contract_address:
+            return None
+        return self._lookup("_by_address", contract_address.lower())
+
+    @staticmethod
+    def get_abi_name(vault: Vault) -> str:
+        if vault.strategy_name not in VAULT_ABI_NAMES:
+            raise ValueError(f"Invalid vault strategy {vault.strategy_name}")
+        return VAULT_ABI_NAMES[vault.strategy_name]
+
+    def get_abi(self, vault: Vault) -> list:
+        return read_abi(self.get_abi_name(vault))
+
+    @staticmethod
+    def get_rpc_url(vault: Vault) -> str:
+        return constants.NETWORK_RPC_URLS[vault.network_chain]
+
+
+vault_registry = VaultRegistry()
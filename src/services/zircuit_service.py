@@ -1,5 +1,5 @@
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, List
 from core.config import settings
 from schemas import EarnedRestakingPoints
 from core import constants
@@ -15,16 +15,11 @@ headers = {
 }
 
 
-def get_points(user_address: str) -> EarnedRestakingPoints:
-    url = f"{settings.ZIRCUIT_BASE_API_URL}portfolio/{user_address}"
-
-    response = requests.get(url, headers=headers)
-
-    if response.status_code != 200:
-        raise Exception(f"Request failed with status {response.status_code}")
+def get_points_url(user_address: str) -> str:
+    return f"{settings.ZIRCUIT_BASE_API_URL}portfolio/{user_address}"
 
-    data = response.json()
 
+def parse_points(user_address: str, data: List[Dict[str, Any]]) -> EarnedRestakingPoints:
     total_points = sum([float(x["points"]) for x in data])
 
     return EarnedRestakingPoints(
@@ -34,6 +29,17 @@ def get_points(user_address: str) -> EarnedRestakingPoints:
     )
 
 
+def get_points(user_address: str) -> EarnedRestakingPoints:
+    url = get_points_url(user_address)
+
+    response = requests.get(url, headers=headers)
+
+    if response.status_code != 200:
+        raise Exception(f"Request failed with status {response.status_code}")
+
+    return parse_points(user_address, response.json())
+
+
 # Usage:
 # points = get_points('0xBC05da14287317FE12B1a2b5a0E1d756Ff1801Aa')
 # print(points)
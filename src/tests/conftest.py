@@ -0,0 +1,53 @@
+from typing import List, Optional
+
+import pendulum
+import pytest
+from sqlalchemy.orm import Session
+
+from core.db import engine
+from models.point_distribution_history import PointDistributionHistory
+from models.pps_history import LatestPricePerShare, PricePerShareHistory
+from models.user_points import UserPointAudit, UserPoints
+from models.user_portfolio import UserPortfolio
+from models.vault_performance import VaultPerformance
+from models.vaults import Vault
+from services.latest_pps import upsert_latest_price_per_share
+from services.vault_registry import vault_registry
+
+
+@pytest.fixture(scope="module")
+def db_session():
+    session = Session(engine)
+    yield session
+
+
+@pytest.fixture
+def seed_vaults(db_session: Session):
+    """
+    Empty the vaults and the tables which reference them, then add ``vaults``,
+    with ``latest_pps`` as their latest price per share when given.
+    """
+
+    def seed(vaults: List[Vault], latest_pps: Optional[float] = None) -> List[Vault]:
+        db_session.query(UserPointAudit).delete()
+        db_session.query(UserPoints).delete()
+        db_session.query(PointDistributionHistory).delete()
+        db_session.query(VaultPerformance).delete()
+        db_session.query(UserPortfolio).delete()
+        db_session.commit()
+        db_session.query(PricePerShareHistory).delete()
+        db_session.query(LatestPricePerShare).delete()
+        db_session.commit()
+        db_session.query(Vault).delete()
+        db_session.commit()
+
+        db_session.add_all(vaults)
+        db_session.commit()
+        if latest_pps is not None:
+            for vault in vaults:
+                upsert_latest_price_per_share(db_session, vault.id, latest_pps, pendulum.now())
+            db_session.commit()
+        vault_registry.invalidate()
+        return vaults
+
+    return seed
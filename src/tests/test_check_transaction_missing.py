@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+import uuid
+
+from hexbytes import HexBytes
+import pytest
+from sqlalchemy.orm import Session
+
+from bg_tasks import check_transaction_missing_every_three_days as check_missing
+from bg_tasks.check_transaction_missing_every_three_days import (
+    apply_missing_events,
+    find_block_by_timestamp,
+    get_scan_end_block,
+)
+from core.config import settings
+from models.transaction import Transaction
+from models.user_portfolio import UserPortfolio
+from models.vaults import Vault
+from services.listener_checkpoint import END_OF_BLOCK
+from web3_listener import iter_vault_logs
+
+VAULT_ADDRESS = "0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5"
+USER_ADDRESS = "0x20f89ba1b0fc1e83f9aef0a134095cd63f7e8cc7"
+DEPOSIT_TOPIC = "0x73a19dd210f1a7f902193214c0ee91dd35ee5b4d920cba8d519eca65a7b488ca"
+
+
+@pytest.fixture
+def vault():
+    return Vault(
+        contract_address=VAULT_ADDRESS,
+        category="real_yield",
+        strategy_name="delta_neutral_strategy",
+        network_chain="arbitrum_one",
+        vault_currency="USDC",
+        name="Delta Neutral Strategy",
+        id=uuid.uuid4(),
+    )
+
+
+@pytest.fixture(autouse=True)
+def seed_data(seed_vaults, vault: Vault):
+    seed_vaults([vault], latest_pps=1)
+
+
+def _deposit_log(txhash: str, block_number: int, log_index: int) -> dict:
+    return {
+        "removed": False,
+        "logIndex": log_index,
+        "transactionHash": txhash,
+        "blockNumber": block_number,
+        "address": VAULT_ADDRESS,
+        "data": HexBytes("0x{:064x}".format(10_000000) + "{:064x}".format(10_000000)),
+        "topics": [
+            HexBytes(DEPOSIT_TOPIC),
+            HexBytes("0x" + "0" * 24 + USER_ADDRESS[2:]),
+        ],
+    }
+
+
+def _deposit(txhash: str, log_index: int) -> tuple:
+    return VAULT_ADDRESS, _deposit_log(txhash, 192713205, log_index), "Deposit"
+
+
+def test_apply_missing_events_skips_recorded_transactions(db_session: Session):
+    recorded, missing = "0x{:064x}".format(1001), "0x{:064x}".format(1002)
+    db_session.query(Transaction).filter(Transaction.txhash.in_([recorded, missing])).delete()
+    db_session.add(Transaction(txhash=recorded))
+    db_session.commit()
+
+    events = [_deposit(recorded, 0), _deposit(missing, 1)]
+    assert apply_missing_events(events, dry_run=True) == 1
+    assert db_session.query(UserPortfolio).count() == 0
+
+    assert apply_missing_events(events) == 1
+    user_portfolio = (
+        db_session.query(UserPortfolio)
+        .filter(UserPortfolio.user_address == USER_ADDRESS)
+        .first()
+    )
+    assert user_portfolio.total_balance == 10
+
+    # the missing transaction is recorded now
+    assert apply_missing_events(events) == 0
+
+
+@pytest.mark.asyncio
+async def test_find_block_by_timestamp():
+    requested = []
+
+    async def get_block(block_number):
+        requested.append(block_number)
+        # a block every 12 seconds
+        return {"timestamp": block_number * 12}
+
+    w3 = SimpleNamespace(eth=SimpleNamespace(get_block=get_block))
+
+    assert await find_block_by_timestamp(w3, 120, head=1000) == 10
+    assert await find_block_by_timestamp(w3, 121, head=1000) == 11
+    # a binary search, not a scan
+    assert len(requested) <= 2 * 11
+
+    assert await find_block_by_timestamp(w3, 0, head=1000) == 0
+    assert await find_block_by_timestamp(w3, 10**9, head=1000) == 1000
+
+
+def test_get_scan_end_block(monkeypatch):
+    checkpoints = {}
+    monkeypatch.setattr(
+        check_missing, "get_checkpoints", lambda session, network_chain: checkpoints
+    )
+
+    # no listener checkpoint yet, scan up to the head
+    assert get_scan_end_block("arbitrum_one", head=500) == 500
+
+    # the slowest partition is in the middle of block 300, which is left to it
+    checkpoints.update({0: (320, END_OF_BLOCK), 1: (300, 4)})
+    assert get_scan_end_block("arbitrum_one", head=500) == 299
+
+    # the slowest partition finished block 300
+    checkpoints[1] = (300, END_OF_BLOCK)
+    assert get_scan_end_block("arbitrum_one", head=500) == 300
+
+    # never past the head
+    assert get_scan_end_block("arbitrum_one", head=250) == 250
+
+
+@pytest.mark.asyncio
+async def test_iter_vault_logs_halves_rejected_ranges(monkeypatch, vault: Vault):
+    monkeypatch.setattr(settings, "WEB3_LISTENER_BACKFILL_CHUNK_BLOCKS", 8)
+    ranges = []
+
+    async def get_logs(log_filter):
+        from_block, to_block = log_filter["fromBlock"], log_filter["toBlock"]
+        ranges.append((from_block, to_block))
+        if to_block - from_block + 1 > 4:
+            raise ValueError("query returned more than 10000 results")
+        logs = [
+            _deposit_log("0x{:064x}".format(block), block, 0)
+            for block in range(from_block, to_block + 1)
+            if block % 3 == 0
+        ]
+        removed = _deposit_log("0x{:064x}".format(10**6 + from_block), from_block, 1)
+        removed["removed"] = True
+        # out of order, with a reorged log
+        return list(reversed(logs)) + [removed]
+
+    w3 = SimpleNamespace(eth=SimpleNamespace(get_logs=get_logs))
+
+    chunks = [chunk async for chunk in iter_vault_logs(w3, [vault], 1, 12)]
+
+    # 8 blocks are rejected, then 4 block chunks, the chunk grows back each time
+    assert ranges == [(1, 8), (1, 4), (5, 12), (5, 8), (9, 12)]
+    assert [to_block for to_block, _ in chunks] == [4, 8, 12]
+
+    events = [event for _, chunk_events in chunks for event in chunk_events]
+    assert [entry["blockNumber"] for _, entry, _ in events] == [3, 6, 9, 12]
+    assert all(event_name == "Deposit" for _, _, event_name in events)
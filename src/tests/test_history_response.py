@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+
+from starlette.requests import Request
+
+from utils import history_response
+from utils.history_response import (
+    _stream_columns,
+    etag_matches,
+    history_etag,
+    not_modified_response,
+)
+
+
+def _request(headers: dict) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+    )
+
+
+def test_stream_columns_is_valid_json(monkeypatch):
+    monkeypatch.setattr(history_response, "STREAM_CHUNK_SIZE", 3)
+    columns = {"date": [f"2024-01-{day:02d}" for day in range(1, 11)], "apy": [], "tvl": [1.5] * 7}
+
+    assert json.loads("".join(_stream_columns(columns))) == columns
+
+
+def test_not_modified_response():
+    last_datetime = datetime(2024, 7, 1, 8, 30, 15, 123456)
+    etag = history_etag("tvl", "vault", None, None, "day", 10, last_datetime)
+
+    response = not_modified_response(_request({"If-None-Match": etag}), etag, last_datetime)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    assert not_modified_response(_request({"If-None-Match": '"stale"'}), etag, last_datetime) is None
+    assert (
+        not_modified_response(
+            _request({"If-Modified-Since": "Mon, 01 Jul 2024 08:30:15 GMT"}), etag, last_datetime
+        )
+        is not None
+    )
+    assert (
+        not_modified_response(
+            _request({"If-Modified-Since": "Mon, 01 Jul 2024 08:30:14 GMT"}), etag, last_datetime
+        )
+        is None
+    )
+    assert not_modified_response(_request({}), etag, last_datetime) is None
+
+
+def test_etag_matches_lists_wildcards_and_weak_tags():
+    etag = '"abc"'
+
+    assert etag_matches(_request({}), etag) is None
+    assert etag_matches(_request({"If-None-Match": '"other", "abc"'}), etag)
+    assert etag_matches(_request({"If-None-Match": 'W/"abc"'}), etag)
+    assert etag_matches(_request({"If-None-Match": "*"}), etag)
+    assert not etag_matches(_request({"If-None-Match": '"other", W/"abcd"'}), etag)
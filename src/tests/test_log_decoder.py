@@ -0,0 +1,91 @@
+from hexbytes import HexBytes
+import pytest
+
+from core.config import settings
+from models.vaults import Vault
+from services.log_decoder import decode_vault_event, event_schemas
+
+USER_TOPIC = HexBytes("0x00000000000000000000000020f89ba1b0fc1e83f9aef0a134095cd63f7e8cc7")
+
+
+def _log(topic0: str, amount: int, shares: int, *topics) -> dict:
+    return {
+        "data": HexBytes("0x{:064x}".format(amount) + "{:064x}".format(shares)),
+        "topics": [HexBytes(topic0), USER_TOPIC, *topics],
+    }
+
+
+@pytest.fixture
+def vault():
+    return Vault(
+        name="Delta Neutral Strategy",
+        strategy_name="delta_neutral_strategy",
+        vault_currency="USDC",
+    )
+
+
+def test_event_schemas_cover_listener_topics():
+    schemas = event_schemas()
+    for topic in [
+        settings.STABLECOIN_DEPOSIT_VAULT_FILTER_TOPICS,
+        settings.STABLECOIN_INITIATE_WITHDRAW_VAULT_FILTER_TOPICS,
+        settings.DELTA_NEUTRAL_INITIATE_WITHDRAW_EVENT_TOPIC,
+        settings.DELTA_NEUTRAL_COMPLETE_WITHDRAW_EVENT_TOPIC,
+        settings.MULTIPLE_STABLECOINS_DEPOSIT_EVENT_TOPIC,
+    ]:
+        assert bytes(HexBytes(topic)) in schemas
+
+
+def test_decode_vault_event(vault: Vault):
+    entry = _log(settings.DELTA_NEUTRAL_DEPOSIT_EVENT_TOPIC, 20_000000, 19_500000)
+
+    assert decode_vault_event(vault, entry) == (
+        20,
+        19.5,
+        "0x20f89ba1b0fc1e83f9aef0a134095cd63f7e8cc7",
+    )
+
+
+def test_decode_vault_event_uses_token_decimals(vault: Vault):
+    dai_topic = HexBytes("0x" + settings.DAI_ADDRESS["arbitrum_one"][2:].rjust(64, "0"))
+    entry = _log(
+        settings.MULTIPLE_STABLECOINS_DEPOSIT_EVENT_TOPIC,
+        25 * 10**18,
+        25_000000,
+        dai_topic,
+    )
+    assert decode_vault_event(vault, entry)[:2] == (25, 25)
+
+    # without a token in the event the vault currency decides
+    vault.vault_currency = "wstETH"
+    entry = _log(settings.DELTA_NEUTRAL_DEPOSIT_EVENT_TOPIC, 10**17, 300_000000)
+    assert decode_vault_event(vault, entry)[:2] == (0.1, 300)
+
+
+def test_decode_vault_event_rejects_unknown_and_malformed_logs(vault: Vault):
+    with pytest.raises(ValueError):
+        decode_vault_event(vault, _log("0x" + "00" * 32, 1, 1))
+
+    entry = _log(settings.DELTA_NEUTRAL_DEPOSIT_EVENT_TOPIC, 1, 1)
+    entry["data"] = entry["data"][:32]
+    with pytest.raises(ValueError):
+        decode_vault_event(vault, entry)
+
+
+def test_decode_vault_event_rejects_unknown_decimals(vault: Vault):
+    # an 18 decimals deposit must not be read with a guessed 6 decimals
+    entry = _log(settings.DELTA_NEUTRAL_DEPOSIT_EVENT_TOPIC, 10**18, 1_000000)
+    for vault_currency in [None, "", "wsteth-typo"]:
+        vault.vault_currency = vault_currency
+        with pytest.raises(ValueError):
+            decode_vault_event(vault, entry)
+
+    vault.vault_currency = " USDC "
+    entry = _log(settings.DELTA_NEUTRAL_DEPOSIT_EVENT_TOPIC, 1_000000, 1_000000)
+    assert decode_vault_event(vault, entry)[:2] == (1, 1)
+
+    # a deposited token the decoder does not know
+    unknown_token = HexBytes("0x" + ("11" * 20).rjust(64, "0"))
+    entry = _log(settings.MULTIPLE_STABLECOINS_DEPOSIT_EVENT_TOPIC, 1, 1, unknown_token)
+    with pytest.raises(ValueError):
+        decode_vault_event(vault, entry)
@@ -0,0 +1,271 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.web3_provider import get_async_contract
+from models.vaults import NetworkChain
+from services import onchain_reader
+from services.onchain_cache import OnchainCallCache
+from services.onchain_reader import ContractCall
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_coalesces_concurrent_calls():
+    cache = OnchainCallCache(ttl_seconds=60, max_size=10)
+    key = cache.make_key("arbitrum_one", "0xVault", "pricePerShare")
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 1_050_000
+
+    values = await asyncio.gather(*[cache.get_or_load(key, loader) for _ in range(10)])
+
+    assert values == [1_050_000] * 10
+    assert calls == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 9
+
+    assert await cache.get_or_load(key, loader) == 1_050_000
+    assert calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_expires_and_evicts():
+    cache = OnchainCallCache(ttl_seconds=0, max_size=2)
+
+    async def loader():
+        return 1
+
+    for i in range(3):
+        await cache.get_or_load(cache.make_key("base", f"0x{i}", "totalValueLocked"), loader)
+
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    # ttl = 0, every read goes to the chain
+    await cache.get_or_load(cache.make_key("base", "0x2", "totalValueLocked"), loader)
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 4
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_propagates_errors_to_waiters():
+    cache = OnchainCallCache(ttl_seconds=60, max_size=10)
+    key = cache.make_key("ethereum", "0xVault", "pricePerShare")
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise ValueError("rpc error")
+
+    results = await asyncio.gather(
+        *[cache.get_or_load(key, loader) for _ in range(3)], return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache.stats()["in_flight"] == 0
+    assert cache.stats()["size"] == 0
+
+
+@pytest.fixture
+def reader_cache(monkeypatch):
+    cache = OnchainCallCache(ttl_seconds=60, max_size=10)
+    monkeypatch.setattr(onchain_reader, "onchain_cache", cache)
+    return cache
+
+
+def _call(function_name: str) -> ContractCall:
+    contract = SimpleNamespace(address="0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5")
+    return ContractCall(NetworkChain.arbitrum_one, contract, function_name)
+
+
+@pytest.mark.asyncio
+async def test_read_contracts_caches_and_coalesces(monkeypatch, reader_cache):
+    batches = []
+
+    async def read_uncached(calls):
+        batches.append([call.function_name for _, call in calls])
+        await asyncio.sleep(0.01)
+        return {index: call.function_name for index, call in calls}
+
+    monkeypatch.setattr(onchain_reader, "_read_uncached", read_uncached)
+
+    calls = [_call("pricePerShare"), _call("pricePerShare"), _call("balanceOf")]
+    results = await asyncio.gather(
+        onchain_reader.read_contracts(calls), onchain_reader.read_contracts(calls)
+    )
+
+    assert results == [["pricePerShare", "pricePerShare", "balanceOf"]] * 2
+    # the second read waits for the first one's pricePerShare, balanceOf is never cached
+    assert batches == [["pricePerShare", "balanceOf"], ["balanceOf"]]
+    assert reader_cache.stats()["misses"] == 1
+    assert reader_cache.stats()["coalesced"] == 2
+
+    await onchain_reader.read_contracts([_call("pricePerShare")])
+    assert reader_cache.stats()["hits"] == 1
+    assert len(batches) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_contracts_propagates_errors_to_waiters(monkeypatch, reader_cache):
+    async def read_uncached(calls):
+        await asyncio.sleep(0.01)
+        raise ValueError("rpc error")
+
+    monkeypatch.setattr(onchain_reader, "_read_uncached", read_uncached)
+
+    results = await asyncio.gather(
+        *[onchain_reader.read_contracts([_call("totalValueLocked")]) for _ in range(3)],
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert reader_cache.stats()["in_flight"] == 0
+    assert reader_cache.stats()["size"] == 0
+
+
+class FakeRpcSession:
+    """
+    Answers eth_call batches with the call id, after ``statuses`` errors and
+    ``bodies``, functions of the request payload, in place of the first answers.
+    """
+
+    def __init__(self, statuses, bodies=()):
+        self.statuses = list(statuses)
+        self.bodies = list(bodies)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def post(self, url, json):
+        session = self
+
+        class Response:
+            async def __aenter__(self):
+                session.requests += 1
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight, session.in_flight)
+                await asyncio.sleep(0.01)
+                self.status = session.statuses.pop(0) if session.statuses else 200
+                return self
+
+            async def __aexit__(self, *exc):
+                session.in_flight -= 1
+
+            async def json(self):
+                if session.bodies:
+                    return session.bodies.pop(0)(json)
+                return [
+                    {"jsonrpc": "2.0", "id": item["id"], "result": "0x{:064x}".format(item["id"])}
+                    for item in json
+                ]
+
+        return Response()
+
+
+def _balance_call() -> ContractCall:
+    contract = get_async_contract(
+        NetworkChain.arbitrum_one, "0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5", "erc20"
+    )
+    return ContractCall(
+        NetworkChain.arbitrum_one,
+        contract,
+        "balanceOf",
+        ("0x20f89bA1B0Fc1e83f9aEf0a134095Cd63F7e8CC7",),
+        sender="0x20f89bA1B0Fc1e83f9aEf0a134095Cd63F7e8CC7",
+    )
+
+
+def _fake_session(monkeypatch, session: FakeRpcSession):
+    async def get_async_session(network_chain):
+        return session
+
+    monkeypatch.setattr(onchain_reader, "get_async_session", get_async_session)
+
+
+@pytest.mark.asyncio
+async def test_batch_eth_call_bounds_concurrency(monkeypatch):
+    session = FakeRpcSession([])
+    _fake_session(monkeypatch, session)
+
+    values = await onchain_reader.batch_eth_call(
+        [_balance_call() for _ in range(10)], batch_size=1, max_concurrency=3
+    )
+
+    assert values == [0] * 10
+    assert session.requests == 10
+    assert session.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_eth_call_retries_rate_limits(monkeypatch):
+    session = FakeRpcSession([429, 503])
+    _fake_session(monkeypatch, session)
+
+    values = await onchain_reader.batch_eth_call(
+        [_balance_call(), _balance_call()], backoff_seconds=0
+    )
+    assert values == [0, 1]
+    assert session.requests == 3
+
+    # client errors are not retried, the batch fails
+    session = FakeRpcSession([400])
+    _fake_session(monkeypatch, session)
+    values = await onchain_reader.batch_eth_call(
+        [_balance_call()], return_exceptions=True, backoff_seconds=0
+    )
+    assert isinstance(values[0], onchain_reader.RpcRequestError)
+    assert session.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_eth_call_retries_rejected_batches(monkeypatch):
+    rate_limited = {
+        "jsonrpc": "2.0",
+        "id": None,
+        "error": {"code": -32005, "message": "limit exceeded"},
+    }
+    session = FakeRpcSession([], bodies=[lambda payload: rate_limited])
+    _fake_session(monkeypatch, session)
+
+    values = await onchain_reader.batch_eth_call(
+        [_balance_call(), _balance_call()], backoff_seconds=0
+    )
+    assert values == [0, 1]
+    assert session.requests == 2
+
+    # still rejected after the last attempt, every call of the batch fails with it
+    session = FakeRpcSession([], bodies=[lambda payload: rate_limited] * 2)
+    _fake_session(monkeypatch, session)
+    values = await onchain_reader.batch_eth_call(
+        [_balance_call(), _balance_call()],
+        return_exceptions=True,
+        retry_attempts=2,
+        backoff_seconds=0,
+    )
+    assert all(isinstance(value, onchain_reader.RpcRequestError) for value in values)
+    assert values[0].error["code"] == -32005
+
+
+@pytest.mark.asyncio
+async def test_batch_eth_call_fails_only_dropped_ids(monkeypatch):
+    def drop_second(payload):
+        return [
+            {"jsonrpc": "2.0", "id": item["id"], "result": "0x{:064x}".format(7)}
+            for item in payload
+            if item["id"] != 1
+        ]
+
+    session = FakeRpcSession([], bodies=[drop_second])
+    _fake_session(monkeypatch, session)
+
+    values = await onchain_reader.batch_eth_call(
+        [_balance_call() for _ in range(3)], return_exceptions=True
+    )
+    assert values[0] == values[2] == 7
+    assert isinstance(values[1], ValueError)
+    assert str(values[1]) == "no result for id 1"
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_asyncio
+
+from core import constants
+from core.config import settings
+from services.partner_points_client import PartnerPointsClient, PartnerRequestError
+
+RESPONSES = {
+    "renzo": {"success": True, "data": {"totals": {"renzoPoints": 100, "eigenLayerPoints": 50}}},
+    "zircuit": [{"points": "10"}, {"points": "5.5"}],
+    "kelpdao": {"value": {"kelpMiles": "7", "elPoints": "3"}},
+}
+
+
+class StubPartnerServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubPartnerHandler)
+        self.delay_seconds = 0.0
+        # partner -> status codes to answer before succeeding
+        self.errors = {}
+        self.hits = Counter()
+
+    def url(self, partner_name: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/{partner_name}/"
+
+
+class StubPartnerHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        partner_name = self.path.split("/")[1]
+        self.server.hits[partner_name] += 1
+        time.sleep(self.server.delay_seconds)
+
+        errors = self.server.errors.get(partner_name)
+        if errors:
+            self.send_response(errors.pop(0))
+            self.end_headers()
+            return
+
+        body = json.dumps(RESPONSES[partner_name]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def partner_server(monkeypatch):
+    server = StubPartnerServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(settings, "RENZO_BASE_API_URL", server.url("renzo"))
+    monkeypatch.setattr(settings, "ZIRCUIT_BASE_API_URL", server.url("zircuit"))
+    monkeypatch.setattr(settings, "KELPDAO_BASE_API_URL", server.url("kelpdao"))
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture
+async def client():
+    client = PartnerPointsClient(rate_limits={}, backoff_seconds=0)
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetches_partners_concurrently(partner_server, client):
+    partner_server.delay_seconds = 0.3
+    partners = [constants.RENZO, constants.ZIRCUIT, constants.KELPDAO]
+    addresses = ["0xVault1", "0xVault2"]
+
+    started_at = time.monotonic()
+    results = await asyncio.gather(
+        *[
+            client.get_points(partner_name, address)
+            for partner_name in partners
+            for address in addresses
+        ]
+    )
+
+    assert time.monotonic() - started_at < 0.3 * 3
+    assert [points.total_points for points in results] == [100, 100, 15.5, 15.5, 7, 7]
+    assert results[0].eigen_layer_points == 50
+    assert results[4].eigen_layer_points == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors(partner_server, client):
+    partner_server.errors[constants.RENZO] = [503, 429]
+
+    points = await client.get_points(constants.RENZO, "0xVault1")
+
+    assert points.total_points == 100
+    assert partner_server.hits[constants.RENZO] == 3
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_client_errors(partner_server, client):
+    partner_server.errors[constants.ZIRCUIT] = [404]
+
+    with pytest.raises(PartnerRequestError):
+        await client.get_points(constants.ZIRCUIT, "0xVault1")
+    assert partner_server.hits[constants.ZIRCUIT] == 1
+
+
+@pytest.mark.asyncio
+async def test_caches_responses(partner_server, client):
+    first = await client.get_points(constants.KELPDAO, "0xVault1")
+    first.total_points = 0
+    second = await client.get_points(constants.KELPDAO, "0xvault1")
+
+    assert second.total_points == 7
+    assert partner_server.hits[constants.KELPDAO] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limits_per_partner(partner_server):
+    client = PartnerPointsClient(rate_limits={constants.ZIRCUIT: 10}, backoff_seconds=0)
+    try:
+        started_at = time.monotonic()
+        await asyncio.gather(
+            *[client.get_points(constants.ZIRCUIT, f"0xVault{i}") for i in range(5)]
+        )
+    finally:
+        await client.aclose()
+
+    assert time.monotonic() - started_at >= 0.4
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.orm import Session
+
+from bg_tasks.points_distribution_job_harmonix import (
+    harmonix_distribute_points,
+    harmonix_distribute_points_row_by_row,
+)
+from core import constants
+from models import PointDistributionHistory, UserPoints, UserPortfolio, Vault
+from models.points_multiplier_config import PointsMultiplierConfig
+from models.reward_session_config import RewardSessionConfig
+from models.reward_sessions import RewardSessions
+from models.user_points import UserPointAudit
+from models.user_points_history import UserPointsHistory
+
+SESSION_START = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def clean(session: Session):
+    session.query(UserPointsHistory).delete()
+    session.query(UserPointAudit).delete()
+    session.query(UserPoints).delete()
+    session.query(PointDistributionHistory).delete()
+    session.query(PointsMultiplierConfig).delete()
+    session.query(RewardSessionConfig).delete()
+    session.query(RewardSessions).delete()
+    session.query(UserPortfolio).delete()
+    session.query(Vault).delete()
+    session.commit()
+
+
+@pytest.fixture(autouse=True)
+def clean_points(db_session: Session):
+    clean(db_session)
+
+
+def seed(session: Session, max_points: float):
+    vaults = [
+        Vault(
+            name=f"Vault {i}",
+            contract_address=f"0x{i:040x}",
+            category="real_yield",
+            network_chain="arbitrum_one",
+        )
+        for i in range(3)
+    ]
+    session.add_all(vaults)
+    session.add(PointsMultiplierConfig(vault_id=vaults[0].id, multiplier=1))
+    session.add(PointsMultiplierConfig(vault_id=vaults[1].id, multiplier=2.5))
+
+    reward_session = RewardSessions(
+        session_name="Harmonix S1",
+        start_date=SESSION_START,
+        partner_name=constants.HARMONIX,
+    )
+    session.add(reward_session)
+    session.add(
+        RewardSessionConfig(
+            session_id=reward_session.session_id,
+            max_points=max_points,
+            duration_in_minutes=60 * 24 * 30,
+        )
+    )
+
+    for i in range(12):
+        session.add(
+            UserPortfolio(
+                vault_id=vaults[i % 3].id,
+                user_address=f"0x{i:040x}",
+                total_balance=1000 + 250 * i,
+                init_deposit=1000,
+                total_shares=1000,
+                trade_start_date=SESSION_START + timedelta(hours=7 * i - 20),
+            )
+        )
+    session.commit()
+
+
+def run(session: Session, distribute_points):
+    for hours in (1, 24, 48, 49):
+        distribute_points(SESSION_START + timedelta(hours=hours))
+
+    points = sorted(
+        (user_points.wallet_address, round(user_points.points, 6))
+        for user_points in session.query(UserPoints).all()
+    )
+    history = sorted(
+        (history.created_at, round(history.point, 6))
+        for history in session.query(UserPointsHistory).all()
+    )
+    reward_session = session.query(RewardSessions).one()
+    return (
+        points,
+        history,
+        round(reward_session.points_distributed, 6),
+        reward_session.end_date,
+    )
+
+
+@pytest.mark.parametrize("max_points", [1_000_000, 2_000])
+def test_set_based_accrual_matches_row_by_row(db_session: Session, max_points):
+    seed(db_session, max_points)
+    expected = run(db_session, harmonix_distribute_points_row_by_row)
+
+    clean(db_session)
+    seed(db_session, max_points)
+    actual = run(db_session, harmonix_distribute_points)
+
+    assert actual == expected
@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bg_tasks.utils import calculate_pps_statistics_from_history
+from models.pps_statistics import VaultPpsStatistics
+from services.pps_statistics import (
+    apply_price_per_share,
+    build_pps_statistics,
+    compute_pps_statistics,
+)
+
+START = datetime(2024, 1, 1)
+
+
+def random_walk(size: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    return list(np.cumprod(1 + rng.normal(0.001, 0.01, size)))
+
+
+@pytest.mark.parametrize(
+    "price_per_shares",
+    [
+        [1.0],
+        [1.0, 1.01],
+        [1.0, 0.99],
+        [1.0, 1.01, 1.02, 1.03],
+        [1.0, 0.98, 1.01, 0.97, 1.05, 1.05, 1.04],
+        random_walk(500, seed=1),
+        random_walk(2000, seed=7),
+    ],
+)
+def test_incremental_statistics_match_empyrical(price_per_shares):
+    state = VaultPpsStatistics(vault_id=uuid.uuid4())
+    for i, price_per_share in enumerate(price_per_shares):
+        # the jobs overwrite the point of the current hour before moving on
+        apply_price_per_share(state, START + timedelta(hours=i), price_per_share * 0.9)
+        apply_price_per_share(state, START + timedelta(hours=i), price_per_share)
+
+    expected = calculate_pps_statistics_from_history(
+        pd.Series(
+            price_per_shares,
+            index=[START + timedelta(hours=i) for i in range(len(price_per_shares))],
+        )
+    )
+
+    assert compute_pps_statistics(state) == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+def test_build_matches_incremental_updates():
+    price_per_shares = random_walk(300, seed=3)
+    points = [(START + timedelta(days=i), pps) for i, pps in enumerate(price_per_shares)]
+
+    state = VaultPpsStatistics(vault_id=uuid.uuid4())
+    for pps_datetime, price_per_share in points:
+        apply_price_per_share(state, pps_datetime, price_per_share)
+
+    assert compute_pps_statistics(state) == pytest.approx(
+        compute_pps_statistics(build_pps_statistics(state.vault_id, points))
+    )
+
+
+def test_out_of_order_point_requires_rebuild():
+    state = build_pps_statistics(
+        uuid.uuid4(), [(START, 1.0), (START + timedelta(days=1), 1.01)]
+    )
+
+    assert not apply_price_per_share(state, START, 1.02)
+    assert state.point_count == 2
@@ -0,0 +1,70 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy.orm import Session
+
+from benchmarks.replay_events import load_logs, replay, route_logs
+from models.transaction import Transaction
+from models.user_portfolio import UserPortfolio
+from models.vaults import Vault
+
+VAULT_ADDRESS = "0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5"
+
+
+@pytest.fixture(autouse=True)
+def seed_data(seed_vaults):
+    seed_vaults(
+        [
+            Vault(
+                contract_address=VAULT_ADDRESS,
+                category="real_yield",
+                strategy_name="delta_neutral_strategy",
+                network_chain="arbitrum_one",
+                vault_currency="USDC",
+                name="Delta Neutral Strategy",
+                id=uuid.uuid4(),
+            )
+        ],
+        latest_pps=1,
+    )
+
+
+def _deposit_log(index: int) -> dict:
+    return {
+        "removed": False,
+        "logIndex": index,
+        "transactionIndex": 0,
+        "transactionHash": "0x{:064x}".format(2000 + index),
+        "blockHash": "0x" + "00" * 32,
+        "blockNumber": 192713205,
+        "address": VAULT_ADDRESS,
+        "data": "0x{:064x}".format(10_000000) + "{:064x}".format(10_000000),
+        "topics": [
+            "0x73a19dd210f1a7f902193214c0ee91dd35ee5b4d920cba8d519eca65a7b488ca",
+            "0x{:064x}".format(index % 4 + 1),
+        ],
+    }
+
+
+def test_replay_rolls_back_and_batches_queries(tmp_path, db_session: Session):
+    path = tmp_path / "events.jsonl"
+    path.write_text("\n".join(json.dumps(_deposit_log(i)) for i in range(20)))
+
+    events, skipped = route_logs(load_logs(str(path)))
+    assert len(events) == 20
+    assert skipped == 0
+
+    per_event = replay(events, batch_size=1)
+    batched = replay(events, batch_size=20)
+    assert per_event["events"] == batched["events"] == 20
+    assert batched["queries_per_event"] < per_event["queries_per_event"]
+
+    # the replay never reaches the database
+    txhashes = [entry["transactionHash"] for _, entry, _ in events]
+    assert (
+        db_session.query(Transaction).filter(Transaction.txhash.in_(txhashes)).count()
+        == 0
+    )
+    assert db_session.query(UserPortfolio).count() == 0
+
@@ -130,7 +130,7 @@ def insert_test_data_case_2(session: Session):
     session.commit()
 
 
-def mock_get_earned_points(vault_address: str, partner_name: str):
+async def mock_get_earned_points(vault_address: str, partner_name: str):
     if partner_name == constants.RENZO:
         return EarnedRestakingPoints(
             total_points=100,
@@ -193,3 +193,35 @@ def test_calculate_points_case2(db_session: Session):
         filter(lambda x: x.partner_name == constants.EIGENLAYER, user2_points)
     )
     assert round(eigen_points.points, 2) == 33.33
+
+
+@patch("bg_tasks.restaking_point_calculation.get_earned_points")
+def test_calculate_points_accumulates_and_audits(mock_get_points, db_session: Session):
+    insert_test_data_case_1(db_session)
+    user_address = "0xBC05da14287317FE12B1a2b5a0E1d756Ff1801Aa"
+
+    for total_points in (100, 150):
+        mock_get_points.return_value = EarnedRestakingPoints(
+            total_points=total_points,
+            eigen_layer_points=total_points / 2,
+            partner_name=constants.RENZO,
+        )
+        main()
+
+    renzo_points = (
+        db_session.query(UserPoints)
+        .filter_by(wallet_address=user_address, partner_name=constants.RENZO)
+        .one()
+    )
+    assert renzo_points.points == 150
+
+    audits = (
+        db_session.query(UserPointAudit)
+        .filter_by(user_points_id=renzo_points.id)
+        .order_by(UserPointAudit.new_value)
+        .all()
+    )
+    assert [(audit.old_value, audit.new_value) for audit in audits] == [
+        (0, 100),
+        (100, 150),
+    ]
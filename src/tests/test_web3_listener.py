@@ -1,3 +1,4 @@
+import asyncio
 from datetime import timedelta
 import math
 from unittest.mock import patch
@@ -6,23 +7,25 @@ import uuid
 from hexbytes import HexBytes
 import pendulum
 import pytest
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
 
 from core.db import engine
-from models.point_distribution_history import PointDistributionHistory
 from models.pps_history import PricePerShareHistory
-from models.user_points import UserPointAudit, UserPoints
 from models.user_portfolio import PositionStatus, UserPortfolio
-from models.vault_performance import VaultPerformance
-from models.vaults import Vault
-from web3_listener import handle_event
-
-
-@pytest.fixture(scope="module")
-def db_session():
-    session = Session(engine)
-    yield session
+from models.vaults import NetworkChain, Vault
+from models.listener_checkpoint import ListenerCheckpoint
+from models.transaction import Transaction
+from services.latest_pps import upsert_latest_price_per_share
+from services.listener_checkpoint import END_OF_BLOCK, get_checkpoint, get_checkpoints
+from services.vault_registry import vault_registry
+from web3_listener import (
+    EventHandlerPool,
+    Web3Listener,
+    _log_position,
+    handle_event,
+    handle_events,
+)
 
 
 @pytest.fixture
@@ -51,51 +54,41 @@ def event_data():
 
 # create fixture run before every test
 @pytest.fixture(autouse=True)
-def seed_data(db_session: Session):
-    db_session.query(UserPointAudit).delete()
-    db_session.query(UserPoints).delete()
-    db_session.query(PointDistributionHistory).delete()
-    db_session.query(VaultPerformance).delete()
-    db_session.query(UserPortfolio).delete()
-    db_session.commit()
-    db_session.query(PricePerShareHistory).delete()
-    db_session.commit()
-    db_session.query(Vault).delete()
-    db_session.commit()
-
-    vault = Vault(
-        contract_address="0x18994527E6FfE7e91F1873eCA53e900CE0D0f276",
-        category="real_yield",
-        strategy_name="options_wheel_strategy",
-        network_chain="arbitrum_one",
-        name="Options Wheel Strategy",
-        id=uuid.uuid4(),
-    )
-    db_session.add(vault)
-
-    vault = Vault(
-        contract_address="0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5",
-        category="real_yield",
-        strategy_name="delta_neutral_strategy",
-        network_chain="arbitrum_one",
-        name="Delta Neutral Strategy",
-        id=uuid.uuid4(),
-    )
-    db_session.add(vault)
-
-    vault = Vault(
-        contract_address="0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F9",
-        category="points",
-        strategy_name="delta_neutral_strategy",
-        network_chain="arbitrum_one",
-        name="Renzo Delta Neutral Strategy",
-        id=uuid.uuid4(),
+def seed_data(seed_vaults):
+    seed_vaults(
+        [
+            Vault(
+                contract_address="0x18994527E6FfE7e91F1873eCA53e900CE0D0f276",
+                category="real_yield",
+                strategy_name="options_wheel_strategy",
+                network_chain="arbitrum_one",
+                vault_currency="USDC",
+                name="Options Wheel Strategy",
+                id=uuid.uuid4(),
+            ),
+            Vault(
+                contract_address="0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5",
+                category="real_yield",
+                strategy_name="delta_neutral_strategy",
+                network_chain="arbitrum_one",
+                vault_currency="USDC",
+                name="Delta Neutral Strategy",
+                id=uuid.uuid4(),
+            ),
+            Vault(
+                contract_address="0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F9",
+                category="points",
+                strategy_name="delta_neutral_strategy",
+                network_chain="arbitrum_one",
+                vault_currency="USDC",
+                name="Renzo Delta Neutral Strategy",
+                id=uuid.uuid4(),
+            ),
+        ]
     )
-    db_session.add(vault)
-    db_session.commit()
 
 
-@patch("web3_listener._extract_stablecoin_event")
+@patch("web3_listener._extract_event")
 def test_handle_event_deposit(mock_extract_event, event_data, db_session: Session):
     mock_extract_event.return_value = (
         20,
@@ -227,7 +220,7 @@ def test_handle_event_deposit_calculating_entry_price(event_data, db_session: Se
     assert round(user_portfolio.entry_price, 2) == math.ceil(expected_entry * 100) / 100
 
 
-@patch("web3_listener._extract_stablecoin_event")
+@patch("web3_listener._extract_event")
 def test_handle_event_deposit_then_init_withdraw(
     mock_extract_event, event_data, db_session: Session
 ):
@@ -283,3 +276,209 @@ def test_handle_event_deposit_then_init_withdraw(
     assert user_portfolio is not None
     assert user_portfolio.total_balance == 0
     assert user_portfolio.status == PositionStatus.CLOSED
+
+
+def test_handle_events_batch(event_data, db_session: Session):
+    vault_address = "0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5"
+    users = [
+        "0x20f89ba1b0fc1e83f9aef0a134095cd63f7e8cc7",
+        "0x20f89ba1b0fc1e83f9aef0a134095cd63f7e8cc8",
+    ]
+
+    # replay 10 deposits of 10 USDC alternating between 2 users, then a full withdrawal
+    events = []
+    for i in range(10):
+        entry = dict(event_data)
+        entry["transactionHash"] = "0x{:064x}".format(i)
+        entry["logIndex"] = i
+        entry["topics"] = [
+            event_data["topics"][0],
+            HexBytes("0x" + "0" * 24 + users[i % 2][2:]),
+        ]
+        entry["data"] = HexBytes("0x{:064x}".format(10_000000) + "{:064x}".format(10_000000))
+        events.append((vault_address, entry, "Deposit"))
+
+    entry = dict(events[-1][1])
+    entry["transactionHash"] = "0x{:064x}".format(10)
+    entry["data"] = HexBytes("0x{:064x}".format(50_000000) + "{:064x}".format(50_000000))
+    events.append((vault_address, entry, "Withdrawn"))
+
+    vault = vault_registry.get_by_address(vault_address)
+    upsert_latest_price_per_share(db_session, vault.id, 1, pendulum.now())
+    db_session.commit()
+
+    # warm up the vault registry, it is not queried per batch
+    vault_registry.all()
+    statements = []
+
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_statements)
+    try:
+        handle_events(events)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statements)
+
+    # transactions, latest pps and portfolios are resolved once for the whole batch
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 3
+
+    user_portfolio = (
+        db_session.query(UserPortfolio)
+        .filter(UserPortfolio.user_address == users[0])
+        .first()
+    )
+    assert user_portfolio.total_balance == 50
+    assert user_portfolio.status == PositionStatus.ACTIVE
+
+    user_portfolio = (
+        db_session.query(UserPortfolio)
+        .filter(UserPortfolio.user_address == users[1])
+        .first()
+    )
+    assert user_portfolio.total_balance == 0
+    assert user_portfolio.status == PositionStatus.CLOSED
+
+
+def test_handle_events_saves_checkpoint(event_data, db_session: Session):
+    db_session.query(ListenerCheckpoint).delete()
+    db_session.commit()
+    vault_address = "0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5"
+
+    handle_events(
+        [(vault_address, event_data, "Deposit")],
+        checkpoint=("arbitrum_one", event_data["blockNumber"], event_data["logIndex"]),
+    )
+    assert get_checkpoint(db_session, "arbitrum_one") == (192713205, 1)
+
+    # the checkpoint never moves backwards
+    handle_events([], checkpoint=("arbitrum_one", 192713200, END_OF_BLOCK))
+    db_session.expire_all()
+    assert get_checkpoint(db_session, "arbitrum_one") == (192713205, 1)
+
+    handle_events([], checkpoint=("arbitrum_one", 192713205, END_OF_BLOCK))
+    db_session.expire_all()
+    assert get_checkpoint(db_session, "arbitrum_one") == (192713205, END_OF_BLOCK)
+
+
+@pytest.mark.asyncio
+async def test_event_handler_pool_partitions_by_user(event_data, db_session: Session):
+    db_session.query(ListenerCheckpoint).delete()
+    db_session.commit()
+    vault_address = "0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5"
+    users = [
+        "0x20f89ba1b0fc1e83f9aef0a134095cd63f7e8cc7",
+        "0x20f89ba1b0fc1e83f9aef0a134095cd63f7e8cc8",
+    ]
+
+    events = []
+    for i in range(10):
+        entry = dict(event_data)
+        entry["transactionHash"] = "0x{:064x}".format(100 + i)
+        entry["logIndex"] = i
+        entry["topics"] = [
+            event_data["topics"][0],
+            HexBytes("0x" + "0" * 24 + users[i % 2][2:]),
+        ]
+        entry["data"] = HexBytes("0x{:064x}".format(10_000000) + "{:064x}".format(10_000000))
+        events.append((vault_address, entry, "Deposit"))
+
+    vault = vault_registry.get_by_address(vault_address)
+    upsert_latest_price_per_share(db_session, vault.id, 1, pendulum.now())
+    db_session.commit()
+
+    pool = EventHandlerPool(workers=2)
+    try:
+        await pool.submit(events, "arbitrum_one", (192713205, 9))
+        # a replayed batch is skipped by every partition's checkpoint
+        await pool.submit(events, "arbitrum_one", (192713205, 9))
+    finally:
+        pool.shutdown()
+
+    assert get_checkpoints(db_session, "arbitrum_one") == {
+        0: (192713205, 9),
+        1: (192713205, 9),
+    }
+    db_session.expire_all()
+    for user in users:
+        user_portfolio = (
+            db_session.query(UserPortfolio)
+            .filter(UserPortfolio.user_address == user)
+            .first()
+        )
+        assert user_portfolio.total_balance == 50
+
+
+@pytest.mark.asyncio
+async def test_event_handler_pool_shares_transaction_across_partitions(
+    event_data, db_session: Session
+):
+    db_session.query(ListenerCheckpoint).delete()
+    db_session.commit()
+    vault_address = "0x55c4c840F9Ac2e62eFa3f12BaBa1B57A1208B6F5"
+    txhash = "0x{:064x}".format(200)
+    db_session.query(Transaction).filter(Transaction.txhash == txhash).delete()
+    db_session.commit()
+
+    pool = EventHandlerPool(workers=2)
+    # one transaction depositing for two users which land on different partitions
+    topics = {}
+    for i in range(1, 100):
+        topic = HexBytes("0x{:064x}".format(i))
+        topics.setdefault(pool.partition_of({"topics": [None, topic]}), topic)
+        if len(topics) == 2:
+            break
+
+    events = []
+    for log_index, topic in enumerate(topics.values()):
+        entry = dict(event_data)
+        entry["transactionHash"] = txhash
+        entry["logIndex"] = log_index
+        entry["topics"] = [event_data["topics"][0], topic]
+        entry["data"] = HexBytes("0x{:064x}".format(10_000000) + "{:064x}".format(10_000000))
+        events.append((vault_address, entry, "Deposit"))
+
+    vault = vault_registry.get_by_address(vault_address)
+    upsert_latest_price_per_share(db_session, vault.id, 1, pendulum.now())
+    db_session.commit()
+
+    try:
+        await pool.submit(events, "arbitrum_one", (192713205, 1))
+    finally:
+        pool.shutdown()
+
+    assert db_session.query(Transaction).filter(Transaction.txhash == txhash).count() == 1
+    db_session.expire_all()
+    for topic in topics.values():
+        user_portfolio = (
+            db_session.query(UserPortfolio)
+            .filter(UserPortfolio.user_address == "0x" + topic.hex()[-40:])
+            .first()
+        )
+        assert user_portfolio.total_balance == 10
+
+
+@pytest.mark.asyncio
+async def test_process_queue_flushes_batches_per_block(event_data):
+    class RecordingPool:
+        def __init__(self):
+            self.batches = []
+
+        async def submit(self, events, network_chain, position):
+            self.batches.append([_log_position(event[1]) for event in events])
+            if len(self.batches) == 2:
+                raise ValueError("stop")
+
+    listener = Web3Listener("ws://localhost")
+    listener.network_chain = NetworkChain.arbitrum_one
+    listener._pool.shutdown()
+    listener._pool = RecordingPool()
+    listener._queue = asyncio.Queue()
+    for block_number, log_index in [(1, 0), (1, 1), (2, 0)]:
+        entry = dict(event_data, blockNumber=block_number, logIndex=log_index)
+        listener._queue.put_nowait((entry["address"], entry, "Deposit"))
+
+    # returns once the second batch fails
+    await listener._process_queue()
+    assert listener._pool.batches == [[(1, 0), (1, 1)], [(2, 0)]]
@@ -0,0 +1,29 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import web3_provider
+
+
+@pytest.mark.asyncio
+async def test_ensure_async_session_creates_one_session_per_loop(monkeypatch):
+    cached_sessions = []
+
+    async def cache_async_session(session):
+        # yield to the other callers while the session is being attached
+        await asyncio.sleep(0.01)
+        cached_sessions.append(session)
+
+    provider = SimpleNamespace(cache_async_session=cache_async_session)
+    monkeypatch.setattr(
+        web3_provider, "get_async_web3", lambda network_chain: SimpleNamespace(provider=provider)
+    )
+    monkeypatch.setattr(web3_provider, "_async_sessions", {})
+
+    await asyncio.gather(*[web3_provider.ensure_async_session("arbitrum_one") for _ in range(5)])
+    assert len(cached_sessions) == 1
+
+    await web3_provider.close_async_sessions()
+    assert cached_sessions[0].closed
+    assert web3_provider._async_sessions == {}
@@ -23,17 +23,17 @@ def generate_referral_code(length=8):
     return referral_code
 
 
-def get_user_by_wallet_address(session, wallet_address):
+async def get_user_by_wallet_address(session, wallet_address):
     statement = select(User).where(User.wallet_address == wallet_address)
-    user = session.exec(statement).first()
+    user = (await session.exec(statement)).first()
     return user
 
 
-def create_user_with_referral(user_address, referral_code, session):
-    user = get_user_by_wallet_address(session, user_address)
+async def create_user_with_referral(user_address, referral_code, session):
+    user = await get_user_by_wallet_address(session, user_address)
     if user:
         return False
-    referral = get_referral_by_code(session, referral_code)
+    referral = await get_referral_by_code(session, referral_code)
     if not referral:
         return False
     if referral.usage_limit <= 0:
@@ -41,8 +41,8 @@ def create_user_with_referral(user_address, referral_code, session):
     referral.usage_limit -= 1
     user = User(user_id=uuid.uuid4(), wallet_address=user_address)
     session.add(user)
-    session.commit()
-    create_referral_code(session, user)
+    await session.commit()
+    await session.run_sync(create_referral_code, user)
 
     new_referral = Referral(
         referrer_id=referral.user_id,
@@ -50,13 +50,13 @@ def create_user_with_referral(user_address, referral_code, session):
         referral_code_id=referral.referral_code_id,
     )
     session.add(new_referral)
-    session.commit()
+    await session.commit()
     return True
 
 
-def get_referral_by_code(session, code):
+async def get_referral_by_code(session, code):
     statement = select(ReferralCode).where(ReferralCode.code == code)
-    referral = session.exec(statement).first()
+    referral = (await session.exec(statement)).first()
     return referral
 
 
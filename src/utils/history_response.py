@@ -0,0 +1,106 @@
+"""
+Cacheable, streamed responses for the chart history endpoints.
+
+The series are returned column-oriented (``{"date": [...], "apy": [...]}``)
+and written in chunks, so large ranges are never serialized into one string.
+Responses carry an ETag and Last-Modified derived from the range's row count
+and latest datetime, which lets clients revalidate without the series being
+loaded at all.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Sequence
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+
+HISTORY_RESOLUTIONS = ["hour", "day", "week"]
+STREAM_CHUNK_SIZE = 1000
+
+
+def history_etag(*parts) -> str:
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest() + '"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _cache_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.HISTORY_CACHE_MAX_AGE_SECONDS}",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def _opaque_tag(tag: str) -> str:
+    # If-None-Match uses the weak comparison, W/"x" matches "x"
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> Optional[bool]:
+    """Whether If-None-Match matches ``etag``, None without the header."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return None
+    tags = [_opaque_tag(tag) for tag in if_none_match.split(",")]
+    return "*" in tags or _opaque_tag(etag) in tags
+
+
+def _is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    matches = etag_matches(request, etag)
+    if matches is not None:
+        return matches
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have a one second resolution
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def not_modified_response(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> Optional[Response]:
+    """A 304 response when the client's copy is still current, else None."""
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=_cache_headers(etag, last_modified))
+    return None
+
+
+def _stream_columns(columns: Dict[str, Sequence]) -> Iterator[str]:
+    yield "{"
+    for column_index, (name, values) in enumerate(columns.items()):
+        yield ("," if column_index else "") + json.dumps(name) + ":["
+        for start in range(0, len(values), STREAM_CHUNK_SIZE):
+            chunk = json.dumps(list(values[start : start + STREAM_CHUNK_SIZE]))
+            yield ("," if start else "") + chunk[1:-1]
+        yield "]"
+    yield "}"
+
+
+def history_response(
+    columns: Dict[str, Sequence], etag: str, last_modified: Optional[datetime]
+) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_columns(columns),
+        media_type="application/json",
+        headers=_cache_headers(etag, last_modified),
+    )
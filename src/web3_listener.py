@@ -3,29 +3,43 @@ import asyncio
 import json
 import logging
 import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 import click
 import seqlog
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlmodel import select
 from sqlmodel import Session
-from web3 import Web3
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, Web3
 from web3._utils.filters import AsyncFilter
 from websockets import ConnectionClosedError, ConnectionClosedOK
 
 from core import constants
 from core.config import settings
 from core.db import engine
+from core.web3_provider import ensure_async_session, get_async_web3, run_async
 from log import setup_logging_to_console, setup_logging_to_file
 from models import (
     PositionStatus,
-    PricePerShareHistory,
     Transaction,
     UserPortfolio,
     Vault,
 )
 from models.vaults import NetworkChain
+from services.latest_pps import get_latest_price_per_shares
+from services.listener_checkpoint import (
+    END_OF_BLOCK,
+    get_checkpoint,
+    get_checkpoints,
+    save_checkpoint,
+)
+from services.log_decoder import decode_vault_event
 from services.socket_manager import WebSocketManager
+from services.vault_registry import vault_registry
 from utils.calculate_price import calculate_avg_entry_price
 
 
@@ -39,38 +53,6 @@ chain_name = None
 session = Session(engine)
 
 
-def _extract_stablecoin_event(entry):
-    # Decode the data field
-    data = entry["data"].hex()
-    value = int(data[2:66], 16) / 1e6
-    shares = int("0x" + data[66:], 16) / 1e6
-
-    from_address = None
-    if len(entry["topics"]) >= 2:
-        from_address = f'0x{entry["topics"][1].hex()[26:]}'  # For deposit event
-    return value, shares, from_address
-
-
-def _extract_delta_neutral_event(entry):
-    # Parse the account parameter from the topics field
-    from_address = None
-    if len(entry["topics"]) >= 2:
-        from_address = f'0x{entry["topics"][1].hex()[26:]}'  # For deposit event
-
-    # token_in = None
-    # if len(entry["topics"]) >= 3:
-    #     token_in = f'0x{entry["topics"][2].hex()[26:]}'
-    
-    # Parse the amount and shares parameters from the data field
-    data = entry["data"].hex()
-    amount = int(data[2:66], 16)
-
-    amount = amount / 1e18 if len(str(amount)) >= 18 else amount / 1e6
-    
-    shares = int(data[66 : 66 + 64], 16) / 1e6
-    return amount, shares, from_address
-
-
 def handle_deposit_event(
     user_portfolio: UserPortfolio,
     value,
@@ -93,7 +75,6 @@ def handle_deposit_event(
             trade_start_date=datetime.now(timezone.utc),
             total_shares=value / latest_pps,
         )
-        session.add(user_portfolio)
         logger.info(f"User with address {from_address} added to user_portfolio table")
     else:
         # Update the user_portfolio
@@ -103,7 +84,6 @@ def handle_deposit_event(
             user_portfolio, latest_pps, value
         )
         user_portfolio.total_shares += value / latest_pps
-        session.add(user_portfolio)
         logger.info(f"User with address {from_address} updated in user_portfolio table")
     return user_portfolio
 
@@ -119,7 +99,6 @@ def handle_initiate_withdraw_event(
 
         user_portfolio.init_deposit -= value
         user_portfolio.initiated_withdrawal_at = datetime.now(timezone.utc)
-        session.add(user_portfolio)
         logger.info(f"User with address {from_address} updated in user_portfolio table")
         return user_portfolio
     else:
@@ -142,7 +121,6 @@ def handle_withdrawn_event(
             user_portfolio.status = PositionStatus.CLOSED
             user_portfolio.trade_end_date = datetime.now(timezone.utc)
 
-        session.add(user_portfolio)
         logger.info(f"User with address {from_address} updated in user_portfolio table")
         return user_portfolio
     else:
@@ -158,70 +136,149 @@ event_handlers = {
 }
 
 
-def handle_event(vault_address: str, entry, event_name):
-    # Get the vault with ROCKONYX_ADDRESS
-    vault = session.exec(
-        select(Vault).where(Vault.contract_address == vault_address)
-    ).first()
-
-    if vault is None:
-        raise ValueError("Vault not found")
-
-    transaction = session.exec(
-        select(Transaction).where(Transaction.txhash == entry["transactionHash"])
-    ).first()
-    if transaction is None:
-        transaction = Transaction(
-            txhash=entry["transactionHash"],
-        )
-        session.add(transaction)
-    else:
-        logger.info(
-            f"Transaction with txhash {entry['transactionHash']} already exists"
-        )
-    logger.info(f"Processing event {event_name} for vault {vault_address} {vault.name}")
-
-    # Get the latest pps from pps_history table
-    latest_pps = session.exec(
-        select(PricePerShareHistory)
-        .where(PricePerShareHistory.vault_id == vault.id)
-        .order_by(PricePerShareHistory.datetime.desc())
-    ).first()
-    if latest_pps is not None:
-        latest_pps = latest_pps.price_per_share
-    else:
-        latest_pps = 1
-
+def _extract_event(vault: Vault, entry):
     # Extract the value, shares and from_address from the event
-    if vault.strategy_name == constants.OPTIONS_WHEEL_STRATEGY:
-        value, shares, from_address = _extract_stablecoin_event(entry)
-    elif vault.strategy_name == constants.DELTA_NEUTRAL_STRATEGY:
-        value, shares, from_address = _extract_delta_neutral_event(entry)
-    else:
+    if vault.strategy_name not in (
+        constants.OPTIONS_WHEEL_STRATEGY,
+        constants.DELTA_NEUTRAL_STRATEGY,
+    ):
         raise ValueError("Invalid vault address")
+    return decode_vault_event(vault, entry)
+
 
-    logger.info(f"Value: {value}, from_address: {from_address}")
-
-    # Check if user with from_address has position in user_portfolio table
-    user_portfolio = session.exec(
-        select(UserPortfolio)
-        .where(UserPortfolio.user_address == from_address)
-        .where(UserPortfolio.vault_id == vault.id)
-        .where(UserPortfolio.status == PositionStatus.ACTIVE)
-    ).first()
-
-    # Call the appropriate handler based on the event name
-    handler = event_handlers[event_name]
-    user_portfolio = handler(
-        user_portfolio,
-        value,
-        from_address,
-        vault=vault,
-        shares=shares,
-        latest_pps=latest_pps,
+def handle_events(
+    events: List[Tuple[str, dict, str]],
+    skip_invalid: bool = True,
+    checkpoint: Optional[Tuple] = None,
+    db_session: Optional[Session] = None,
+):
+    """
+    Apply a batch of (vault_address, entry, event_name) logs in order.
+
+    Vaults come from the in-process registry; existing txhashes, latest pps
+    and active portfolios are resolved with one set-based query each, the handlers run in memory and the whole
+    batch is committed once. Events are applied in the order they are given so
+    the result matches calling ``handle_event`` for each one.
+
+    ``checkpoint`` is a (network_chain, block_number, log_index[, partition])
+    position saved in the same transaction, marking everything up to it as
+    processed. ``db_session`` defaults to the listener's session; worker
+    threads pass their own.
+    """
+    if not events and checkpoint is None:
+        return
+    db_session = db_session or session
+
+    decoded_events = []
+    for vault_address, entry, event_name in events:
+        try:
+            vault = vault_registry.get_by_address(vault_address)
+            if vault is None:
+                raise ValueError("Vault not found")
+
+            value, shares, from_address = _extract_event(vault, entry)
+        except ValueError as e:
+            if not skip_invalid:
+                raise
+            logger.error(
+                f"Skip event {event_name} for vault {vault_address}: {e}"
+            )
+            continue
+        decoded_events.append((vault, entry, event_name, value, shares, from_address))
+
+    if not decoded_events:
+        if checkpoint is not None:
+            try:
+                save_checkpoint(db_session, *checkpoint)
+                db_session.commit()
+            except Exception:
+                db_session.rollback()
+                raise
+        return
+
+    vault_ids = {vault.id for vault, *_ in decoded_events}
+    txhashes = {entry["transactionHash"] for _, entry, *_ in decoded_events}
+    from_addresses = {
+        from_address
+        for *_, from_address in decoded_events
+        if from_address is not None
+    }
+
+    existing_txhashes = set(
+        db_session.exec(
+            select(Transaction.txhash).where(Transaction.txhash.in_(txhashes))
+        ).all()
     )
 
-    session.commit()
+    # Get the latest pps of every vault in the batch from latest_pps table
+    latest_pps_by_vault = get_latest_price_per_shares(db_session, vault_ids)
+
+    user_portfolios = {}
+    if from_addresses:
+        for user_portfolio in db_session.exec(
+            select(UserPortfolio)
+            .where(UserPortfolio.user_address.in_(from_addresses))
+            .where(UserPortfolio.vault_id.in_(vault_ids))
+            .where(UserPortfolio.status == PositionStatus.ACTIVE)
+        ).all():
+            user_portfolios.setdefault(
+                (user_portfolio.vault_id, user_portfolio.user_address), user_portfolio
+            )
+
+    new_txhashes = []
+    try:
+        for vault, entry, event_name, value, shares, from_address in decoded_events:
+            txhash = entry["transactionHash"]
+            if txhash in existing_txhashes:
+                logger.info(f"Transaction with txhash {txhash} already exists")
+            else:
+                new_txhashes.append(txhash)
+                existing_txhashes.add(txhash)
+
+            logger.info(
+                f"Processing event {event_name} for vault {vault.contract_address} {vault.name}"
+            )
+            logger.info(f"Value: {value}, from_address: {from_address}")
+
+            # Call the appropriate handler based on the event name
+            key = (vault.id, from_address)
+            handler = event_handlers[event_name]
+            user_portfolio = handler(
+                user_portfolios.get(key),
+                value,
+                from_address,
+                vault=vault,
+                shares=shares,
+                latest_pps=latest_pps_by_vault.get(vault.id, 1),
+            )
+
+            if user_portfolio is not None:
+                db_session.add(user_portfolio)
+
+            # Later events of the same user only see the position while it is active
+            if user_portfolio is not None and user_portfolio.status == PositionStatus.ACTIVE:
+                user_portfolios[key] = user_portfolio
+            else:
+                user_portfolios.pop(key, None)
+
+        if new_txhashes:
+            # another partition may record the same transaction for another user
+            created_on = datetime.now(timezone.utc)
+            db_session.execute(
+                pg_insert(Transaction)
+                .values([{"txhash": txhash, "created_on": created_on} for txhash in new_txhashes])
+                .on_conflict_do_nothing(index_elements=[Transaction.txhash])
+            )
+        if checkpoint is not None:
+            save_checkpoint(db_session, *checkpoint)
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+
+
+def handle_event(vault_address: str, entry, event_name):
+    handle_events([(vault_address, entry, event_name)], skip_invalid=False)
 
 
 EVENT_FILTERS = {
@@ -249,69 +306,418 @@ EVENT_FILTERS = {
 }
 
 
+def _log_position(entry) -> Tuple[int, int]:
+    block_number, log_index = entry["blockNumber"], entry["logIndex"]
+    if isinstance(block_number, str):
+        block_number = int(block_number, 16)
+    if isinstance(log_index, str):
+        log_index = int(log_index, 16)
+    return block_number, log_index
+
+
+def _build_routes(vaults: List[Vault]) -> Dict[Tuple[bytes, bytes], str]:
+    """(vault address, topic0) as raw bytes -> event name."""
+    return {
+        (bytes(HexBytes(vault.contract_address)), bytes(HexBytes(topic))): event_filter["event"]
+        for vault in vaults
+        for topic, event_filter in EVENT_FILTERS.items()
+    }
+
+
+def _route_log(routes: Dict[Tuple[bytes, bytes], str], entry) -> Optional[str]:
+    topics = entry["topics"]
+    if not topics:
+        return None
+    return routes.get((bytes(HexBytes(entry["address"])), bytes(topics[0])))
+
+
+def _log_filter(vaults: List[Vault]) -> dict:
+    # every vault of the chain, only the topics the listener handles
+    return {
+        "address": [Web3.to_checksum_address(vault.contract_address) for vault in vaults],
+        "topics": [list(EVENT_FILTERS.keys())],
+    }
+
+
+async def iter_vault_logs(
+    w3: AsyncWeb3, vaults: List[Vault], from_block: int, to_block: int
+) -> AsyncIterator[Tuple[int, List[Tuple[str, dict, str]]]]:
+    """
+    Yield (last block of the chunk, routed events) for the vault logs between
+    the blocks, in log order, with chunked eth_getLogs. The chunk is halved
+    when the provider rejects a range and grows back after each successful one.
+    """
+    routes = _build_routes(vaults)
+    log_filter = _log_filter(vaults)
+    max_chunk = settings.WEB3_LISTENER_BACKFILL_CHUNK_BLOCKS
+    chunk = max_chunk
+    while from_block <= to_block:
+        chunk_to_block = min(from_block + chunk - 1, to_block)
+        try:
+            logs = await w3.eth.get_logs(
+                {"fromBlock": from_block, "toBlock": chunk_to_block, **log_filter}
+            )
+        except Exception as e:
+            if chunk == 1:
+                raise
+            chunk = max(chunk // 2, 1)
+            logger.warning(
+                "eth_getLogs %s-%s failed (%s), retrying with %s blocks",
+                from_block,
+                chunk_to_block,
+                e,
+                chunk,
+            )
+            continue
+
+        events = []
+        for log in sorted(logs, key=_log_position):
+            event_name = _route_log(routes, log)
+            if event_name is not None and not log.get("removed"):
+                entry = dict(log)
+                entry["transactionHash"] = HexBytes(log["transactionHash"]).hex()
+                events.append((log["address"], entry, event_name))
+        yield chunk_to_block, events
+
+        from_block = chunk_to_block + 1
+        chunk = min(chunk * 2, max_chunk)
+
+
+def _partition_key(entry) -> bytes:
+    # the indexed user address, so every log of a user lands on the same worker
+    topics = entry["topics"]
+    if len(topics) >= 2:
+        return bytes(topics[1])
+    return bytes(HexBytes(entry["address"]))
+
+
+class EventHandlerPool:
+    """
+    Runs ``handle_events`` on worker threads, one per partition of user
+    addresses. A partition is served by a single thread with its own session
+    and checkpoint, so the logs of a user are applied in order while different
+    users are handled in parallel, off the event loop.
+    """
+
+    def __init__(self, workers: int = settings.WEB3_LISTENER_WORKERS):
+        self.workers = workers
+        self._executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"web3-listener-{i}")
+            for i in range(workers)
+        ]
+        # partition -> session, only used from the partition's thread
+        self._sessions: Dict[int, Session] = {}
+
+    def partition_of(self, entry) -> int:
+        return zlib.crc32(_partition_key(entry)) % self.workers
+
+    def _run(
+        self,
+        partition: int,
+        events: List[Tuple[str, dict, str]],
+        network_chain: str,
+        position: Tuple[int, int],
+    ):
+        db_session = self._sessions.get(partition)
+        if db_session is None:
+            db_session = self._sessions[partition] = Session(engine)
+
+        # logs a previous, partially failed batch already applied
+        checkpoint = get_checkpoint(db_session, network_chain, partition)
+        if checkpoint is not None:
+            events = [event for event in events if _log_position(event[1]) > checkpoint]
+        handle_events(
+            events,
+            checkpoint=(network_chain, *position, partition),
+            db_session=db_session,
+        )
+
+    async def submit(
+        self,
+        events: List[Tuple[str, dict, str]],
+        network_chain: str,
+        position: Tuple[int, int],
+    ):
+        """
+        Apply ``events`` and move every partition's checkpoint to ``position``.
+        Returns once all partitions committed, so batches never overlap.
+        """
+        partitions: List[List[Tuple[str, dict, str]]] = [[] for _ in range(self.workers)]
+        for event in events:
+            partitions[self.partition_of(event[1])].append(event)
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *[
+                loop.run_in_executor(
+                    self._executors[partition],
+                    self._run,
+                    partition,
+                    partition_events,
+                    network_chain,
+                    position,
+                )
+                for partition, partition_events in enumerate(partitions)
+            ],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def shutdown(self):
+        for partition, executor in enumerate(self._executors):
+            db_session = self._sessions.pop(partition, None)
+            if db_session is not None:
+                executor.submit(db_session.close)
+            executor.shutdown(wait=True)
+
+
 class Web3Listener(WebSocketManager):
     def __init__(self, connection_url):
         super().__init__(connection_url, logger=logger)
+        self.network_chain: Optional[NetworkChain] = None
+        # position of the last log queued or processed, later logs only
+        self._last_position: Optional[Tuple[int, int]] = None
+        self._subscription_ids: List[str] = []
+        self._routes: Dict[Tuple[bytes, bytes], str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool = EventHandlerPool()
 
     async def _process_new_entries(
         self, vault_address: str, event_filter: AsyncFilter, event_name: str
     ):
         events = await event_filter.get_new_entries()
-        for event in events:
-            handle_event(vault_address, event, event_name)
+        handle_events([(vault_address, event, event_name) for event in events])
+
+    def _route(self, entry) -> Optional[str]:
+        return _route_log(self._routes, entry)
+
+    async def _backfill_range(
+        self,
+        pool: EventHandlerPool,
+        vaults: List[Vault],
+        start: Tuple[int, int],
+        head: int,
+    ):
+        """Apply the logs after ``start`` up to block ``head``."""
+        network_chain = self.network_chain.value
+        from_block = start[0] + 1 if start[1] == END_OF_BLOCK else start[0]
+        async for to_block, events in iter_vault_logs(
+            get_async_web3(self.network_chain), vaults, from_block, head
+        ):
+            events = [event for event in events if _log_position(event[1]) > start]
+            await pool.submit(events, network_chain, (to_block, END_OF_BLOCK))
+            logger.info(
+                "Backfilled blocks %s-%s on %s: %s events",
+                from_block,
+                to_block,
+                network_chain,
+                len(events),
+            )
+            from_block = to_block + 1
+
+    async def _backfill(self, vaults: List[Vault]):
+        """Apply the logs emitted since the lowest partition checkpoint."""
+        network_chain = self.network_chain.value
+        await ensure_async_session(self.network_chain)
+        head = await get_async_web3(self.network_chain).eth.block_number
+
+        checkpoints = get_checkpoints(session, network_chain)
+        session.commit()
+        if not checkpoints:
+            # first run on this chain, nothing to recover
+            await self._pool.submit([], network_chain, (head, END_OF_BLOCK))
+            self._last_position = (head, END_OF_BLOCK)
+            return
+
+        if len(checkpoints) != self._pool.workers and len(set(checkpoints.values())) > 1:
+            # WEB3_LISTENER_WORKERS changed after a partial batch, users moved
+            # partitions: finish that range with the previous partitioning first
+            previous_pool = EventHandlerPool(len(checkpoints))
+            try:
+                await self._backfill_range(
+                    previous_pool,
+                    vaults,
+                    min(checkpoints.values()),
+                    max(checkpoints.values())[0],
+                )
+            finally:
+                previous_pool.shutdown()
+            checkpoints = get_checkpoints(session, network_chain)
+            session.commit()
+
+        positions = [
+            checkpoints[partition]
+            for partition in range(self._pool.workers)
+            if partition in checkpoints
+        ] or list(checkpoints.values())
+        start = min(positions)
+        await self._backfill_range(self._pool, vaults, start, head)
+        self._last_position = max(start, (head, END_OF_BLOCK))
+
+    async def _unsubscribe(self):
+        subscription_ids, self._subscription_ids = self._subscription_ids, []
+        for subscription_id in subscription_ids:
+            try:
+                await self.w3.eth.unsubscribe(subscription_id)
+            except Exception as e:
+                logger.warning("Unsubscribe %s failed: %s", subscription_id, e)
 
     async def listen_for_events(self, network: NetworkChain):
+        self.network_chain = NetworkChain(network)
+        await self._listen_for_events(network)
+
+    async def _consume_messages(self):
+        """Route logs from the socket into the queue, waiting when it is full."""
+        async for msg in self.read_messages():
+            logger.info("Received message: %s", msg)
+            res = msg["result"]
+            event_name = self._route(res)
+            if event_name is None:
+                continue
+            if res.get("removed"):
+                logger.info("Skip removed log %s", res["transactionHash"])
+                continue
+
+            position = _log_position(res)
+            if self._last_position is not None and position <= self._last_position:
+                logger.info("Skip already processed log at %s", position)
+                continue
+
+            self._last_position = position
+            await self._queue.put((res["address"], res, event_name))
+
+    async def _process_queue(self):
+        """
+        Hand queued logs to the worker pool in batches of one block: a batch is
+        flushed when the next log belongs to another block, once the batch
+        window elapsed or at WEB3_LISTENER_MAX_BATCH_SIZE logs. A window of 0
+        keeps one commit per log.
+        """
+        loop = asyncio.get_running_loop()
+        window = settings.WEB3_LISTENER_BATCH_WINDOW_MS / 1000
+        # the first log of the next block, taken off the queue by the previous batch
+        next_event = None
+        while True:
+            events = [next_event if next_event is not None else await self._queue.get()]
+            next_event = None
+            block_number = _log_position(events[0][1])[0]
+            deadline = loop.time() + window
+            while window > 0 and len(events) < settings.WEB3_LISTENER_MAX_BATCH_SIZE:
+                try:
+                    event = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    # only wait for more logs while the batch is not full
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(remaining)
+                    continue
+
+                if _log_position(event[1])[0] != block_number:
+                    next_event = event
+                    break
+                events.append(event)
+
+            logger.info("Processing %s events", len(events))
+            try:
+                await self._pool.submit(
+                    events,
+                    self.network_chain.value,
+                    _log_position(events[-1][1]),
+                )
+            except Exception as e:
+                logger.error(f"Error: {e}")
+                logger.error(traceback.format_exc())
+                # the loop backfills from the checkpoints
+                logger.warning("Batch failed, backfilling from the checkpoint")
+                return
+
+    async def _watch_vaults(self, network: NetworkChain, addresses: set):
+        """Return once the active vault set changes."""
+        while True:
+            await asyncio.sleep(settings.WEB3_LISTENER_VAULT_REFRESH_SECONDS)
+            await vault_registry.refresh()
+            vaults = vault_registry.get_active_vaults(network_chain=network)
+            if {vault.contract_address.lower() for vault in vaults} != addresses:
+                logger.info("Active vaults changed, refreshing the subscription")
+                return
+
+    async def _listen_for_events(self, network: NetworkChain):
         while True:
             try:
                 # query all active vaults
-                vaults = session.exec(
-                    select(Vault)
-                    .where(Vault.is_active == True)
-                    .where(Vault.network_chain == network)
-                ).all()
-                for vault in vaults:
-                    # subscribe to new block headers
+                await vault_registry.refresh()
+                vaults = vault_registry.get_active_vaults(network_chain=network)
+                self._routes = _build_routes(vaults)
+
+                # one subscription for every vault of the chain
+                await self._unsubscribe()
+                if vaults:
                     subscription_id = await self.w3.eth.subscribe(
-                        "logs",
-                        {
-                            "address": vault.contract_address,
-                        },
+                        "logs", _log_filter(vaults)
                     )
+                    self._subscription_ids.append(subscription_id)
                     logger.info(
-                        "Subscription %s - %s response: %s",
-                        vault.name,
-                        vault.contract_address,
+                        "Subscription %s for %s vaults on %s",
                         subscription_id,
+                        len(vaults),
+                        network,
                     )
 
-                async for msg in self.read_messages():
-                    logger.info("Received message: %s", msg)
-                    # Handle the event
-                    # await self.handle_events()
-                    res = msg["result"]
-                    if res["topics"][0].hex() in EVENT_FILTERS.keys():
-                        event_filter = EVENT_FILTERS[res["topics"][0].hex()]
-                        handle_event(res["address"], res, event_filter["event"])
+                # subscribe first, logs the backfill already covered are skipped;
+                # anything still queued from a previous round is covered too
+                self._queue = asyncio.Queue(maxsize=settings.WEB3_LISTENER_QUEUE_SIZE)
+                await self._backfill(vaults)
+
+                tasks = [
+                    asyncio.create_task(self._consume_messages()),
+                    asyncio.create_task(self._process_queue()),
+                    asyncio.create_task(
+                        self._watch_vaults(
+                            network,
+                            {vault.contract_address.lower() for vault in vaults},
+                        )
+                    ),
+                ]
+                try:
+                    done, _ = await asyncio.wait(
+                        tasks, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                for task in done:
+                    task.result()
             except (ConnectionClosedError, ConnectionClosedOK) as e:
                 self.logger.error("Websocket connection close", exc_info=True)
                 self.logger.error(traceback.format_exc())
-                # await self.reconnect()
-                # await asyncio.sleep(10)
                 raise e
             except Exception as e:
                 logger.error(f"Error: {e}")
                 logger.error(traceback.format_exc())
 
     async def run(self, network: NetworkChain):
-        await self.connect()
-
+        # a reconnect resumes from the checkpoint, the backfill covers the gap
         try:
-            await self.listen_for_events(network)
-        except Exception as e:
-            logger.error(f"Error: {e}")
-            logger.error(traceback.format_exc())
+            while True:
+                try:
+                    await self.connect()
+                    self._subscription_ids = []
+                    await self.listen_for_events(network)
+                except (ConnectionClosedError, ConnectionClosedOK):
+                    logger.error("Websocket connection closed, reconnecting")
+                except Exception as e:
+                    logger.error(f"Error: {e}")
+                    logger.error(traceback.format_exc())
+                finally:
+                    await self.disconnect()
+
+                await asyncio.sleep(settings.WEB3_LISTENER_RECONNECT_DELAY_SECONDS)
         finally:
-            await self.disconnect()
+            self._pool.shutdown()
 
 
 async def run(network: str):
@@ -345,7 +751,7 @@ async def run(network: str):
 @click.command()
 @click.option("--network", default="arbitrum_one", help="Blockchain network to use")
 def main(network: str):
-    asyncio.run(run(network))
+    run_async(run(network))
 
 
 if __name__ == "__main__":